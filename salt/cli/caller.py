@@ -8,6 +8,7 @@ minion modules.
 from __future__ import print_function
 import os
 import sys
+import time
 import logging
 import datetime
 import traceback
@@ -42,10 +43,13 @@ class Caller(object):
         # Handle this here so other deeper code which might
         # be imported as part of the salt api doesn't do  a
         # nasty sys.exit() and tick off our developer users
+        start = time.time()
         try:
             self.minion = salt.minion.SMinion(opts)
         except SaltClientError as exc:
             raise SystemExit(str(exc))
+        self.timings = list(self.minion.timings)
+        self.timings.append(('startup', time.time() - start))
 
     def call(self):
         '''
@@ -137,14 +141,28 @@ class Caller(object):
         grains = salt.loader.grains(self.opts)
         salt.output.display_output({'local': grains}, 'grains', self.opts)
 
+    def print_timings(self):
+        '''
+        Print the time spent in each step of the salt-call run on stderr
+        '''
+        width = max(len(name) for name, _ in self.timings)
+        sys.stderr.write('Startup profile:\n')
+        for name, elapsed in self.timings:
+            sys.stderr.write('    {0:<{1}}  {2:8.3f}s\n'.format(
+                name, width, elapsed))
+
     def run(self):
         '''
         Execute the salt call logic
         '''
+        start = time.time()
         ret = self.call()
+        self.timings.append(('call', time.time() - start))
         salt.output.display_output(
                 {'local': ret.get('return', {})},
                 ret.get('out', 'nested'),
                 self.opts)
+        if self.opts.get('profile_startup', False):
+            self.print_timings()
         if self.opts.get('retcode_passthrough', False):
             sys.exit(ret['retcode'])
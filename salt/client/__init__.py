@@ -37,6 +37,7 @@ import time
 import copy
 import getpass
 import logging
+import collections
 from datetime import datetime
 
 # Import salt libs
@@ -75,6 +76,68 @@ def condition_kwarg(arg, kwarg):
     return arg
 
 
+class ReturnCollector(object):
+    '''
+    Collect the returns of any number of jobs over a single event
+    subscription. Each event read is queued on the job it belongs to, so
+    waiting on one job never drops the returns of another.
+    '''
+    def __init__(self, event):
+        self.event = event
+        self.jobs = {}
+
+    def add(self, jid, minions):
+        '''
+        Start tracking a job, minions is the set of minions expected to
+        return and is updated in place as more minions are discovered
+        '''
+        if jid not in self.jobs:
+            self.jobs[jid] = {'minions': minions,
+                              'found': set(),
+                              'returns': collections.deque()}
+        return self.jobs[jid]
+
+    def discard(self, jid):
+        '''
+        Stop tracking a job
+        '''
+        self.jobs.pop(jid, None)
+
+    def poll(self, wait=1):
+        '''
+        Wait up to wait seconds for an event of any tracked job and queue it
+        on its job. Returns the jid of that job, or None on timeout.
+        '''
+        if not self.jobs:
+            return None
+        raw = self.event.get_event(wait, tuple(self.jobs), full=True)
+        if raw is None:
+            return None
+        return self.dispatch(raw)
+
+    def dispatch(self, raw):
+        '''
+        Queue a full event on the tracked job it belongs to. Returns the jid
+        of that job, or None if the event is not for a tracked job.
+        '''
+        jid = raw['tag']
+        if jid not in self.jobs:
+            matches = [jid_ for jid_ in self.jobs if jid.startswith(jid_)]
+            if not matches:
+                return None
+            jid = matches[0]
+        job = self.jobs[jid]
+        data = raw['data']
+        if 'minions' in data.get('data', {}):
+            job['minions'].update(data['data']['minions'])
+        elif 'syndic' in data:
+            job['minions'].update(data['syndic'])
+        elif 'return' in data:
+            job['found'].add(data['id'])
+            job['returns'].append(data)
+        return jid
+
+
 class LocalClient(object):
     '''
     The interface used by the :command:`salt` CLI tool on the Salt Master
@@ -113,6 +176,7 @@ class LocalClient(object):
         self.salt_user = self.__get_user()
         self.key = self.__read_master_key()
         self.event = salt.utils.event.LocalClientEvent(self.opts['sock_dir'])
+        self.collector = ReturnCollector(self.event)
 
     def __read_master_key(self):
         '''
@@ -844,7 +908,9 @@ class LocalClient(object):
                                      self.opts['hash_type'])
         start = int(time.time())
         timeout_at = start + timeout
-        found = set()
+        job = self.collector.add(jid, minions)
+        minions = job['minions']
+        found = job['found']
         wtag = os.path.join(jid_dir, 'wtag*')
         # Check to see if the jid is real, if not return the empty dict
         if not os.path.isdir(jid_dir):
@@ -854,13 +920,36 @@ class LocalClient(object):
         last_time = False
         log.debug("get_iter_returns for jid %s sent to %s will timeout at %s",
                   jid, minions, datetime.fromtimestamp(timeout_at).time())
-        while True:
-            # Process events until timeout is reached or all minions have returned
-            time_left = timeout_at - int(time.time())
-            # Wait 0 == forever, use a minimum of 1s
-            wait = max(1, time_left)
-            raw = self.event.get_event(wait, jid)
-            if raw is None:
+        try:
+            while True:
+                # Hand out the returns queued for this job, they may have
+                # been read while another job was being waited on
+                while job['returns']:
+                    raw = job['returns'].popleft()
+                    if kwargs.get('raw', False):
+                        yield raw
+                    else:
+                        ret = {raw['id']: {'ret': raw['return']}}
+                        if 'out' in raw:
+                            ret[raw['id']]['out'] = raw['out']
+                        log.debug('jid %s return from %s', jid, raw['id'])
+                        yield ret
+                # Process events until timeout is reached or all minions have
+                # returned
+                time_left = timeout_at - int(time.time())
+                # Wait 0 == forever, use a minimum of 1s
+                wait = max(1, time_left)
+                polled = self.collector.poll(wait)
+                if polled == jid:
+                    continue
+                if polled is not None \
+                        and len(found.intersection(minions)) < len(minions) \
+                        and int(time.time()) <= timeout_at:
+                    # An event of another tracked job, this job has neither
+                    # returned nor timed out yet
+                    continue
+                # Then event system timeout was reached and nothing was
+                # returned
                 if len(found.intersection(minions)) >= len(minions):
                     # All minions have returned, break out of the loop
                     log.debug('jid %s found all minions %s', jid, found)
@@ -872,65 +961,59 @@ class LocalClient(object):
                                       jid, syndic_wait, datetime.fromtimestamp(timeout_at).time())
                             continue
                     break
-            else:
-                if 'minions' in raw.get('data', {}):
-                    minions.update(raw['data']['minions'])
-                    continue
-                if 'syndic' in raw:
-                    minions.update(raw['syndic'])
+                if self.opts['order_masters'] \
+                        and glob.glob(wtag) \
+                        and int(time.time()) <= timeout_at + 1:
+                    # The timeout +1 has not been reached and there is still
+                    # a write tag for the syndic
                     continue
-                if 'return' not in raw:
-                    continue
-                if kwargs.get('raw', False):
-                    found.add(raw['id'])
-                    yield raw
-                else:
-                    found.add(raw['id'])
-                    ret = {raw['id']: {'ret': raw['return']}}
-                    if 'out' in raw:
-                        ret[raw['id']]['out'] = raw['out']
-                    log.debug('jid %s return from %s', jid, raw['id'])
-                    yield ret
-
-                continue
-            # Then event system timeout was reached and nothing was returned
-            if len(found.intersection(minions)) >= len(minions):
-                # All minions have returned, break out of the loop
-                log.debug('jid %s found all minions %s', jid, found)
-                if self.opts['order_masters']:
-                    if syndic_wait < self.opts.get('syndic_wait', 1):
-                        syndic_wait += 1
-                        timeout_at = int(time.time()) + 1
-                        log.debug('jid %s syndic_wait %s will now timeout at %s',
-                                  jid, syndic_wait, datetime.fromtimestamp(timeout_at).time())
+                if last_time:
+                    if len(found) < len(minions):
+                        log.info('jid %s minions %s did not return in time',
+                                 jid, (minions - found))
+                    break
+                if int(time.time()) > timeout_at:
+                    # The timeout has been reached, check the jid to see if
+                    # the timeout needs to be increased
+                    missing = self._present_minions(minions - found)
+                    if not missing:
+                        last_time = True
+                        log.debug('jid %s missing minions are not connected', jid)
                         continue
-                break
-            if glob.glob(wtag) and int(time.time()) <= timeout_at + 1:
-                # The timeout +1 has not been reached and there is still a
-                # write tag for the syndic
-                continue
-            if last_time:
-                if len(found) < len(minions):
-                    log.info('jid %s minions %s did not return in time',
-                             jid, (minions - found))
-                break
-            if int(time.time()) > timeout_at:
-                # The timeout has been reached, check the jid to see if the
-                # timeout needs to be increased
-                jinfo = self.gather_job_info(jid, tgt, tgt_type, minions - found, **kwargs)
-                still_running = [id_ for id_, jdat in jinfo.iteritems()
-                                 if jdat
-                                 ]
-                if still_running:
-                    timeout_at = int(time.time()) + timeout
-                    log.debug('jid %s still running on %s will now timeout at %s',
-                              jid, still_running, datetime.fromtimestamp(timeout_at).time())
-                    continue
-                else:
-                    last_time = True
-                    log.debug('jid %s not running on any minions last time', jid)
-                    continue
-            time.sleep(0.01)
+                    jinfo = self.gather_job_info(
+                            jid,
+                            ','.join(missing),
+                            'list',
+                            missing,
+                            **kwargs)
+                    still_running = [id_ for id_, jdat in jinfo.iteritems()
+                                     if jdat
+                                     ]
+                    if still_running:
+                        timeout_at = int(time.time()) + timeout
+                        log.debug('jid %s still running on %s will now timeout at %s',
+                                  jid, still_running, datetime.fromtimestamp(timeout_at).time())
+                        continue
+                    else:
+                        last_time = True
+                        log.debug('jid %s not running on any minions last time', jid)
+                        continue
+        finally:
+            self.collector.discard(jid)
+
+    def _present_minions(self, minions):
+        '''
+        Return the subset of minions which are connected to the master. Unless
+        skip_disconnected_minions is set, or when presence can not be
+        determined, as behind a syndic or without the minion data cache, all
+        of the minions are returned and checked with find_job.
+        '''
+        if not self.opts.get('skip_disconnected_minions', False) \
+                or self.opts['order_masters'] \
+                or not self.opts.get('minion_data_cache', False):
+            return set(minions)
+        ckminions = salt.utils.minions.CkMinions(self.opts)
+        return set(ckminions.connected_ids(subset=minions))
 
     def get_returns(
             self,
@@ -1373,24 +1456,7 @@ class LocalClient(object):
         if self.opts['order_masters']:
             payload_kwargs['to'] = timeout
 
-        # sreq = salt.payload.SREQ(
-        #     #'tcp://{0[interface]}:{0[ret_port]}'.format(self.opts),
-        #     'tcp://' + salt.utils.ip_bracket(self.opts['interface']) +
-        #     ':' + str(self.opts['ret_port']),
-        # )
-        master_uri = 'tcp://' + salt.utils.ip_bracket(self.opts['interface']) + \
-                     ':' + str(self.opts['ret_port'])
-        sreq = salt.transport.Channel.factory(self.opts, crypt='clear', master_uri=master_uri)
-
-        try:
-            payload = sreq.send(payload_kwargs)
-        except SaltReqTimeoutError:
-            log.error(
-                'Salt request timed out. If this error persists, '
-                'worker_threads may need to be increased.'
-            )
-            return {}
-
+        payload = self._send_pub(payload_kwargs)
         if not payload:
             # The master key could have changed out from under us! Regen
             # and try again if the key has changed
@@ -1399,16 +1465,42 @@ class LocalClient(object):
                 return payload
             self.key = key
             payload_kwargs['key'] = self.key
-            payload = sreq.send(payload_kwargs)
+            payload = self._send_pub(payload_kwargs)
             if not payload:
                 return payload
 
-        # We have the payload, let's get rid of SREQ fast(GC'ed faster)
-        del sreq
-
         return {'jid': payload['load']['jid'],
                 'minions': payload['load']['minions']}
 
+    def _send_pub(self, load):
+        '''
+        Send a clear load to the master's ret port and return the reply, an
+        empty dict is returned if the request times out
+        '''
+        # sreq = salt.payload.SREQ(
+        #     #'tcp://{0[interface]}:{0[ret_port]}'.format(self.opts),
+        #     'tcp://' + salt.utils.ip_bracket(self.opts['interface']) +
+        #     ':' + str(self.opts['ret_port']),
+        # )
+        sreq = salt.transport.Channel.factory(self.opts,
+                                              crypt='clear',
+                                              master_uri=self._master_uri())
+        try:
+            return sreq.send(load)
+        except SaltReqTimeoutError:
+            log.error(
+                'Salt request timed out. If this error persists, '
+                'worker_threads may need to be increased.'
+            )
+            return {}
+
+    def _master_uri(self):
+        '''
+        Return the uri of the local master's ret port
+        '''
+        return 'tcp://' + salt.utils.ip_bracket(self.opts['interface']) + \
+               ':' + str(self.opts['ret_port'])
+
     def __del__(self):
         # This IS really necessary!
         # When running tests, if self.events is not destroyed, we leak 2
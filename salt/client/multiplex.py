@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+'''
+A LocalClient which can be shared by many threads at once.
+
+Every LocalClient owns an event subscription and blocks on it while waiting
+for the returns of a job, so an application running many jobs at once needs
+one client, and one subscription filtering the full master event stream, per
+job. The MultiplexClient reads the event stream in a single background
+thread and hands each return to the job it belongs to, and publishes over a
+bounded pool of reusable master connections.
+
+.. code-block:: python
+
+    import threading
+    import salt.client.multiplex
+
+    local = salt.client.multiplex.MultiplexClient()
+
+    def ping(tgt):
+        for ret in local.cmd_iter(tgt, 'test.ping'):
+            print ret
+
+    for tgt in ('web*', 'db*', 'cache*'):
+        threading.Thread(target=ping, args=(tgt,)).start()
+'''
+
+# Import python libs
+import os
+import time
+import logging
+import threading
+import collections
+
+# Import salt libs
+import salt.client
+import salt.transport
+import salt.utils
+import salt.syspaths as syspaths
+from salt.utils.error import raise_error
+from salt.exceptions import SaltReqTimeoutError
+
+log = logging.getLogger(__name__)
+
+# How long, in seconds, the returns of a job are held when they arrive
+# before the job is being waited on
+EARLY_RETURN_TTL = 10
+
+
+class MultiplexClient(salt.client.LocalClient):
+    '''
+    A thread safe LocalClient, the ``run_job``, ``cmd``, ``cmd_iter``,
+    ``get_iter_returns``, ``get_returns``, ``runner`` and ``wheel`` methods
+    may be called from any number of threads at once
+    '''
+    def __init__(self,
+                 c_path=os.path.join(syspaths.CONFIG_DIR, 'master'),
+                 mopts=None,
+                 pool_size=8):
+        super(MultiplexClient, self).__init__(c_path, mopts)
+        self._cond = threading.Condition()
+        self._early = {}
+        self._reader = None
+        self._running = False
+        self._channels = []
+        self._channel_lock = threading.Lock()
+        self._pool = threading.BoundedSemaphore(pool_size)
+
+    def _start_reader(self):
+        '''
+        Connect the event subscription and start the thread reading it
+        '''
+        with self._cond:
+            if self._reader is not None and self._reader.is_alive():
+                return
+            # Connect here so the publish of the first job can not race
+            # with the connection of the subscription
+            self.event.subscribe()
+            self._running = True
+            self._reader = threading.Thread(target=self._read_events,
+                                            name='MultiplexClientReader')
+            self._reader.daemon = True
+            self._reader.start()
+
+    def _read_events(self):
+        '''
+        Read the event stream and dispatch the returns to the tracked jobs
+        '''
+        while self._running:
+            try:
+                raw = self.event.get_event(1, '', full=True)
+            except Exception as exc:
+                log.error('Failed to read the master event stream: '
+                          '{0}'.format(exc))
+                time.sleep(1)
+                continue
+            with self._cond:
+                if raw is None:
+                    self._expire_early()
+                    continue
+                if self.collector.dispatch(raw) is not None:
+                    self._cond.notify_all()
+                elif salt.utils.is_jid(raw['tag']):
+                    # The returns of a job which was just published may
+                    # arrive before the job is tracked
+                    self._early.setdefault(raw['tag'], []).append(
+                        (time.time(), raw))
+
+    def _expire_early(self):
+        '''
+        Drop the early returns which were never claimed by a job
+        '''
+        stale = time.time() - EARLY_RETURN_TTL
+        for jid in list(self._early):
+            if self._early[jid][-1][0] < stale:
+                del self._early[jid]
+
+    def close(self):
+        '''
+        Stop the event reader thread
+        '''
+        self._running = False
+        if self._reader is not None:
+            self._reader.join()
+            self._reader = None
+
+    def _track(self, jid, minions):
+        '''
+        Start tracking a job and hand it the returns which arrived early
+        '''
+        self._start_reader()
+        with self._cond:
+            job = self.collector.add(jid, minions)
+            for _, raw in self._early.pop(jid, []):
+                self.collector.dispatch(raw)
+            return job
+
+    def _collect(self, jid, minions, timeout=None, find_job=True, **kwargs):
+        '''
+        Yield the return events of a job as they come in. When find_job is
+        True the minions which did not return in time are asked if they are
+        still running the job, and the timeout is extended if any are.
+        '''
+        if not isinstance(minions, set):
+            if isinstance(minions, basestring):
+                minions = set([minions])
+            else:
+                minions = set(minions)
+        if timeout is None:
+            timeout = self.opts['timeout']
+        job = self._track(jid, minions)
+        timeout_at = time.time() + timeout
+        syndic_at = None
+        try:
+            while True:
+                with self._cond:
+                    returns = list(job['returns'])
+                    job['returns'].clear()
+                for raw in returns:
+                    yield raw
+                with self._cond:
+                    missing = job['minions'] - job['found']
+                now = time.time()
+                if not missing:
+                    if not self.opts['order_masters']:
+                        break
+                    # Syndics may still report more minions for the job
+                    if syndic_at is None:
+                        syndic_at = now + self.opts.get('syndic_wait', 1)
+                    if now >= syndic_at:
+                        break
+                elif now >= timeout_at:
+                    if find_job:
+                        missing = self._present_minions(missing)
+                    if find_job and missing \
+                            and self._still_running(jid, missing, **kwargs):
+                        timeout_at = time.time() + timeout
+                        continue
+                    log.info('jid %s minions %s did not return in time',
+                             jid, missing)
+                    break
+                with self._cond:
+                    if not job['returns']:
+                        wait_at = syndic_at if syndic_at else timeout_at
+                        self._cond.wait(max(0, wait_at - time.time()))
+        finally:
+            with self._cond:
+                self.collector.discard(jid)
+
+    def _still_running(self, jid, minions, **kwargs):
+        '''
+        Return True if any of the minions are still running the job
+        '''
+        timeout = self.opts['gather_job_timeout']
+        kwargs.pop('raw', None)
+        pub_data = self.run_job(','.join(minions),
+                                'saltutil.find_job',
+                                arg=[jid],
+                                expr_form='list',
+                                timeout=timeout,
+                                **kwargs)
+        if not pub_data:
+            return False
+        for raw in self._collect(pub_data['jid'],
+                                 pub_data['minions'],
+                                 timeout,
+                                 find_job=False):
+            if raw['return']:
+                log.debug('jid %s still running on %s', jid, raw['id'])
+                return True
+        return False
+
+    def run_job(self, *args, **kwargs):
+        '''
+        Publish a job, see :py:meth:`LocalClient.run_job`
+        '''
+        self._start_reader()
+        return super(MultiplexClient, self).run_job(*args, **kwargs)
+
+    def get_iter_returns(
+            self,
+            jid,
+            minions,
+            timeout=None,
+            tgt='*',
+            tgt_type='glob',
+            **kwargs):
+        '''
+        Yield the returns of a job as they come in
+        '''
+        for raw in self._collect(jid, minions, timeout, **kwargs):
+            if kwargs.get('raw', False):
+                yield raw
+                continue
+            ret = {raw['id']: {'ret': raw['return']}}
+            if 'out' in raw:
+                ret[raw['id']]['out'] = raw['out']
+            yield ret
+
+    def get_returns(self, jid, minions, timeout=None):
+        '''
+        Return a dict of the returns of a job, keyed by minion id
+        '''
+        return dict(
+            (raw['id'], raw['return'])
+            for raw in self._collect(jid, minions, timeout, find_job=False)
+        )
+
+    def cmd(self,
+            tgt,
+            fun,
+            arg=(),
+            timeout=None,
+            expr_form='glob',
+            ret='',
+            kwarg=None,
+            **kwargs):
+        '''
+        Run a job and return the returns of all of the minions at once, keyed
+        by minion id like :py:meth:`LocalClient.cmd`
+        '''
+        rets = {}
+        for fn_ret in self.cmd_iter(tgt,
+                                    fun,
+                                    arg,
+                                    timeout,
+                                    expr_form,
+                                    ret,
+                                    kwarg,
+                                    **kwargs):
+            for id_, data in fn_ret.iteritems():
+                rets[id_] = data['ret']
+        return rets
+
+    def _send_pub(self, load):
+        '''
+        Send a clear load to the master over a pooled connection
+        '''
+        with self._pool:
+            with self._channel_lock:
+                if self._channels:
+                    sreq = self._channels.pop()
+                else:
+                    sreq = salt.transport.Channel.factory(
+                        self.opts,
+                        crypt='clear',
+                        master_uri=self._master_uri())
+            try:
+                ret = sreq.send(load)
+            except SaltReqTimeoutError:
+                # A request socket which timed out can not send again, so
+                # it is not returned to the pool
+                log.error(
+                    'Salt request timed out. If this error persists, '
+                    'worker_threads may need to be increased.'
+                )
+                return {}
+            with self._channel_lock:
+                self._channels.append(sreq)
+            return ret
+
+    def runner(self, **kwargs):
+        '''
+        Execute a runner function through the master network interface,
+        see :py:meth:`salt.runner.RunnerClient.master_call`
+        '''
+        return self._master_call('runner', kwargs)
+
+    def wheel(self, **kwargs):
+        '''
+        Execute a wheel function through the master network interface,
+        see :py:meth:`salt.wheel.WheelClient.master_call`
+        '''
+        return self._master_call('wheel', kwargs)
+
+    def _master_call(self, cmd, load):
+        '''
+        Send a runner or wheel load and raise the error it returns, if any
+        '''
+        load['cmd'] = cmd
+        ret = self._send_pub(load)
+        if isinstance(ret, collections.Mapping):
+            if 'error' in ret:
+                raise_error(**ret['error'])
+        return ret
@@ -21,6 +21,7 @@ import yaml
 import salt.client.ssh.shell
 import salt.client.ssh.wrapper
 import salt.utils
+import salt.utils.minions
 import salt.utils.thin
 import salt.utils.verify
 import salt.utils.event
@@ -546,14 +547,13 @@ class Single(object):
             pillar_data = pillar.compile_pillar()
 
             # TODO: cache minion opts in datap in master.py
-            with salt.utils.fopen(datap, 'w+b') as fp_:
-                fp_.write(
-                        self.serial.dumps(
-                            {'opts': opts_pkg,
-                                'grains': opts_pkg['grains'],
-                                'pillar': pillar_data}
-                            )
-                        )
+            salt.utils.minions.write_minion_data(
+                    self.opts,
+                    self.id,
+                    {'opts': opts_pkg,
+                     'grains': opts_pkg['grains'],
+                     'pillar': pillar_data},
+                    self.serial)
         with salt.utils.fopen(datap, 'rb') as fp_:
             data = self.serial.load(fp_)
         opts = data.get('opts', {})
@@ -52,6 +52,8 @@ VALID_OPTS = {
     'id': str,
     'cachedir': str,
     'cache_jobs': bool,
+    'return_batch_size': int,
+    'return_batch_window': float,
     'conf_file': str,
     'sock_dir': str,
     'backup_mode': str,
@@ -71,6 +73,7 @@ VALID_OPTS = {
     'disable_modules': list,
     'disable_returners': list,
     'whitelist_modules': list,
+    'lazy_loader': bool,
     'module_dirs': list,
     'returner_dirs': list,
     'states_dirs': list,
@@ -85,6 +88,9 @@ VALID_OPTS = {
     'ipc_mode': str,
     'ipv6': bool,
     'file_buffer_size': int,
+    'file_transfer_window': int,
+    'file_transfer_window_max': int,
+    'file_sync_max_size': int,
     'tcp_pub_port': int,
     'tcp_pull_port': int,
     'log_file': str,
@@ -101,6 +107,8 @@ VALID_OPTS = {
     'state_output': str,
     'state_auto_order': bool,
     'state_events': bool,
+    'state_parallel': bool,
+    'state_parallel_workers': int,
     'acceptance_wait_time': float,
     'acceptance_wait_time_max': float,
     'loop_interval': float,
@@ -124,14 +132,21 @@ VALID_OPTS = {
     'tcp_keepalive_intvl': float,
     'interface': str,
     'publish_port': int,
+    'zmq_filtering': bool,
     'auth_mode': int,
+    'auth_rate': float,
+    'auth_key_cache_size': int,
     'worker_threads': int,
+    'worker_pool_threads': int,
+    'master_stats': bool,
+    'master_stats_event_iter': int,
     'ret_port': int,
     'keep_jobs': int,
     'master_roots': dict,
     'gitfs_remotes': list,
     'gitfs_root': str,
     'gitfs_base': str,
+    'gitfs_update_threads': int,
     'hgfs_remotes': list,
     'hgfs_root': str,
     'hgfs_base': str,
@@ -141,8 +156,14 @@ VALID_OPTS = {
     'ext_pillar': list,
     'pillar_version': int,
     'pillar_opts': bool,
+    'pillar_cache': bool,
+    'pillar_cache_ttl': int,
+    'pillar_cache_size': int,
+    'pillar_cache_disk': bool,
     'peer': dict,
     'syndic_master': str,
+    'syndic_batch_size': int,
+    'syndic_batch_window': float,
     'runner_dirs': list,
     'client_acl': dict,
     'client_acl_blacklist': dict,
@@ -155,16 +176,22 @@ VALID_OPTS = {
     'fileserver_followsymlinks': bool,
     'fileserver_ignoresymlinks': bool,
     'fileserver_limit_traversal': bool,
+    'fileserver_watch': bool,
     'max_open_files': int,
     'auto_accept': bool,
     'master_tops': bool,
     'order_masters': bool,
     'job_cache': bool,
+    'job_cache_index': bool,
     'ext_job_cache': str,
     'master_ext_job_cache': str,
     'minion_data_cache': bool,
+    'minion_data_index': bool,
+    'skip_disconnected_minions': bool,
     'publish_session': int,
     'reactor': list,
+    'reactor_worker_threads': int,
+    'reactor_worker_hwm': int,
     'serial': str,
     'search': str,
     'search_index_interval': int,
@@ -175,10 +202,15 @@ VALID_OPTS = {
     'win_gitrepos': list,
     'modules_max_memory': int,
     'grains_refresh_every': int,
+    'grains_threads': int,
+    'grains_timeout': float,
+    'grains_cache_ttl': dict,
     'enable_lspci': bool,
     'syndic_wait': int,
     'jinja_lstrip_blocks': bool,
     'jinja_trim_blocks': bool,
+    'jinja_bytecode_cache': bool,
+    'yaml_cache_size': int,
     'minion_id_caching': bool,
     'sign_pub_messages': bool,
     'keysize': int,
@@ -200,8 +232,13 @@ DEFAULT_MINION_OPTS = {
     'id': None,
     'cachedir': os.path.join(salt.syspaths.CACHE_DIR, 'minion'),
     'cache_jobs': False,
+    'return_batch_size': 1,
+    'return_batch_window': 0.1,
     'grains_cache': False,
     'grains_cache_expiration': 300,
+    'grains_threads': 0,
+    'grains_timeout': 0,
+    'grains_cache_ttl': {},
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'minion'),
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'minion'),
     'backup_mode': '',
@@ -226,6 +263,7 @@ DEFAULT_MINION_OPTS = {
     'disable_modules': [],
     'disable_returners': [],
     'whitelist_modules': [],
+    'lazy_loader': False,
     'module_dirs': [],
     'returner_dirs': [],
     'grains_dirs': [],
@@ -240,6 +278,7 @@ DEFAULT_MINION_OPTS = {
     'ipc_mode': 'ipc',
     'ipv6': False,
     'file_buffer_size': 262144,
+    'file_transfer_window': 4,
     'tcp_pub_port': 4510,
     'tcp_pull_port': 4511,
     'log_file': os.path.join(salt.syspaths.LOGS_DIR, 'minion'),
@@ -257,6 +296,10 @@ DEFAULT_MINION_OPTS = {
     'state_output': 'full',
     'state_auto_order': True,
     'state_events': True,
+    'state_parallel': False,
+    'state_parallel_workers': 4,
+    'jinja_bytecode_cache': True,
+    'yaml_cache_size': 100,
     'acceptance_wait_time': 10,
     'acceptance_wait_time_max': 0,
     'loop_interval': 1,
@@ -285,15 +328,22 @@ DEFAULT_MINION_OPTS = {
     'salt_transport': 'zeromq',
     'auth_timeout': 3,
     'random_master': False,
+    'zmq_filtering': False,
 }
 
 DEFAULT_MASTER_OPTS = {
     'interface': '0.0.0.0',
     'publish_port': '4505',
     'pub_hwm': 1000,
+    'zmq_filtering': False,
     'auth_mode': 1,
+    'auth_rate': 0,
+    'auth_key_cache_size': 10000,
     'user': 'root',
     'worker_threads': 5,
+    'worker_pool_threads': 0,
+    'master_stats': False,
+    'master_stats_event_iter': 60,
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'master'),
     'ret_port': '4506',
     'timeout': 5,
@@ -313,6 +363,7 @@ DEFAULT_MASTER_OPTS = {
     'gitfs_remotes': [],
     'gitfs_root': '',
     'gitfs_base': 'master',
+    'gitfs_update_threads': 4,
     'hgfs_remotes': [],
     'hgfs_root': '',
     'hgfs_base': 'default',
@@ -322,8 +373,14 @@ DEFAULT_MASTER_OPTS = {
     'ext_pillar': [],
     'pillar_version': 2,
     'pillar_opts': True,
+    'pillar_cache': False,
+    'pillar_cache_ttl': 3600,
+    'pillar_cache_size': 10000,
+    'pillar_cache_disk': False,
     'peer': {},
     'syndic_master': '',
+    'syndic_batch_size': 500,
+    'syndic_batch_window': 0.5,
     'runner_dirs': [],
     'outputter_dirs': [],
     'client_acl': {},
@@ -332,12 +389,15 @@ DEFAULT_MASTER_OPTS = {
     'token_expire': 43200,
     'file_recv': False,
     'file_buffer_size': 1048576,
+    'file_transfer_window_max': 16,
+    'file_sync_max_size': 16777216,
     'file_ignore_regex': None,
     'file_ignore_glob': None,
     'fileserver_backend': ['roots'],
     'fileserver_followsymlinks': True,
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
+    'fileserver_watch': True,
     'max_open_files': 100000,
     'hash_type': 'md5',
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'master'),
@@ -350,9 +410,12 @@ DEFAULT_MASTER_OPTS = {
     'external_nodes': '',
     'order_masters': False,
     'job_cache': True,
+    'job_cache_index': False,
     'ext_job_cache': '',
     'master_ext_job_cache': '',
     'minion_data_cache': True,
+    'minion_data_index': True,
+    'skip_disconnected_minions': False,
     'enforce_mine_cache': False,
     'ipv6': False,
     'log_file': os.path.join(salt.syspaths.LOGS_DIR, 'master'),
@@ -369,6 +432,8 @@ DEFAULT_MASTER_OPTS = {
     'cluster_mode': 'paranoid',
     'range_server': 'range:80',
     'reactor': [],
+    'reactor_worker_threads': 10,
+    'reactor_worker_hwm': 10000,
     'serial': 'msgpack',
     'state_verbose': True,
     'state_output': 'full',
@@ -392,6 +457,8 @@ DEFAULT_MASTER_OPTS = {
     'syndic_wait': 1,
     'jinja_lstrip_blocks': False,
     'jinja_trim_blocks': False,
+    'jinja_bytecode_cache': True,
+    'yaml_cache_size': 100,
     'sign_pub_messages': False,
     'keysize': 4096,
     'salt_transport': 'zeromq',
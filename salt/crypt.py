@@ -16,7 +16,7 @@ import logging
 
 # Import third party libs
 try:
-    from M2Crypto import RSA, EVP
+    from M2Crypto import RSA, EVP, BIO
     from Crypto.Cipher import AES
 except ImportError:
     # No need for crypt in local mode
@@ -27,6 +27,7 @@ import salt.utils
 import salt.payload
 import salt.utils.verify
 import salt.version
+from salt.utils.odict import OrderedDict
 from salt.exceptions import (
     AuthenticationError, SaltClientError, SaltReqTimeoutError
 )
@@ -140,6 +141,49 @@ def verify_signature(pubkey_path, message, signature):
     return result
 
 
+class PubKeyCache(object):
+    '''
+    A least recently used cache of the minion public keys read by the master.
+    The keys are stored with the mtime of their file and are read again when
+    the file changes, the RSA object of a key is only created when it is
+    first used.
+    '''
+    def __init__(self, size=10000):
+        self.size = size
+        self.keys = OrderedDict()
+
+    def _entry(self, path):
+        '''
+        Return the cache entry of the key file, a list of the mtime, the key
+        string and the RSA object
+        '''
+        mtime = os.stat(path).st_mtime
+        entry = self.keys.pop(path, None)
+        if entry is None or entry[0] != mtime:
+            with salt.utils.fopen(path, 'r') as fp_:
+                entry = [mtime, fp_.read(), None]
+        self.keys[path] = entry
+        while len(self.keys) > self.size:
+            self.keys.popitem(last=False)
+        return entry
+
+    def read(self, path):
+        '''
+        Return the contents of the key file
+        '''
+        return self._entry(path)[1]
+
+    def rsa(self, path):
+        '''
+        Return the RSA public key object of the key file, raises RSA.RSAError
+        if the key is corrupt
+        '''
+        entry = self._entry(path)
+        if entry[2] is None:
+            entry[2] = RSA.load_pub_key_bio(BIO.MemoryBuffer(entry[1]))
+        return entry[2]
+
+
 class MasterKeys(dict):
     '''
     The Master Keys class is used to manage the public key pair used for
@@ -350,16 +394,36 @@ class Auth(object):
         sreq = salt.payload.SREQ(
             self.opts['master_uri'],
         )
-        try:
-            payload = sreq.send_auto(
-                self.minion_sign_in_payload(),
-                timeout=timeout
+        # Do not wait on a busy master for longer than the minion would wait
+        # between two authentication attempts
+        retry_until = time.time() + max(
+            self.opts.get('acceptance_wait_time', 10),
+            self.opts.get('acceptance_wait_time_max', 0) or 0)
+        while True:
+            try:
+                payload = sreq.send_auto(
+                    self.minion_sign_in_payload(),
+                    timeout=timeout
+                )
+            except SaltReqTimeoutError as e:
+                if safe:
+                    log.warning('SaltReqTimeoutError: {0}'.format(e))
+                    return 'retry'
+                raise SaltClientError
+            load = payload.get('load') if isinstance(payload, dict) else None
+            if not isinstance(load, dict) or not load.get('retry_after'):
+                break
+            # The master is limiting the rate of authentications
+            retry_after = min(load['retry_after'], retry_until - time.time())
+            if retry_after <= 0:
+                # Fall through to the pending key reply the retry_after
+                # reply doubles as, the caller waits and retries
+                break
+            log.info(
+                'The Salt Master is busy, retrying authentication in {0:.1f} '
+                'seconds'.format(retry_after)
             )
-        except SaltReqTimeoutError as e:
-            if safe:
-                log.warning('SaltReqTimeoutError: {0}'.format(e))
-                return 'retry'
-            raise SaltClientError
+            time.sleep(retry_after)
 
         if 'load' in payload:
             if 'ret' in payload['load']:
@@ -372,6 +436,12 @@ class Auth(object):
                         'clean out the keys. The Salt Minion will now exit.'
                     )
                     sys.exit(0)
+                elif payload['load'].get('retry_after'):
+                    log.warning(
+                        'The Salt Master is still busy, this salt minion will '
+                        'wait before attempting to re-authenticate'
+                    )
+                    return 'retry'
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
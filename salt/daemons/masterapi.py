@@ -38,6 +38,7 @@ import salt.utils.event
 import salt.utils.verify
 import salt.utils.minions
 import salt.utils.gzip_util
+import salt.utils.jobindex
 from salt.utils.event import tagify
 from salt.exceptions import SaltMasterError
 
@@ -73,11 +74,19 @@ def clean_old_jobs(opts):
     '''
     if opts['keep_jobs'] != 0:
         jid_root = os.path.join(opts['cachedir'], 'jobs')
-        cur = '{0:%Y%m%d%H}'.format(datetime.datetime.now())
+        now = datetime.datetime.now()
+        cur = '{0:%Y%m%d%H}'.format(now)
+        oldest = '{0:%Y%m%d%H}'.format(
+                now - datetime.timedelta(hours=opts['keep_jobs']))
 
         if os.path.exists(jid_root):
             for top in os.listdir(jid_root):
                 t_path = os.path.join(jid_root, top)
+                if len(top) == 10 and top.isdigit():
+                    # An hour of jobs, drop it as a whole once it expires
+                    if top < oldest:
+                        shutil.rmtree(t_path)
+                    continue
                 for final in os.listdir(t_path):
                     f_path = os.path.join(t_path, final)
                     jid_file = os.path.join(f_path, 'jid')
@@ -91,6 +100,9 @@ def clean_old_jobs(opts):
                     elif int(cur) - int(jid[:10]) > \
                             opts['keep_jobs']:
                         shutil.rmtree(f_path)
+        index = salt.utils.jobindex.get_index(opts)
+        if index is not None:
+            index.expire(oldest)
 
 
 def access_keys(opts):
@@ -170,6 +182,7 @@ class RemoteFuncs(object):
         self.event = salt.utils.event.MasterEvent(self.opts['sock_dir'])
         self.serial = salt.payload.Serial(opts)
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.job_index = salt.utils.jobindex.get_index(opts)
         # Create the tops dict for loading external top data
         self.tops = salt.loader.tops(self.opts)
         # Make a client
@@ -187,6 +200,7 @@ class RemoteFuncs(object):
         '''
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._serve_dir = fs_.serve_dir
         self._file_hash = fs_.file_hash
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
@@ -414,16 +428,12 @@ class RemoteFuncs(object):
                 self.mminion.functions)
         data = pillar.compile_pillar()
         if self.opts.get('minion_data_cache', False):
-            cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
-            if not os.path.isdir(cdir):
-                os.makedirs(cdir)
-            datap = os.path.join(cdir, 'data.p')
-            with salt.utils.fopen(datap, 'w+b') as fp_:
-                fp_.write(
-                        self.serial.dumps(
-                            {'grains': load['grains'],
-                             'pillar': data})
-                            )
+            salt.utils.minions.store_minion_data(
+                    self.opts,
+                    load['id'],
+                    load['grains'],
+                    data,
+                    self.serial)
         return data
 
     def _minion_event(self, load):
@@ -503,6 +513,8 @@ class RemoteFuncs(object):
                 os.path.join(hn_dir, 'return.p'), 'w+b'
             )
         )
+        if self.job_index is not None:
+            self.job_index.add_return(load['jid'], load['id'])
         if 'out' in load:
             self.serial.dump(
                 load['out'],
@@ -532,6 +544,8 @@ class RemoteFuncs(object):
             if 'load' in load:
                 with salt.utils.fopen(os.path.join(jid_dir, '.load.p'), 'w+b') as fp_:
                     self.serial.dump(load['load'], fp_)
+                if self.job_index is not None:
+                    self.job_index.add_job(load['jid'], load['load'])
         wtag = os.path.join(jid_dir, 'wtag_{0}'.format(load['id']))
         try:
             with salt.utils.fopen(wtag, 'w+') as fp_:
@@ -764,6 +778,7 @@ class LocalFuncs(object):
         self.local = salt.client.LocalClient(self.opts['conf_file'])
         # Make an minion checker object
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.job_index = salt.utils.jobindex.get_index(opts)
         # Make an Auth object
         self.loadauth = salt.auth.LoadAuth(opts)
         # Stand up the master Minion to access returner data
@@ -1311,6 +1326,8 @@ class LocalFuncs(object):
                 minions,
                 salt.utils.fopen(os.path.join(jid_dir, '.minions.p'), 'w+b')
                 )
+        if self.job_index is not None:
+            self.job_index.add_job(load['jid'], load, minions)
         if self.opts['ext_job_cache']:
             try:
                 fstr = '{0}.save_load'.format(self.opts['ext_job_cache'])
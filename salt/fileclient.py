@@ -10,6 +10,7 @@ import hashlib
 import os
 import shutil
 import subprocess
+import threading
 
 # Import third party libs
 import yaml
@@ -160,6 +161,10 @@ class Client(object):
         ret = []
         if isinstance(paths, str):
             paths = paths.split(',')
+        if paths and all(path.startswith('salt://') for path in paths):
+            return self._cache_batch(
+                    saltenv,
+                    paths=[self._check_proto(path) for path in paths])
         for path in paths:
             ret.append(self.cache_file(path, saltenv))
         return ret
@@ -178,10 +183,7 @@ class Client(object):
             # Backwards compatibility
             saltenv = env
 
-        ret = []
-        for path in self.file_list(saltenv):
-            ret.append(self.cache_file('salt://{0}'.format(path), saltenv))
-        return ret
+        return self._cache_batch(saltenv)
 
     def cache_dir(self, path, saltenv='base', include_empty=False,
                   include_pat=None, exclude_pat=None, env=None):
@@ -198,7 +200,6 @@ class Client(object):
             # Backwards compatibility
             saltenv = env
 
-        ret = []
         path = self._check_proto(path)
         # We want to make sure files start with this *directory*, use
         # '/' explicitly because the master (that's generating the
@@ -213,11 +214,11 @@ class Client(object):
         )
         #go through the list of all files finding ones that are in
         #the target directory and caching them
-        for fn_ in self.file_list(saltenv):
-            if fn_.strip() and fn_.startswith(path):
-                if salt.utils.check_include_exclude(
-                        fn_, include_pat, exclude_pat):
-                    ret.append(self.cache_file('salt://' + fn_, saltenv))
+        ret = self._cache_batch(
+                saltenv,
+                prefix=path,
+                include_pat=include_pat,
+                exclude_pat=exclude_pat)
 
         if include_empty:
             # Break up the path into a list containing the bottom-level
@@ -242,6 +243,21 @@ class Client(object):
                     ret.append(minion_dir)
         return ret
 
+    def _cache_batch(self, saltenv, prefix='', paths=None, include_pat=None,
+                     exclude_pat=None):
+        '''
+        Cache the files under a prefix, or the passed list of paths, and
+        return the list of locations they were cached to
+        '''
+        if paths is None:
+            paths = [fn_ for fn_ in self.file_list(saltenv)
+                     if fn_.strip() and fn_.startswith(prefix)]
+        ret = []
+        for fn_ in paths:
+            if salt.utils.check_include_exclude(fn_, include_pat, exclude_pat):
+                ret.append(self.cache_file('salt://' + fn_, saltenv))
+        return ret
+
     def cache_local_file(self, path, **kwargs):
         '''
         Cache a local file on the minion in the localfiles cache
@@ -856,11 +872,115 @@ class RemoteClient(Client):
     '''
     def __init__(self, opts):
         Client.__init__(self, opts)
-        channel = salt.transport.Channel.factory(self.opts)
+        self.auth = ''
+        self._local = threading.local()
+        channel = self._channel()
         if channel.ttype == 'zeromq':
-            self.auth = salt.crypt.SAuth(opts)
+            self.auth = channel.auth
+
+    def _channel(self):
+        '''
+        Return the channel to the master of the calling thread. The client is
+        shared through __context__, and a REQ socket can neither be used by
+        two threads at once nor across a fork, so every thread of every
+        process gets its own long-lived channel.
+        '''
+        if getattr(self._local, 'pid', None) != os.getpid():
+            kwargs = {}
+            if self.auth:
+                kwargs['auth'] = self.auth
+            self._local.channel = salt.transport.Channel.factory(
+                    self.opts,
+                    **kwargs)
+            self._local.pid = os.getpid()
+        return self._local.channel
+
+    def _reset_channel(self):
+        '''
+        Replace the channel to the master of the calling thread with a fresh
+        one on its next use
+        '''
+        self._local.pid = None
+
+    def _send(self, load):
+        '''
+        Send a load to the master over the long-lived channel of the calling
+        thread, the same channel is reused for every request and file chunk
+        '''
+        channel = self._channel()
+        try:
+            return channel.send(load)
+        except Exception:
+            # A REQ socket is left in an unknown state by a failed request,
+            # e.g. it can not be used again after a request timed out
+            self._reset_channel()
+            raise
+        finally:
+            if self.auth:
+                # The channel signs in again if the master rejected its
+                # session, keep the new one for the next channels and tokens
+                self.auth = channel.auth
+
+    def _cache_batch(self, saltenv, prefix='', paths=None, include_pat=None,
+                     exclude_pat=None):
+        '''
+        Cache the files under a prefix, or the passed list of paths, with a
+        single request to the master. The hashes of the files already in the
+        cache are sent along so the master only returns the changed files.
+        '''
+        hash_type = self.opts.get('hash_type', 'md5')
+        cache_root = os.path.join(self.opts['cachedir'], 'files', saltenv)
+        if paths is None:
+            cached = []
+            for root, dirs, files in os.walk(
+                    os.path.join(cache_root, os.path.dirname(prefix))):
+                for name in files:
+                    rel = os.path.relpath(os.path.join(root, name), cache_root)
+                    if rel.startswith(prefix):
+                        cached.append(rel)
+        else:
+            cached = [path for path in paths
+                      if os.path.isfile(os.path.join(cache_root, path))]
+        hashes = {}
+        for path in cached:
+            hashes[path] = salt.utils.get_hash(
+                os.path.join(cache_root, path), form=hash_type)
+        load = {'saltenv': saltenv,
+                'hashes': hashes,
+                'hash_type': hash_type,
+                'include_pat': include_pat,
+                'exclude_pat': exclude_pat,
+                'cmd': '_serve_dir'}
+        if paths is None:
+            load['prefix'] = prefix
         else:
-            self.auth = ''
+            load['paths'] = paths
+        try:
+            data = self._send(load)
+        except SaltReqTimeoutError:
+            data = None
+        if not isinstance(data, dict) or 'paths' not in data:
+            # The master does not know how to serve directories, fall back to
+            # fetching the files one at a time
+            return Client._cache_batch(
+                    self, saltenv, prefix, paths, include_pat, exclude_pat)
+        for path, content in data['files'].items():
+            with self._cache_loc(path, saltenv) as cache_dest:
+                if os.path.isdir(cache_dest):
+                    salt.utils.rm_rf(cache_dest)
+                with salt.utils.fopen(cache_dest, 'wb+') as fp_:
+                    fp_.write(content)
+        fetch = set(data['fetch'])
+        dests = {}
+        for path in data['paths']:
+            if path in fetch:
+                dests[path] = self.cache_file('salt://' + path, saltenv)
+            else:
+                with self._cache_loc(path, saltenv) as cache_dest:
+                    dests[path] = cache_dest
+        if paths is None:
+            return [dests[path] for path in data['paths']]
+        return [dests.get(path, '') for path in paths]
 
     def get_file(self,
                  path,
@@ -918,6 +1038,11 @@ class RemoteClient(Client):
         if gzip:
             gzip = int(gzip)
             load['gzip'] = gzip
+        window = self.opts.get('file_transfer_window', 1)
+        if window > 1:
+            # Masters which do not know about windows reply with a single
+            # chunk, the next request always starts where the file ends
+            load['window'] = window
 
         fn_ = None
         if dest:
@@ -934,10 +1059,7 @@ class RemoteClient(Client):
             else:
                 load['loc'] = fn_.tell()
             try:
-                channel = salt.transport.Channel.factory(
-                        self.opts,
-                        auth=self.auth)
-                data = channel.send(load)
+                data = self._send(load)
             except SaltReqTimeoutError:
                 return ''
 
@@ -1002,10 +1124,7 @@ class RemoteClient(Client):
                 'prefix': prefix,
                 'cmd': '_file_list'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1027,10 +1146,7 @@ class RemoteClient(Client):
                 'prefix': prefix,
                 'cmd': '_file_list_emptydirs'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            channel.send(load)
+            self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1052,10 +1168,7 @@ class RemoteClient(Client):
                 'prefix': prefix,
                 'cmd': '_dir_list'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1067,10 +1180,7 @@ class RemoteClient(Client):
                 'prefix': prefix,
                 'cmd': '_symlink_list'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1107,10 +1217,7 @@ class RemoteClient(Client):
                 'saltenv': saltenv,
                 'cmd': '_file_hash'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1131,10 +1238,7 @@ class RemoteClient(Client):
         load = {'saltenv': saltenv,
                 'cmd': '_file_list'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1144,10 +1248,7 @@ class RemoteClient(Client):
         '''
         load = {'cmd': '_master_opts'}
         try:
-            channel = salt.transport.Channel.factory(
-                    self.opts,
-                    auth=self.auth)
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
 
@@ -1156,15 +1257,12 @@ class RemoteClient(Client):
         Return the metadata derived from the external nodes system on the
         master.
         '''
-        channel = salt.transport.Channel.factory(
-                self.opts,
-                auth=self.auth)
         load = {'cmd': '_ext_nodes',
                 'id': self.opts['id'],
                 'opts': self.opts}
         if self.auth:
             load['tok'] = self.auth.gen_token('salt')
         try:
-            return channel.send(load)
+            return self._send(load)
         except SaltReqTimeoutError:
             return ''
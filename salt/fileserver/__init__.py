@@ -132,6 +132,21 @@ def diff_mtime_map(map1, map2):
     return False
 
 
+def serve_chunk_size(opts, load):
+    '''
+    Return the number of bytes to send back for a serve_file request. A
+    minion may ask for a window of several file_buffer_size chunks in a
+    single reply, bounded by the file_transfer_window_max master option.
+    Minions which do not ask for a window get a single chunk.
+    '''
+    try:
+        window = int(load.get('window', 1))
+    except (TypeError, ValueError):
+        window = 1
+    window = max(1, min(window, opts.get('file_transfer_window_max', 16)))
+    return opts['file_buffer_size'] * window
+
+
 def reap_fileserver_cache_dir(cache_base, find_func):
     '''
     Remove unused cache items assuming the cache directory follows a directory convention:
@@ -325,6 +340,93 @@ class Fileserver(object):
             return self.servers[fstr](load, fnd)
         return ret
 
+    def _read_file(self, path, saltenv, limit):
+        '''
+        Return the full content of a file through its backend's serve_file,
+        or None if the file is larger than limit bytes
+        '''
+        fnd = self.find_file(path, saltenv)
+        if not fnd.get('back'):
+            return None
+        fstr = '{0}.serve_file'.format(fnd['back'])
+        if fstr not in self.servers:
+            return None
+        try:
+            if os.stat(fnd['path']).st_size > limit:
+                # Do not read in a file only to throw it away
+                return None
+        except (KeyError, OSError):
+            pass
+        load = {'path': path,
+                'saltenv': saltenv,
+                'loc': 0,
+                'window': self.opts.get('file_transfer_window_max', 16)}
+        chunks = []
+        while True:
+            data = self.servers[fstr](load, fnd).get('data')
+            if not data:
+                break
+            load['loc'] += len(data)
+            if load['loc'] > limit:
+                return None
+            chunks.append(data)
+        return ''.join(chunks)
+
+    def serve_dir(self, load):
+        '''
+        Serve up, in a single reply, the files under a prefix (or in a list
+        of paths) whose hash differs from the hash the minion sent for them.
+        Files which do not fit in file_sync_max_size are listed under
+        ``fetch`` to be downloaded with serve_file instead.
+        '''
+        ret = {'paths': [],
+               'files': {},
+               'fetch': []}
+        if 'env' in load:
+            salt.utils.warn_until(
+                'Boron',
+                'Passing a salt environment should be done using \'saltenv\' '
+                'not \'env\'. This functionality will be removed in Salt '
+                'Boron.'
+            )
+            load['saltenv'] = load.pop('env')
+
+        if 'saltenv' not in load:
+            return ret
+        saltenv = load['saltenv']
+        if 'paths' in load:
+            paths = load['paths']
+        else:
+            prefix = load.get('prefix', '')
+            paths = [
+                fn_ for fn_ in self.file_list({'saltenv': saltenv,
+                                               'prefix': prefix})
+                if fn_.startswith(prefix)
+            ]
+        hashes = load.get('hashes', {})
+        remaining = self.opts.get('file_sync_max_size', 16777216)
+        for path in paths:
+            if not salt.utils.check_include_exclude(
+                    path,
+                    load.get('include_pat'),
+                    load.get('exclude_pat')):
+                continue
+            hsum = self.file_hash({'path': path, 'saltenv': saltenv})
+            if not hsum:
+                continue
+            ret['paths'].append(path)
+            if hsum.get('hash_type') == load.get('hash_type') \
+                    and hsum.get('hsum') == hashes.get(path):
+                # The minion already has this file
+                continue
+            data = self._read_file(path, saltenv, remaining)
+            if data is None:
+                ret['fetch'].append(path)
+                continue
+            remaining -= len(data)
+            ret['files'][path] = data
+        return ret
+
     def file_hash(self, load):
         '''
         Return the hash of a given file
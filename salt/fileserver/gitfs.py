@@ -49,6 +49,7 @@ to specify which provider should be used.
 '''
 
 # Import python libs
+import binascii
 import distutils.version  # pylint: disable=E0611
 import glob
 import hashlib
@@ -56,8 +57,11 @@ import logging
 import os
 import re
 import shutil
+import stat
 import subprocess
+import threading
 import time
+from multiprocessing.pool import ThreadPool
 
 VALID_PROVIDERS = ('gitpython', 'pygit2', 'dulwich')
 PYGIT2_TRANSPORTS = ('http', 'https', 'file')
@@ -85,6 +89,7 @@ import salt.utils
 import salt.fileserver
 from salt.exceptions import SaltException
 from salt.utils.event import tagify
+from salt.utils.odict import OrderedDict
 
 # Import third party libs
 HAS_GITPYTHON = False
@@ -117,6 +122,24 @@ log = logging.getLogger(__name__)
 # Define the module's virtual name
 __virtualname__ = 'git'
 
+# The mode of the tree entries of submodules
+S_IFGITLINK = 0160000
+
+# The repos opened by init(), kept for the life of the thread which opened
+# them since the repo objects of the providers are not thread safe
+_LOCAL = threading.local()
+
+# The indexes of the trees, shared by the threads. An index maps (repo dir,
+# ref, gitfs_root) to the id of the tree it was built from and the files and
+# dirs found below gitfs_root. The refs come from the minions, so only the
+# TREE_INDEX_SIZE most recently used indexes are kept.
+TREE_INDEX_SIZE = 100
+_TREE_INDEXES = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+# The locks held while a repo is fetched, keyed on the repo dir
+_UPDATE_LOCKS = {}
+
 
 def _verify_gitpython(quiet=False):
     '''
@@ -395,6 +418,143 @@ def _get_tree_dulwich(repo, short):
     return False
 
 
+def _index_tree_gitpython(repo, tree, gitfs_root, index):
+    '''
+    Add the files and dirs of a git.Tree object to the index
+    '''
+    for obj in tree.traverse():
+        relpath = obj.path
+        if gitfs_root:
+            relpath = os.path.relpath(relpath, gitfs_root)
+        if isinstance(obj, git.Blob):
+            index['files'][relpath] = obj.hexsha
+        elif isinstance(obj, git.Tree):
+            index['dirs'].add(relpath)
+            if not len(obj):
+                index['empty_dirs'].add(relpath)
+
+
+def _index_tree_pygit2(repo, tree, prefix, index):
+    '''
+    Add the files and dirs of a pygit2.Tree object to the index, only the
+    trees are read from the object store
+    '''
+    for entry in tree:
+        relpath = os.path.join(prefix, entry.name)
+        if stat.S_ISDIR(entry.filemode):
+            subtree = repo[entry.oid]
+            index['dirs'].add(relpath)
+            if len(subtree):
+                _index_tree_pygit2(repo, subtree, relpath, index)
+            else:
+                index['empty_dirs'].add(relpath)
+        elif stat.S_IFMT(entry.filemode) != S_IFGITLINK:
+            index['files'][relpath] = entry.hex
+
+
+def _index_tree_dulwich(repo, tree, prefix, index):
+    '''
+    Add the files and dirs of a dulwich.objects.Tree object to the index, only
+    the trees are read from the object store
+    '''
+    for item in tree.items():
+        relpath = os.path.join(prefix, item.path)
+        if stat.S_ISDIR(item.mode):
+            subtree = repo.get_object(item.sha)
+            index['dirs'].add(relpath)
+            if len(subtree):
+                _index_tree_dulwich(repo, subtree, relpath, index)
+            else:
+                index['empty_dirs'].add(relpath)
+        elif stat.S_IFMT(item.mode) != S_IFGITLINK:
+            index['files'][relpath] = item.sha
+
+
+def _build_index(repo, provider, tree, gitfs_root):
+    '''
+    Return the index of the files and dirs below gitfs_root in the tree. The
+    paths are relative to gitfs_root, the files map to the SHA of their blob.
+    '''
+    index = {'files': {}, 'dirs': set(), 'empty_dirs': set()}
+    if provider == 'gitpython':
+        if gitfs_root:
+            try:
+                tree = tree / gitfs_root
+            except KeyError:
+                return index
+            if not isinstance(tree, git.Tree):
+                return index
+        _index_tree_gitpython(repo, tree, gitfs_root, index)
+    elif provider == 'pygit2':
+        if gitfs_root:
+            try:
+                tree = repo[tree[gitfs_root].oid]
+            except KeyError:
+                return index
+            if not isinstance(tree, pygit2.Tree):
+                return index
+        _index_tree_pygit2(repo, tree, '', index)
+    elif provider == 'dulwich':
+        if gitfs_root:
+            try:
+                tree = repo.get_object(tree[gitfs_root][1])
+            except KeyError:
+                return index
+            if not isinstance(tree, dulwich.objects.Tree):
+                return index
+        _index_tree_dulwich(repo, tree, '', index)
+    return index
+
+
+def _tree_index(repo, provider, short):
+    '''
+    Return the index of the tree of the branch/tag/SHA in the repo, or None if
+    it is not found. The index is built again only when the ref has moved.
+    '''
+    if provider == 'gitpython':
+        tree = _get_tree_gitpython(repo, short)
+        repo_dir = repo.working_dir
+        tree_id = tree.hexsha if tree else None
+    elif provider == 'pygit2':
+        tree = _get_tree_pygit2(repo, short)
+        repo_dir = repo.workdir
+        tree_id = tree.hex if tree else None
+    elif provider == 'dulwich':
+        tree = _get_tree_dulwich(repo, short)
+        repo_dir = repo.path
+        tree_id = tree.id if tree else None
+    else:
+        return None
+    if not tree:
+        return None
+    gitfs_root = __opts__['gitfs_root']
+    key = (repo_dir, short, gitfs_root)
+    with _CACHE_LOCK:
+        cached = _TREE_INDEXES.pop(key, None)
+        if cached is not None and cached[0] == tree_id:
+            _TREE_INDEXES[key] = cached
+            return cached[1]
+    index = _build_index(repo, provider, tree, gitfs_root)
+    with _CACHE_LOCK:
+        _TREE_INDEXES.pop(key, None)
+        _TREE_INDEXES[key] = (tree_id, index)
+        while len(_TREE_INDEXES) > TREE_INDEX_SIZE:
+            _TREE_INDEXES.popitem(last=False)
+    return index
+
+
+def _write_blob(repo, provider, blob_hexsha, fp_):
+    '''
+    Write the blob with the given SHA from the object store of the repo to fp_
+    '''
+    if provider == 'gitpython':
+        git.Blob(repo, binascii.unhexlify(blob_hexsha)).stream_data(fp_)
+    elif provider == 'pygit2':
+        fp_.write(repo[blob_hexsha].data)
+    elif provider == 'dulwich':
+        fp_.write(repo.get_object(blob_hexsha).as_raw_string())
+
+
 def _wait_lock(lk_fn, dest):
     '''
     If the write lock is there, check to see if the file is actually being
@@ -459,7 +619,29 @@ def _stale_refs_pygit2(repo):
 
 def init():
     '''
-    Return the git repo object for this session
+    Return the git repo objects for this session. The repos are opened once
+    per thread and kept for the life of the thread.
+    '''
+    key = (_get_provider(),
+           __opts__['cachedir'],
+           tuple(__opts__['gitfs_remotes']),
+           __opts__.get('gitfs_ssl_verify', True))
+    if getattr(_LOCAL, 'pid', None) != os.getpid():
+        _LOCAL.pid = os.getpid()
+        _LOCAL.repos = {}
+    if key in _LOCAL.repos:
+        return list(_LOCAL.repos[key])
+    repos, complete = _init_repos()
+    if complete:
+        # Repos which failed to initialize are tried again on the next call
+        _LOCAL.repos[key] = repos
+    return list(repos)
+
+
+def _init_repos():
+    '''
+    Open the git repos, initializing the ones which are not in the cachedir
+    yet. Returns the repos and whether all the remotes were initialized.
     '''
     bp_ = os.path.join(__opts__['cachedir'], 'gitfs')
     provider = _get_provider()
@@ -471,11 +653,13 @@ def init():
     # ignore git ssl verification if requested
     ssl_verify = 'true' if __opts__.get('gitfs_ssl_verify', True) else 'false'
     repos = []
+    failed = False
     for _, opt in enumerate(__opts__['gitfs_remotes']):
         if provider == 'pygit2':
             transport, _, uri = opt.partition('://')
             if not uri:
                 log.error('Invalid gitfs remote {0!r}'.format(opt))
+                failed = True
                 continue
             elif transport.lower() not in PYGIT2_TRANSPORTS:
                 log.error(
@@ -483,6 +667,7 @@ def init():
                     'transports for pygit2 provider: {2}'
                     .format(transport, opt, ', '.join(PYGIT2_TRANSPORTS))
                 )
+                failed = True
                 continue
 
         repo_hash = hashlib.md5(opt).hexdigest()
@@ -499,6 +684,7 @@ def init():
                         repo = git.Repo(rp_)
                     except git.exc.InvalidGitRepositoryError:
                         log.error(invalid_repo.format(rp_, opt))
+                        failed = True
                         continue
                 if not repo.remotes:
                     try:
@@ -512,6 +698,8 @@ def init():
                         pass
                 if repo.remotes:
                     repos.append(repo)
+                else:
+                    failed = True
 
             elif provider == 'pygit2':
                 if not os.listdir(rp_):
@@ -521,6 +709,7 @@ def init():
                         repo = pygit2.Repository(rp_)
                     except KeyError:
                         log.error(invalid_repo.format(rp_, opt))
+                        failed = True
                         continue
                 if not repo.remotes:
                     try:
@@ -532,6 +721,8 @@ def init():
                         pass
                 if repo.remotes:
                     repos.append(repo)
+                else:
+                    failed = True
 
             elif provider == 'dulwich':
                 if not os.listdir(rp_):
@@ -556,6 +747,7 @@ def init():
                         repo = dulwich.repo.Repo(rp_)
                     except dulwich.repo.NotGitRepository:
                         log.error(invalid_repo.format(rp_, opt))
+                        failed = True
                         continue
                 # No way to interact with remotes, so just assume success
                 repos.append(repo)
@@ -567,7 +759,7 @@ def init():
                     'Unexpected gitfs_provider {0!r}. This is probably a bug.'
                     .format(provider)
                 )
-                return []
+                return [], False
 
         except Exception as exc:
             msg = ('Exception caught while initializing the repo for gitfs: '
@@ -575,9 +767,10 @@ def init():
             if provider == 'gitpython':
                 msg += ' Perhaps git is not available.'
             log.error(msg)
+            failed = True
             continue
 
-    return repos
+    return repos, not failed
 
 
 def purge_cache():
@@ -601,40 +794,36 @@ def purge_cache():
     return False
 
 
-def update():
-    '''
-    Execute a git pull on all of the repos
-    '''
-    # data for the fileserver event
-    data = {'changed': False,
-            'backend': 'gitfs'}
-    provider = _get_provider()
-    pid = os.getpid()
-    data['changed'] = purge_cache()
-    repos = init()
-    for repo in repos:
-        if provider == 'gitpython':
-            origin = repo.remotes[0]
-            working_dir = repo.working_dir
-        elif provider == 'pygit2':
-            origin = repo.remotes[0]
-            working_dir = repo.workdir
-        elif provider == 'dulwich':
-            # origin is just a uri here, there is no origin object
-            origin = _dulwich_remote(repo)
-            working_dir = repo.path
-        lk_fn = os.path.join(working_dir, 'update.lk')
+def _update_repo(repo, provider):
+    '''
+    Fetch a repo from its remote, returns True if new objects were fetched
+    '''
+    changed = False
+    if provider == 'gitpython':
+        origin = repo.remotes[0]
+        working_dir = repo.working_dir
+    elif provider == 'pygit2':
+        origin = repo.remotes[0]
+        working_dir = repo.workdir
+    elif provider == 'dulwich':
+        # origin is just a uri here, there is no origin object
+        origin = _dulwich_remote(repo)
+        working_dir = repo.path
+    with _CACHE_LOCK:
+        update_lock = _UPDATE_LOCKS.setdefault(working_dir, threading.Lock())
+    lk_fn = os.path.join(working_dir, 'update.lk')
+    with update_lock:
         with salt.utils.fopen(lk_fn, 'w+') as fp_:
-            fp_.write(str(pid))
+            fp_.write(str(os.getpid()))
         try:
             if provider == 'gitpython':
                 for fetch in origin.fetch():
                     if fetch.old_commit is not None:
-                        data['changed'] = True
+                        changed = True
             elif provider == 'pygit2':
                 fetch = origin.fetch()
                 if fetch.get('received_objects', 0):
-                    data['changed'] = True
+                    changed = True
             elif provider == 'dulwich':
                 client, path = \
                     dulwich.client.get_transport_and_path_from_url(
@@ -648,9 +837,8 @@ def update():
                         'gitfs remote {0!r} is an empty repository and will '
                         'be skipped.'.format(origin)
                     )
-                    continue
-                if refs_pre != refs_post:
-                    data['changed'] = True
+                elif refs_pre != refs_post:
+                    changed = True
                     # Update local refs
                     for ref in _dulwich_env_refs(refs_post):
                         repo[ref] = refs_post[ref]
@@ -662,10 +850,39 @@ def update():
             log.warning(
                 'Exception caught while fetching: {0}'.format(exc)
             )
+        finally:
+            try:
+                os.remove(lk_fn)
+            except (IOError, OSError):
+                pass
+    return changed
+
+
+def update():
+    '''
+    Execute a git fetch on all of the repos, the repos are fetched
+    concurrently by gitfs_update_threads threads
+    '''
+    # data for the fileserver event
+    data = {'changed': False,
+            'backend': 'gitfs'}
+    provider = _get_provider()
+    data['changed'] = purge_cache()
+    repos = init()
+    threads = min(len(repos), __opts__.get('gitfs_update_threads', 4))
+    if threads > 1:
+        pool = ThreadPool(threads)
         try:
-            os.remove(lk_fn)
-        except (IOError, OSError):
-            pass
+            results = pool.map(
+                lambda repo: _update_repo(repo, provider), repos, chunksize=1
+            )
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [_update_repo(repo, provider) for repo in repos]
+    if any(results):
+        data['changed'] = True
 
     env_cache = os.path.join(__opts__['cachedir'], 'gitfs/envs.p')
     if data.get('changed', False) is True or not os.path.isfile(env_cache):
@@ -799,6 +1016,27 @@ def find_file(path, short='base', **kwargs):
 
     if short == 'base':
         short = base_branch
+    repos = init()
+    if 'index' in kwargs:
+        try:
+            repos = [repos[int(kwargs['index'])]]
+        except IndexError:
+            # Invalid index param
+            return fnd
+        except ValueError:
+            # Invalid index option
+            return fnd
+    for repo in repos:
+        index = _tree_index(repo, provider, short)
+        if index is None:
+            # Branch/tag/SHA not found in repo, try the next
+            continue
+        blob_hexsha = index['files'].get(local_path)
+        if blob_hexsha is not None:
+            break
+    else:
+        return fnd
+
     dest = os.path.join(__opts__['cachedir'], 'gitfs/refs', short, path)
     hashes_glob = os.path.join(__opts__['cachedir'],
                                'gitfs/hash',
@@ -818,93 +1056,33 @@ def find_file(path, short='base', **kwargs):
         os.makedirs(destdir)
     if not os.path.isdir(hashdir):
         os.makedirs(hashdir)
-    repos = init()
-    if 'index' in kwargs:
-        try:
-            repos = [repos[int(kwargs['index'])]]
-        except IndexError:
-            # Invalid index param
-            return fnd
-        except ValueError:
-            # Invalid index option
-            return fnd
-    for repo in repos:
-        if provider == 'gitpython':
-            tree = _get_tree_gitpython(repo, short)
-            if not tree:
-                # Branch/tag/SHA not found in repo, try the next
-                continue
-            try:
-                blob = tree / path
-            except KeyError:
-                continue
-            blob_hexsha = blob.hexsha
-
-        elif provider == 'pygit2':
-            tree = _get_tree_pygit2(repo, short)
-            if not tree:
-                # Branch/tag/SHA not found in repo, try the next
-                continue
-            try:
-                blob = repo[tree[path].oid]
-            except KeyError:
-                continue
-            blob_hexsha = blob.hex
 
-        elif provider == 'dulwich':
-            tree = _get_tree_dulwich(repo, short)
-            dirs, _, filename = path.rpartition(os.path.sep)
-            if dirs:
-                # Walk down the tree to get to the file
-                for parent in dirs.split(os.path.sep):
-                    try:
-                        tree = repo.get_object(tree[parent][1])
-                    except KeyError:
-                        # Directory not found. Desired path does not exist in
-                        # this tree, so move on.
-                        continue
-            if not tree:
-                # Branch/tag/SHA not found in repo, try the next
-                continue
-            try:
-                # Referencing the path in the tree returns a tuple, the
-                # second element of which is the object ID of the blob
-                blob = repo.get_object(tree[filename][1])
-            except KeyError:
-                continue
-            blob_hexsha = blob.sha().hexdigest()
-
-        _wait_lock(lk_fn, dest)
-        if os.path.isfile(blobshadest) and os.path.isfile(dest):
-            with salt.utils.fopen(blobshadest, 'r') as fp_:
-                sha = fp_.read()
-                if sha == blob_hexsha:
-                    fnd['rel'] = local_path
-                    fnd['path'] = dest
-                    return fnd
-        with salt.utils.fopen(lk_fn, 'w+') as fp_:
-            fp_.write('')
-        for filename in glob.glob(hashes_glob):
-            try:
-                os.remove(filename)
-            except Exception:
-                pass
-        with salt.utils.fopen(dest, 'w+') as fp_:
-            if provider == 'gitpython':
-                blob.stream_data(fp_)
-            elif provider == 'pygit2':
-                fp_.write(blob.data)
-            elif provider == 'dulwich':
-                fp_.write(blob.as_raw_string())
-        with salt.utils.fopen(blobshadest, 'w+') as fp_:
-            fp_.write(blob_hexsha)
+    _wait_lock(lk_fn, dest)
+    if os.path.isfile(blobshadest) and os.path.isfile(dest):
+        with salt.utils.fopen(blobshadest, 'r') as fp_:
+            sha = fp_.read()
+            if sha == blob_hexsha:
+                fnd['rel'] = local_path
+                fnd['path'] = dest
+                return fnd
+    with salt.utils.fopen(lk_fn, 'w+') as fp_:
+        fp_.write('')
+    for filename in glob.glob(hashes_glob):
         try:
-            os.remove(lk_fn)
-        except (OSError, IOError):
+            os.remove(filename)
+        except Exception:
             pass
-        fnd['rel'] = local_path
-        fnd['path'] = dest
-        return fnd
+    # Serve the blob straight from the object store of the repo
+    with salt.utils.fopen(dest, 'w+') as fp_:
+        _write_blob(repo, provider, blob_hexsha, fp_)
+    with salt.utils.fopen(blobshadest, 'w+') as fp_:
+        fp_.write(blob_hexsha)
+    try:
+        os.remove(lk_fn)
+    except (OSError, IOError):
+        pass
+    fnd['rel'] = local_path
+    fnd['path'] = dest
     return fnd
 
 
@@ -930,7 +1108,7 @@ def serve_file(load, fnd):
     gzip = load.get('gzip', None)
     with salt.utils.fopen(fnd['path'], 'rb') as fp_:
         fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
+        data = fp_.read(salt.fileserver.serve_chunk_size(__opts__, load))
         if gzip and data:
             data = salt.utils.gzip_util.compress(data, gzip)
             ret['gzip'] = gzip
@@ -1044,127 +1222,19 @@ def _get_file_list(load):
         load['saltenv'] = load.pop('env')
 
     base_branch = __opts__['gitfs_base']
-    gitfs_root = __opts__['gitfs_root']
     provider = _get_provider()
     if 'saltenv' not in load:
         return []
     if load['saltenv'] == 'base':
         load['saltenv'] = base_branch
-    repos = init()
     ret = set()
-    for repo in repos:
-        if provider == 'gitpython':
-            ret.update(
-                _file_list_gitpython(repo, load['saltenv'], gitfs_root)
-            )
-        elif provider == 'pygit2':
-            ret.update(
-                _file_list_pygit2(repo, load['saltenv'], gitfs_root)
-            )
-        elif provider == 'dulwich':
-            ret.update(
-                _file_list_dulwich(repo, load['saltenv'], gitfs_root)
-            )
+    for repo in init():
+        index = _tree_index(repo, provider, load['saltenv'])
+        if index is not None:
+            ret.update(index['files'])
     return sorted(ret)
 
 
-def _file_list_gitpython(repo, tgt, gitfs_root):
-    '''
-    Get file list using GitPython
-    '''
-    ret = set()
-    tree = _get_tree_gitpython(repo, tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = tree / gitfs_root
-        except KeyError:
-            return ret
-    for blob in tree.traverse():
-        if not isinstance(blob, git.Blob):
-            continue
-        if gitfs_root:
-            ret.add(os.path.relpath(blob.path, gitfs_root))
-            continue
-        ret.add(blob.path)
-    return ret
-
-
-def _file_list_pygit2(repo, ref_tgt, gitfs_root):
-    '''
-    Get file list using pygit2
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a pygit2 Tree object recursively, accumulating all the
-        blob paths within it in the "blobs" list
-        '''
-        for entry in iter(tree):
-            blob = repo[entry.oid]
-            if isinstance(blob, pygit2.Blob):
-                blobs.append(os.path.join(prefix, entry.name))
-            elif isinstance(blob, pygit2.Tree):
-                _traverse(blob, repo, blobs, os.path.join(prefix, entry.name))
-    ret = set()
-    tree = _get_tree_pygit2(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo[tree[gitfs_root].oid]
-        except KeyError:
-            return ret
-        if not isinstance(tree, pygit2.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
-    return ret
-
-
-def _file_list_dulwich(repo, ref_tgt, gitfs_root):
-    '''
-    Get file list using dulwich
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a dulwich Tree object recursively, accumulating all the
-        blob paths within it in the "blobs" list
-        '''
-        for item in tree.items():
-            obj = repo.get_object(item.sha)
-            if isinstance(obj, dulwich.objects.Blob):
-                blobs.append(os.path.join(prefix, item.path))
-            elif isinstance(obj, dulwich.objects.Tree):
-                _traverse(obj, repo, blobs, os.path.join(prefix, item.path))
-    ret = set()
-    tree = _get_tree_dulwich(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo.get_object(tree[gitfs_root][1])
-        except KeyError:
-            return ret
-        if not isinstance(tree, dulwich.objects.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
-    return ret
-
-
 def file_list_emptydirs(load):
     '''
     Return a list of all empty directories on the master
@@ -1185,135 +1255,16 @@ def _get_file_list_emptydirs(load):
         load['saltenv'] = load.pop('env')
 
     base_branch = __opts__['gitfs_base']
-    gitfs_root = __opts__['gitfs_root']
     provider = _get_provider()
     if 'saltenv' not in load:
         return []
     if load['saltenv'] == 'base':
         load['saltenv'] = base_branch
-    repos = init()
     ret = set()
-    for repo in repos:
-        if provider == 'gitpython':
-            ret.update(
-                _file_list_emptydirs_gitpython(
-                    repo, load['saltenv'], gitfs_root
-                )
-            )
-        elif provider == 'pygit2':
-            ret.update(
-                _file_list_emptydirs_pygit2(
-                    repo, load['saltenv'], gitfs_root
-                )
-            )
-        elif provider == 'dulwich':
-            ret.update(
-                _file_list_emptydirs_dulwich(
-                    repo, load['saltenv'], gitfs_root
-                )
-            )
-    return sorted(ret)
-
-
-def _file_list_emptydirs_gitpython(repo, tgt, gitfs_root):
-    '''
-    Get empty directories using GitPython
-    '''
-    ret = set()
-    tree = _get_tree_gitpython(repo, tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = tree / gitfs_root
-        except KeyError:
-            return ret
-    for blob in tree.traverse():
-        if not isinstance(blob, git.Tree):
-            continue
-        if not blob.blobs:
-            if __opts__['gitfs_root']:
-                ret.add(os.path.relpath(blob.path, gitfs_root))
-                continue
-            ret.add(blob.path)
-    return ret
-
-
-def _file_list_emptydirs_pygit2(repo, ref_tgt, gitfs_root):
-    '''
-    Get empty directories using pygit2
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a pygit2 Tree object recursively, accumulating all the
-        empty directories within it in the "blobs" list
-        '''
-        for entry in iter(tree):
-            blob = repo[entry.oid]
-            if not isinstance(blob, pygit2.Tree):
-                continue
-            if not len(blob):
-                blobs.append(os.path.join(prefix, entry.name))
-            else:
-                _traverse(blob, repo, blobs, os.path.join(prefix, entry.name))
-    ret = set()
-    tree = _get_tree_pygit2(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo[tree[gitfs_root].oid]
-        except KeyError:
-            return ret
-        if not isinstance(tree, pygit2.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
-    return sorted(ret)
-
-
-def _file_list_emptydirs_dulwich(repo, ref_tgt, gitfs_root):
-    '''
-    Get empty directories using dulwich
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a dulwich Tree object recursively, accumulating all the
-        empty directories within it in the "blobs" list
-        '''
-        for item in tree.items():
-            obj = repo.get_object(item.sha)
-            if not isinstance(obj, dulwich.objects.Tree):
-                continue
-            if not len(repo.get_object(item.sha)):
-                blobs.append(os.path.join(prefix, item.path))
-            else:
-                _traverse(obj, repo, blobs, os.path.join(prefix, item.path))
-    ret = set()
-    tree = _get_tree_dulwich(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo.get_object(tree[gitfs_root][1])
-        except KeyError:
-            return ret
-        if not isinstance(tree, dulwich.objects.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
+    for repo in init():
+        index = _tree_index(repo, provider, load['saltenv'])
+        if index is not None:
+            ret.update(index['empty_dirs'])
     return sorted(ret)
 
 
@@ -1337,118 +1288,14 @@ def _get_dir_list(load):
         load['saltenv'] = load.pop('env')
 
     base_branch = __opts__['gitfs_base']
-    gitfs_root = __opts__['gitfs_root']
     provider = _get_provider()
     if 'saltenv' not in load:
         return []
     if load['saltenv'] == 'base':
         load['saltenv'] = base_branch
-    repos = init()
     ret = set()
-    for repo in repos:
-        if provider == 'gitpython':
-            ret.update(_dir_list_gitpython(repo, load['saltenv'], gitfs_root))
-        elif provider == 'pygit2':
-            ret.update(_dir_list_pygit2(repo, load['saltenv'], gitfs_root))
-        elif provider == 'dulwich':
-            ret.update(_dir_list_dulwich(repo, load['saltenv'], gitfs_root))
+    for repo in init():
+        index = _tree_index(repo, provider, load['saltenv'])
+        if index is not None:
+            ret.update(index['dirs'])
     return sorted(ret)
-
-
-def _dir_list_gitpython(repo, tgt, gitfs_root):
-    '''
-    Get list of directories using GitPython
-    '''
-    ret = set()
-    tree = _get_tree_gitpython(repo, tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = tree / gitfs_root
-        except KeyError:
-            return ret
-    for blob in tree.traverse():
-        if not isinstance(blob, git.Tree):
-            continue
-        if gitfs_root:
-            ret.add(os.path.relpath(blob.path, gitfs_root))
-            continue
-        ret.add(blob.path)
-    return ret
-
-
-def _dir_list_pygit2(repo, ref_tgt, gitfs_root):
-    '''
-    Get a list of directories using pygit2
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a pygit2 Tree object recursively, accumulating all the
-        empty directories within it in the "blobs" list
-        '''
-        for entry in iter(tree):
-            blob = repo[entry.oid]
-            if not isinstance(blob, pygit2.Tree):
-                continue
-            blobs.append(os.path.join(prefix, entry.name))
-            if len(blob):
-                _traverse(blob, repo, blobs, os.path.join(prefix, entry.name))
-    ret = set()
-    tree = _get_tree_pygit2(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo[tree[gitfs_root].oid]
-        except KeyError:
-            return ret
-        if not isinstance(tree, pygit2.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
-    return ret
-
-
-def _dir_list_dulwich(repo, ref_tgt, gitfs_root):
-    '''
-    Get a list of directories using pygit2
-    '''
-    def _traverse(tree, repo, blobs, prefix):
-        '''
-        Traverse through a dulwich Tree object recursively, accumulating all
-        the empty directories within it in the "blobs" list
-        '''
-        for item in tree.items():
-            obj = repo.get_object(item.sha)
-            if not isinstance(obj, dulwich.objects.Tree):
-                continue
-            blobs.append(os.path.join(prefix, item.path))
-            if len(repo.get_object(item.sha)):
-                _traverse(obj, repo, blobs, os.path.join(prefix, item.path))
-    ret = set()
-    tree = _get_tree_dulwich(repo, ref_tgt)
-    if not tree:
-        return ret
-    if gitfs_root:
-        try:
-            tree = repo.get_object(tree[gitfs_root][1])
-        except KeyError:
-            return ret
-        if not isinstance(tree, dulwich.objects.Tree):
-            return ret
-    blobs = []
-    if len(tree):
-        _traverse(tree, repo, blobs, gitfs_root)
-    for blob in blobs:
-        if gitfs_root:
-            ret.add(os.path.relpath(blob, gitfs_root))
-            continue
-        ret.add(blob)
-    return ret
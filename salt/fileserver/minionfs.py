@@ -96,7 +96,7 @@ def serve_file(load, fnd):
     # How many threads are serving files?
     with salt.utils.fopen(fnd['path'], 'rb') as fp_:
         fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
+        data = fp_.read(salt.fileserver.serve_chunk_size(__opts__, load))
         if gzip and data:
             data = salt.utils.gzip_util.compress(data, gzip)
             ret['gzip'] = gzip
@@ -20,6 +20,7 @@ except ImportError:
 # Import salt libs
 import salt.fileserver
 import salt.utils
+import salt.utils.rootswatch
 from salt.utils.event import tagify
 
 log = logging.getLogger(__name__)
@@ -97,7 +98,7 @@ def serve_file(load, fnd):
 
     with salt.utils.fopen(fnd['path'], 'rb') as fp_:
         fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
+        data = fp_.read(salt.fileserver.serve_chunk_size(__opts__, load))
         if gzip and data:
             data = salt.utils.gzip_util.compress(data, gzip)
             ret['gzip'] = gzip
@@ -131,8 +132,13 @@ def update():
                 file_path, mtime = line.split(':', 1)
                 old_mtime_map[file_path] = mtime
 
+    # use the map of the file_roots watcher if it is running, otherwise
     # generate the new map
-    new_mtime_map = salt.fileserver.generate_mtime_map(__opts__['file_roots'])
+    new_mtime_map = salt.utils.rootswatch.read_mtime_map(__opts__)
+    if new_mtime_map is None:
+        new_mtime_map = salt.fileserver.generate_mtime_map(
+            __opts__['file_roots']
+        )
 
     # compare the maps, set changed to the return value
     data['changed'] = salt.fileserver.diff_mtime_map(old_mtime_map, new_mtime_map)
@@ -224,7 +224,7 @@ def serve_file(load, fnd):
 
     with salt.utils.fopen(cached_file_path, 'rb') as fp_:
         fp_.seek(load['loc'])
-        data = fp_.read(__opts__['file_buffer_size'])
+        data = fp_.read(fs.serve_chunk_size(__opts__, load))
         if gzip and data:
             data = salt.utils.gzip_util.compress(data, gzip)
             ret['gzip'] = gzip
@@ -15,6 +15,7 @@ import hashlib
 import salt.crypt
 import salt.utils
 import salt.utils.event
+import salt.utils.minions
 from salt.utils.event import tagify
 
 
@@ -337,6 +338,7 @@ class Key(object):
         for minion in os.listdir(m_cache):
             if minion not in keys['minions']:
                 shutil.rmtree(os.path.join(m_cache, minion))
+                salt.utils.minions.notify_minion_data(self.opts, minion)
 
     def check_master(self):
         '''
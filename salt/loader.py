@@ -8,11 +8,18 @@ import os
 import imp
 import sys
 import salt
+import collections
+import fnmatch
+import hashlib
 import logging
 import tempfile
+import threading
 import time
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 # Import salt libs
+import salt.version
 from salt.exceptions import LoaderError
 from salt.template import check_render_pipe_str
 from salt.utils.decorators import Depends
@@ -110,6 +117,13 @@ def minion_mods(opts, context=None, whitelist=None):
             'value': context}
     if not whitelist:
         whitelist = opts.get('whitelist_modules', None)
+    if opts.get('lazy_loader', False):
+        # Dependencies are enforced as each module is loaded
+        return load.gen_lazy_functions(
+            pack,
+            whitelist=whitelist,
+            provider_overrides=True
+        )
     functions = load.gen_functions(
         pack,
         whitelist=whitelist,
@@ -286,10 +300,11 @@ def render(opts, functions):
     return rend
 
 
-def grains(opts):
+def grains(opts, profile=None):
     '''
     Return the functions for the dynamic grains and the values for the static
-    grains.
+    grains. The number of seconds each grain function took is added to the
+    profile dict when one is passed.
     '''
     if opts.get('skip_grains', False):
         return {}
@@ -319,6 +334,8 @@ def grains(opts):
     load = _create_loader(opts, 'grains', 'grain')
     grains_info = load.gen_grains()
     grains_info.update(opts['grains'])
+    if profile is not None:
+        profile.update(load.grains_profile)
     return grains_info
 
 
@@ -438,7 +455,8 @@ class Loader(object):
         self.opts = self.__prep_mod_opts(opts)
         self.loaded_base_name = loaded_base_name or LOADED_BASE_NAME
         self.mod_type_check = mod_type_check or _mod_type
-        if self.opts.get('grains_cache', False):
+        if self.opts.get('grains_cache', False) or \
+                self.opts.get('grains_cache_ttl'):
             self.serial = salt.payload.Serial(self.opts)
 
     def __prep_mod_opts(self, opts):
@@ -612,15 +630,12 @@ class Loader(object):
         mod.__context__ = context
         return funcs
 
-    def gen_functions(self, pack=None, virtual_enable=True, whitelist=None,
-                      provider_overrides=False):
+    def _module_names(self):
         '''
-        Return a dict of functions found in the defined module_dirs
+        Return a dict of the names of the modules found in the defined
+        module_dirs, mapped to their paths
         '''
-        log.trace('loading {0} in {1}'.format(self.tag, self.module_dirs))
         names = {}
-        modules = []
-        funcs = {}
         disable = set(self.opts.get('disable_{0}s'.format(self.tag), []))
 
         cython_enabled = False
@@ -676,285 +691,441 @@ class Loader(object):
                             fn_
                         )
                     )
-        for name in names:
-            try:
-                if names[name].endswith('.pyx'):
-                    # If there's a name which ends in .pyx it means the above
-                    # cython_enabled is True. Continue...
-                    mod = pyximport.load_module(
-                        '{0}.{1}.{2}.{3}'.format(
-                            self.loaded_base_name,
-                            self.mod_type_check(names[name]),
-                            self.tag,
-                            name
-                        ), names[name], tempfile.gettempdir()
-                    )
-                else:
-                    fn_, path, desc = imp.find_module(name, self.module_dirs)
-                    mod = imp.load_module(
-                        '{0}.{1}.{2}.{3}'.format(
+        return names
+
+    def _load_module(self, name, path):
+        '''
+        Import a single module found by _module_names, returns None if the
+        module can not be imported
+        '''
+        try:
+            if path.endswith('.pyx'):
+                # If there's a name which ends in .pyx it means that
+                # cython is enabled. Continue...
+                import pyximport
+                mod = pyximport.load_module(
+                    '{0}.{1}.{2}.{3}'.format(
+                        self.loaded_base_name,
+                        self.mod_type_check(path),
+                        self.tag,
+                        name
+                    ), path, tempfile.gettempdir()
+                )
+            else:
+                fn_, path, desc = imp.find_module(name, self.module_dirs)
+                mod = imp.load_module(
+                    '{0}.{1}.{2}.{3}'.format(
+                        self.loaded_base_name,
+                        self.mod_type_check(path),
+                        self.tag,
+                        name
+                    ), fn_, path, desc
+                )
+                # reload all submodules if necessary
+                submodules = [
+                    getattr(mod, sname) for sname in dir(mod) if
+                    isinstance(getattr(mod, sname), mod.__class__)
+                ]
+                # reload only custom "sub"modules i.e is a submodule in
+                # parent module that are still available on disk (i.e. not
+                # removed during sync_modules)
+                for submodule in submodules:
+                    try:
+                        smname = '{0}.{1}.{2}'.format(
                             self.loaded_base_name,
-                            self.mod_type_check(path),
                             self.tag,
                             name
-                        ), fn_, path, desc
-                    )
-                    # reload all submodules if necessary
-                    submodules = [
-                        getattr(mod, sname) for sname in dir(mod) if
-                        isinstance(getattr(mod, sname), mod.__class__)
-                    ]
-                    # reload only custom "sub"modules i.e is a submodule in
-                    # parent module that are still available on disk (i.e. not
-                    # removed during sync_modules)
-                    for submodule in submodules:
-                        try:
-                            smname = '{0}.{1}.{2}'.format(
-                                self.loaded_base_name,
-                                self.tag,
-                                name
-                            )
-                            smfile = '{0}.py'.format(
-                                os.path.splitext(submodule.__file__)[0]
-                            )
-                            if submodule.__name__.startswith(smname) and \
-                                    os.path.isfile(smfile):
-                                reload(submodule)
-                        except AttributeError:
-                            continue
-            except ImportError:
-                log.debug(
-                    'Failed to import {0} {1}, this is most likely NOT a '
-                    'problem:\n'.format(
-                        self.tag, name
-                    ),
-                    exc_info=True
-                )
-                continue
-            except Exception:
-                log.warning(
-                    'Failed to import {0} {1}, this is due most likely to a '
-                    'syntax error. Traceback raised:\n'.format(
-                        self.tag, name
-                    ),
-                    exc_info=True
-                )
-                continue
-            modules.append(mod)
-        for mod in modules:
-            virtual = ''
-
-            # If this is a proxy minion then MOST modules cannot work.  Therefore, require that
-            # any module that does work with salt-proxy-minion define __proxyenabled__ as a list
-            # containing the names of the proxy types that the module supports.
-            if not hasattr(mod, 'render') and 'proxy' in self.opts:
-                if not hasattr(mod, '__proxyenabled__'):
-                    # This is a proxy minion but this module doesn't support proxy
-                    # minions at all
-                    continue
-                if not (self.opts['proxy']['proxytype'] in mod.__proxyenabled__ or '*' in mod.__proxyenabled__):
-                    # This is a proxy minion, this module supports proxy
-                    # minions, but not this particular minion
-                    log.debug(mod)
-                    continue
+                        )
+                        smfile = '{0}.py'.format(
+                            os.path.splitext(submodule.__file__)[0]
+                        )
+                        if submodule.__name__.startswith(smname) and \
+                                os.path.isfile(smfile):
+                            reload(submodule)
+                    except AttributeError:
+                        continue
+        except ImportError:
+            log.debug(
+                'Failed to import {0} {1}, this is most likely NOT a '
+                'problem:\n'.format(
+                    self.tag, name
+                ),
+                exc_info=True
+            )
+            return None
+        except Exception:
+            log.warning(
+                'Failed to import {0} {1}, this is due most likely to a '
+                'syntax error. Traceback raised:\n'.format(
+                    self.tag, name
+                ),
+                exc_info=True
+            )
+            return None
+        return mod
 
-            if hasattr(mod, '__opts__'):
-                mod.__opts__.update(self.opts)
-            else:
-                mod.__opts__ = self.opts
+    def _process_module(self, mod, funcs, pack=None, virtual_enable=True,
+                        whitelist=None):
+        '''
+        Pack an imported module, run its __virtual__ function and add its
+        functions to funcs. Returns the name the module was loaded as, or
+        None if it was not loaded.
+        '''
+        virtual = ''
+
+        # If this is a proxy minion then MOST modules cannot work.  Therefore, require that
+        # any module that does work with salt-proxy-minion define __proxyenabled__ as a list
+        # containing the names of the proxy types that the module supports.
+        if not hasattr(mod, 'render') and 'proxy' in self.opts:
+            if not hasattr(mod, '__proxyenabled__'):
+                # This is a proxy minion but this module doesn't support proxy
+                # minions at all
+                return None
+            if not (self.opts['proxy']['proxytype'] in mod.__proxyenabled__ or '*' in mod.__proxyenabled__):
+                # This is a proxy minion, this module supports proxy
+                # minions, but not this particular minion
+                log.debug(mod)
+                return None
 
-            mod.__grains__ = self.grains
-            mod.__pillar__ = self.pillar
+        if hasattr(mod, '__opts__'):
+            mod.__opts__.update(self.opts)
+        else:
+            mod.__opts__ = self.opts
 
-            if pack:
-                if isinstance(pack, list):
-                    for chunk in pack:
-                        if not isinstance(chunk, dict):
-                            continue
-                        try:
-                            setattr(mod, chunk['name'], chunk['value'])
-                        except KeyError:
-                            pass
-                else:
-                    setattr(mod, pack['name'], pack['value'])
+        mod.__grains__ = self.grains
+        mod.__pillar__ = self.pillar
 
-            # Call a module's initialization method if it exists
-            if hasattr(mod, '__init__'):
-                if callable(mod.__init__):
+        if pack:
+            if isinstance(pack, list):
+                for chunk in pack:
+                    if not isinstance(chunk, dict):
+                        continue
                     try:
-                        mod.__init__(self.opts)
-                    except TypeError:
+                        setattr(mod, chunk['name'], chunk['value'])
+                    except KeyError:
                         pass
+            else:
+                setattr(mod, pack['name'], pack['value'])
 
-            # Trim the full pathname to just the module
-            # this will be the short name that other salt modules and state
-            # will refer to it as.
-            module_name = mod.__name__.rsplit('.', 1)[-1]
-
-            if virtual_enable:
-                # if virtual modules are enabled, we need to look for the
-                # __virtual__() function inside that module and run it.
-                # This function will return either a new name for the module,
-                # an empty string(won't be loaded but you just need to check
-                # against the same python type, a string) or False.
-                # This allows us to have things like the pkg module working on
-                # all platforms under the name 'pkg'. It also allows for
-                # modules like augeas_cfg to be referred to as 'augeas', which
-                # would otherwise have namespace collisions. And finally it
-                # allows modules to return False if they are not intended to
-                # run on the given platform or are missing dependencies.
+        # Call a module's initialization method if it exists
+        if hasattr(mod, '__init__'):
+            if callable(mod.__init__):
                 try:
-                    if hasattr(mod, '__virtual__'):
-                        if callable(mod.__virtual__):
-                            virtual = mod.__virtual__()
-                            if not virtual:
-                                # if __virtual__() evaluates to false then the
-                                # module wasn't meant for this platform or it's
-                                # not supposed to load for some other reason.
-                                # Some modules might accidentally return None
-                                # and are improperly loaded
-                                if virtual is None:
-                                    log.warning(
-                                        '{0}.__virtual__() is wrongly '
-                                        'returning `None`. It should either '
-                                        'return `True`, `False` or a new '
-                                        'name. If you\'re the developer '
-                                        'of the module {1!r}, please fix '
-                                        'this.'.format(
-                                            mod.__name__,
-                                            module_name
-                                        )
-                                    )
-                                continue
-
-                            if virtual is not True and module_name != virtual:
-                                # If __virtual__ returned True the module will
-                                # be loaded with the same name, if it returned
-                                # other value than `True`, it should be a new
-                                # name for the module.
-                                # Update the module name with the new name
-                                log.debug(
-                                    'Loaded {0} as virtual {1}'.format(
-                                        module_name, virtual
+                    mod.__init__(self.opts)
+                except TypeError:
+                    pass
+
+        # Trim the full pathname to just the module
+        # this will be the short name that other salt modules and state
+        # will refer to it as.
+        module_name = mod.__name__.rsplit('.', 1)[-1]
+
+        if virtual_enable:
+            # if virtual modules are enabled, we need to look for the
+            # __virtual__() function inside that module and run it.
+            # This function will return either a new name for the module,
+            # an empty string(won't be loaded but you just need to check
+            # against the same python type, a string) or False.
+            # This allows us to have things like the pkg module working on
+            # all platforms under the name 'pkg'. It also allows for
+            # modules like augeas_cfg to be referred to as 'augeas', which
+            # would otherwise have namespace collisions. And finally it
+            # allows modules to return False if they are not intended to
+            # run on the given platform or are missing dependencies.
+            try:
+                if hasattr(mod, '__virtual__'):
+                    if callable(mod.__virtual__):
+                        virtual = mod.__virtual__()
+                        if not virtual:
+                            # if __virtual__() evaluates to false then the
+                            # module wasn't meant for this platform or it's
+                            # not supposed to load for some other reason.
+                            # Some modules might accidentally return None
+                            # and are improperly loaded
+                            if virtual is None:
+                                log.warning(
+                                    '{0}.__virtual__() is wrongly '
+                                    'returning `None`. It should either '
+                                    'return `True`, `False` or a new '
+                                    'name. If you\'re the developer '
+                                    'of the module {1!r}, please fix '
+                                    'this.'.format(
+                                        mod.__name__,
+                                        module_name
                                     )
                                 )
+                            return None
+
+                        if virtual is not True and module_name != virtual:
+                            # If __virtual__ returned True the module will
+                            # be loaded with the same name, if it returned
+                            # other value than `True`, it should be a new
+                            # name for the module.
+                            # Update the module name with the new name
+                            log.debug(
+                                'Loaded {0} as virtual {1}'.format(
+                                    module_name, virtual
+                                )
+                            )
 
-                                if not hasattr(mod, '__virtualname__'):
-                                    salt.utils.warn_until(
-                                        'Hydrogen',
-                                        'The {0!r} module is renaming itself '
-                                        'in it\'s __virtual__() function ({1} '
-                                        '=> {2}). Please set it\'s virtual '
-                                        'name as the \'__virtualname__\' '
-                                        'module attribute. Example: '
-                                        '"__virtualname__ = {2!r}"'.format(
-                                            mod.__name__,
-                                            module_name,
-                                            virtual
-                                        )
+                            if not hasattr(mod, '__virtualname__'):
+                                salt.utils.warn_until(
+                                    'Hydrogen',
+                                    'The {0!r} module is renaming itself '
+                                    'in it\'s __virtual__() function ({1} '
+                                    '=> {2}). Please set it\'s virtual '
+                                    'name as the \'__virtualname__\' '
+                                    'module attribute. Example: '
+                                    '"__virtualname__ = {2!r}"'.format(
+                                        mod.__name__,
+                                        module_name,
+                                        virtual
                                     )
-                                module_name = virtual
-
-                            elif virtual and hasattr(mod, '__virtualname__'):
-                                module_name = mod.__virtualname__
-
-                except KeyError:
-                    # Key errors come out of the virtual function when passing
-                    # in incomplete grains sets, these can be safely ignored
-                    # and logged to debug, still, it includes the traceback to
-                    # help debugging.
-                    log.debug(
-                        'KeyError when loading {0}'.format(module_name),
-                        exc_info=True
-                    )
+                                )
+                            module_name = virtual
 
-                except Exception:
-                    # If the module throws an exception during __virtual__()
-                    # then log the information and continue to the next.
-                    log.error(
-                        'Failed to read the virtual function for '
-                        '{0}: {1}'.format(
-                            self.tag, module_name
-                        ),
-                        exc_info=True
-                    )
-                    continue
+                        elif virtual and hasattr(mod, '__virtualname__'):
+                            module_name = mod.__virtualname__
 
-            if whitelist:
-                # If a whitelist is defined then only load the module if it is
-                # in the whitelist
-                if module_name not in whitelist:
-                    continue
+            except KeyError:
+                # Key errors come out of the virtual function when passing
+                # in incomplete grains sets, these can be safely ignored
+                # and logged to debug, still, it includes the traceback to
+                # help debugging.
+                log.debug(
+                    'KeyError when loading {0}'.format(module_name),
+                    exc_info=True
+                )
 
-            if getattr(mod, '__load__', False) is not False:
-                log.info(
-                    'The functions from module {0!r} are being loaded from '
-                    'the provided __load__ attribute'.format(
-                        module_name
-                    )
+            except Exception:
+                # If the module throws an exception during __virtual__()
+                # then log the information and continue to the next.
+                log.error(
+                    'Failed to read the virtual function for '
+                    '{0}: {1}'.format(
+                        self.tag, module_name
+                    ),
+                    exc_info=True
                 )
-            for attr in getattr(mod, '__load__', dir(mod)):
+                return None
 
-                if attr.startswith('_'):
-                    # skip private attributes
-                    # log messages omitted for obviousness
-                    continue
+        if whitelist:
+            # If a whitelist is defined then only load the module if it is
+            # in the whitelist
+            if module_name not in whitelist:
+                return None
 
-                if callable(getattr(mod, attr)):
-                    # check to make sure this is callable
-                    func = getattr(mod, attr)
-                    if isinstance(func, type):
-                        # skip callables that might be exceptions
-                        if any(['Error' in func.__name__,
-                                'Exception' in func.__name__]):
-                            continue
-                    # now that callable passes all the checks, add it to the
-                    # library of available functions of this type
-
-                    # Let's get the function name.
-                    # If the module has the __func_alias__ attribute, it must
-                    # be a dictionary mapping in the form of(key -> value):
-                    #   <real-func-name> -> <desired-func-name>
-                    #
-                    # It default's of course to the found callable attribute
-                    # name if no alias is defined.
-                    funcname = getattr(mod, '__func_alias__', {}).get(
-                        attr, attr
-                    )
+        if getattr(mod, '__load__', False) is not False:
+            log.info(
+                'The functions from module {0!r} are being loaded from '
+                'the provided __load__ attribute'.format(
+                    module_name
+                )
+            )
+        for attr in getattr(mod, '__load__', dir(mod)):
 
-                    # functions are namespaced with their module name
-                    module_func_name = '{0}.{1}'.format(module_name, funcname)
-                    funcs[module_func_name] = func
-                    log.trace(
-                        'Added {0} to {1}'.format(module_func_name, self.tag)
-                    )
-                    self._apply_outputter(func, mod)
+            if attr.startswith('_'):
+                # skip private attributes
+                # log messages omitted for obviousness
+                continue
+
+            if callable(getattr(mod, attr)):
+                # check to make sure this is callable
+                func = getattr(mod, attr)
+                if isinstance(func, type):
+                    # skip callables that might be exceptions
+                    if any(['Error' in func.__name__,
+                            'Exception' in func.__name__]):
+                        continue
+                # now that callable passes all the checks, add it to the
+                # library of available functions of this type
+
+                # Let's get the function name.
+                # If the module has the __func_alias__ attribute, it must
+                # be a dictionary mapping in the form of(key -> value):
+                #   <real-func-name> -> <desired-func-name>
+                #
+                # It default's of course to the found callable attribute
+                # name if no alias is defined.
+                funcname = getattr(mod, '__func_alias__', {}).get(
+                    attr, attr
+                )
+
+                # functions are namespaced with their module name
+                module_func_name = '{0}.{1}'.format(module_name, funcname)
+                funcs[module_func_name] = func
+                log.trace(
+                    'Added {0} to {1}'.format(module_func_name, self.tag)
+                )
+                self._apply_outputter(func, mod)
+        return module_name
+
+    def _provider_overrides(self, funcs):
+        '''
+        Return the functions of the modules configured as providers, keyed
+        by the name of the module they override
+        '''
+        overrides = {}
+        if isinstance(self.opts.get('providers', False), dict):
+            for mod, provider in self.opts['providers'].items():
+                newfuncs = raw_mod(self.opts, provider, funcs)
+                if newfuncs:
+                    for newfunc in newfuncs:
+                        f_key = '{0}{1}'.format(
+                            mod, newfunc[newfunc.rindex('.'):]
+                        )
+                        overrides[f_key] = newfuncs[newfunc]
+        return overrides
+
+    def _inject_salt(self, mod, funcs, pack=None):
+        '''
+        Inject the special __salt__ namespace into a loaded module
+        '''
+        if not hasattr(mod, '__salt__') or (
+            not in_pack(pack, '__salt__') and
+            not str(mod.__name__).startswith('salt.loaded.int.grain')
+        ):
+            mod.__salt__ = funcs
+        elif not in_pack(pack, '__salt__') and str(mod.__name__).startswith('salt.loaded.int.grain'):
+            mod.__salt__.update(funcs)
+
+    def gen_functions(self, pack=None, virtual_enable=True, whitelist=None,
+                      provider_overrides=False):
+        '''
+        Return a dict of functions found in the defined module_dirs
+        '''
+        log.trace('loading {0} in {1}'.format(self.tag, self.module_dirs))
+        names = self._module_names()
+        modules = []
+        funcs = {}
+        # The names of the files each loaded module name came from
+        self.virtual_map = {}
+        for name in names:
+            mod = self._load_module(name, names[name])
+            if mod is not None:
+                modules.append(mod)
+        for mod in modules:
+            module_name = self._process_module(
+                mod, funcs, pack, virtual_enable, whitelist
+            )
+            if module_name is not None:
+                self.virtual_map.setdefault(module_name, []).append(
+                    mod.__name__.rsplit('.', 1)[-1]
+                )
 
         # Handle provider overrides
         if provider_overrides and self.opts.get('providers', False):
-            if isinstance(self.opts['providers'], dict):
-                for mod, provider in self.opts['providers'].items():
-                    newfuncs = raw_mod(self.opts, provider, funcs)
-                    if newfuncs:
-                        for newfunc in newfuncs:
-                            f_key = '{0}{1}'.format(
-                                mod, newfunc[newfunc.rindex('.'):]
-                            )
-                            funcs[f_key] = newfuncs[newfunc]
+            funcs.update(self._provider_overrides(funcs))
 
         # now that all the functions have been collected, iterate back over
         # the available modules and inject the special __salt__ namespace that
         # contains these functions.
         for mod in modules:
-            if not hasattr(mod, '__salt__') or (
-                not in_pack(pack, '__salt__') and
-                not str(mod.__name__).startswith('salt.loaded.int.grain')
-            ):
-                mod.__salt__ = funcs
-            elif not in_pack(pack, '__salt__') and str(mod.__name__).startswith('salt.loaded.int.grain'):
-                mod.__salt__.update(funcs)
+            self._inject_salt(mod, funcs, pack)
         return funcs
 
+    def gen_lazy_functions(self, pack=None, whitelist=None,
+                           provider_overrides=False):
+        '''
+        Return the functions found in the defined module_dirs as a
+        LazyFunctions dict, which imports the module of a function when it
+        is first accessed.
+
+        The name each module file is loaded as is only known once its
+        __virtual__ function has run, so the names are cached in the
+        cachedir keyed by the grains and the module files. If the cache is
+        stale every module is loaded, as gen_functions does, and the cache
+        is rewritten.
+        '''
+        names = self._module_names()
+        try:
+            key = self._virtual_cache_key(names, whitelist)
+        except Exception:
+            log.debug('Failed to hash the {0} loader state, not loading '
+                      'lazily'.format(self.tag), exc_info=True)
+            return self.gen_functions(pack,
+                                      whitelist=whitelist,
+                                      provider_overrides=provider_overrides)
+        cache = self._read_virtual_cache()
+        if cache.get('key') == key:
+            log.trace('loading {0} lazily from {1}'.format(
+                self.tag, self.module_dirs))
+            return LazyFunctions(self,
+                                 names,
+                                 cache['virtual'],
+                                 pack,
+                                 whitelist,
+                                 provider_overrides)
+        funcs = self.gen_functions(pack,
+                                   whitelist=whitelist,
+                                   provider_overrides=provider_overrides)
+        self._write_virtual_cache({'key': key, 'virtual': self.virtual_map})
+        return funcs
+
+    def _virtual_cache_path(self):
+        '''
+        Return the path to the __virtual__ cache of this loader
+        '''
+        return os.path.join(self.opts['cachedir'],
+                            'loader',
+                            '{0}.virtual.p'.format(self.tag))
+
+    def _virtual_cache_key(self, names, whitelist):
+        '''
+        Return the hash which the __virtual__ results of the passed modules
+        are valid for
+        '''
+        stats = []
+        for name in sorted(names):
+            try:
+                stats.append((names[name], os.path.getmtime(names[name])))
+            except OSError:
+                stats.append((names[name], None))
+        serial = salt.payload.Serial(self.opts)
+        data = serial.dumps([salt.version.__version__,
+                             self.module_dirs,
+                             stats,
+                             sorted(whitelist or []),
+                             self.opts.get('providers', {}),
+                             self.grains])
+        return hashlib.md5(data).hexdigest()
+
+    def _read_virtual_cache(self):
+        '''
+        Read the __virtual__ cache, an empty dict is returned if it can not
+        be read
+        '''
+        path = self._virtual_cache_path()
+        if not os.path.isfile(path):
+            return {}
+        serial = salt.payload.Serial(self.opts)
+        try:
+            with salt.utils.fopen(path, 'rb') as fp_:
+                cache = serial.load(fp_)
+        except Exception:
+            log.debug('Failed to read the loader cache {0}'.format(path))
+            return {}
+        if not isinstance(cache, dict) or 'virtual' not in cache:
+            return {}
+        return cache
+
+    def _write_virtual_cache(self, cache):
+        '''
+        Write the __virtual__ cache
+        '''
+        path = self._virtual_cache_path()
+        serial = salt.payload.Serial(self.opts)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            tmp = '{0}.{1}'.format(path, os.getpid())
+            with salt.utils.fopen(tmp, 'w+b') as fp_:
+                serial.dump(cache, fp_)
+            os.rename(tmp, path)
+        except (IOError, OSError, TypeError) as exc:
+            log.debug('Failed to write the loader cache {0}: {1}'.format(
+                path, exc))
+
     def _apply_outputter(self, func, mod):
         '''
         Apply the __outputter__ variable to the functions
@@ -989,12 +1160,176 @@ class Loader(object):
             funcs[key[key.rindex('.')] + 1:] = fun
         return funcs
 
+    def _grains_modules_changed(self, cfn):
+        '''
+        Return True if a grains module was changed after the grains cache
+        file was written
+        '''
+        cache_mtime = os.path.getmtime(cfn)
+        for path in self._module_names().values():
+            try:
+                if os.path.getmtime(path) > cache_mtime:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def _grain_ttl(self, key):
+        '''
+        Return the number of seconds the grains of a grain function are
+        cached for, the longest grains_cache_ttl pattern matching the function
+        wins
+        '''
+        ttls = self.opts.get('grains_cache_ttl') or {}
+        if key in ttls:
+            return ttls[key]
+        for pattern in sorted(ttls, key=len, reverse=True):
+            if fnmatch.fnmatch(key, pattern):
+                return ttls[pattern]
+        return 0
+
+    def _read_grains_ttl_cache(self, cfn):
+        '''
+        Return the cached returns of the grain functions with a TTL
+        '''
+        if not os.path.isfile(cfn) or \
+                self.opts.get('refresh_grains_cache', False):
+            return {}
+        if self._grains_modules_changed(cfn):
+            log.debug('Grains modules changed since the grain functions '
+                      'cache was written. Refreshing.')
+            return {}
+        try:
+            with salt.utils.fopen(cfn, 'rb') as fp_:
+                cache = self.serial.load(fp_)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or \
+                cache.get('saltversion') != salt.version.__version__:
+            return {}
+        return cache.get('funcs', {})
+
+    def _write_grains_ttl_cache(self, cfn, cached):
+        '''
+        Write the returns of the grain functions with a TTL
+        '''
+        cumask = os.umask(077)
+        try:
+            with salt.utils.fopen(cfn, 'w+b') as fp_:
+                self.serial.dump({'saltversion': salt.version.__version__,
+                                  'funcs': cached}, fp_)
+        except (IOError, OSError, TypeError):
+            log.error(
+                'Unable to write to grain functions cache file {0}'.format(cfn)
+            )
+        os.umask(cumask)
+
+    def _call_grain(self, key, fun, starts):
+        '''
+        Call a grain function, return its grains and the number of seconds it
+        took
+        '''
+        start = starts[key] = time.time()
+        try:
+            ret = fun()
+        except Exception:
+            log.critical(
+                'Failed to load grains defined in grain file {0} in '
+                'function {1}, error:\n'.format(
+                    key, fun
+                ),
+                exc_info=True
+            )
+            ret = None
+        return ret, time.time() - start
+
+    def _call_grains(self, funcs, keys):
+        '''
+        Call the grain functions, on grains_threads threads, and return their
+        returns. The returns of the functions matching grains_cache_ttl are
+        cached for their TTL. A function which runs for longer than
+        grains_timeout seconds is left out. The number of seconds each
+        function took is kept in self.grains_profile.
+        '''
+        self.grains_profile = {}
+        results = {}
+        now = time.time()
+        cfn = os.path.join(self.opts['cachedir'], 'grains_ttl.cache.p')
+        ttls = dict((key, self._grain_ttl(key)) for key in keys)
+        cached = {}
+        if any(ttls.values()):
+            cached = self._read_grains_ttl_cache(cfn)
+        calls = []
+        for key in keys:
+            if key in cached and now - cached[key][0] < ttls[key]:
+                results[key] = cached[key][1]
+            else:
+                calls.append(key)
+
+        starts = {}
+        threads = self.opts.get('grains_threads', 0)
+        # WMI needs COM to be set up in each thread calling it, and the grain
+        # functions importing modules in the threads would wait forever on
+        # the import lock held by a module calling the loader when imported
+        if threads > 1 and len(calls) > 1 and \
+                not salt.utils.is_windows() and not imp.lock_held():
+            timeout = self.opts.get('grains_timeout', 0)
+            pool = ThreadPool(min(threads, len(calls)))
+            pending = [(key, pool.apply_async(self._call_grain,
+                                              (key, funcs[key], starts)))
+                       for key in calls]
+            pool.close()
+            # The longest the calls can take when they all use their timeout
+            deadline = now + timeout * ((len(calls) + threads - 1) // threads)
+            timed_out = False
+            for key, result in pending:
+                while True:
+                    if not timeout:
+                        wait = None
+                    elif key in starts:
+                        wait = max(0, starts[key] + timeout - time.time())
+                    else:
+                        # Not started yet, waiting for a thread
+                        wait = max(0, min(1, deadline - time.time()))
+                    try:
+                        results[key], self.grains_profile[key] = \
+                            result.get(wait)
+                        break
+                    except multiprocessing.TimeoutError:
+                        if key not in starts and time.time() < deadline:
+                            continue
+                        log.warning(
+                            'The grain function {0} did not return within '
+                            '{1} seconds, its grains are left out'.format(
+                                key, timeout
+                            )
+                        )
+                        timed_out = True
+                        self.grains_profile[key] = \
+                            time.time() - starts.get(key, now)
+                        break
+            if not timed_out:
+                pool.join()
+        else:
+            for key in calls:
+                results[key], self.grains_profile[key] = \
+                    self._call_grain(key, funcs[key], starts)
+
+        cache_keys = [key for key in calls
+                      if ttls[key] and isinstance(results.get(key), dict)]
+        if cache_keys:
+            for key in cache_keys:
+                cached[key] = (starts[key], results[key])
+            self._write_grains_ttl_cache(cfn, cached)
+        return results
+
     def gen_grains(self):
         '''
         Read the grains directory and execute all of the public callable
         members. Then verify that the returns are python dict's and return
         a dict containing all of the returned values.
         '''
+        self.grains_profile = {}
         if self.opts.get('grains_cache', False):
             cfn = os.path.join(
             self.opts['cachedir'],
@@ -1004,13 +1339,23 @@ class Loader(object):
                 grains_cache_age = int(time.time() - os.path.getmtime(cfn))
                 if self.opts.get('grains_cache_expiration', 300) >= grains_cache_age and not \
                     self.opts.get('refresh_grains_cache', False):
-                    log.debug('Retrieving grains from cache')
-                    try:
-                        with salt.utils.fopen(cfn, 'rb') as fp_:
-                            cached_grains = self.serial.load(fp_)
-                        return cached_grains
-                    except (IOError, OSError):
-                        pass
+                    cached_grains = None
+                    if self._grains_modules_changed(cfn):
+                        log.debug('Grains modules changed since the grains '
+                                  'cache was written. Refreshing.')
+                    else:
+                        log.debug('Retrieving grains from cache')
+                        try:
+                            with salt.utils.fopen(cfn, 'rb') as fp_:
+                                cached_grains = self.serial.load(fp_)
+                        except (IOError, OSError):
+                            pass
+                    if isinstance(cached_grains, dict):
+                        if cached_grains.get('saltversion') in (
+                                None, salt.version.__version__):
+                            return cached_grains
+                        log.debug('Grains cache was written by another '
+                                  'version of salt. Refreshing.')
                 else:
                     log.debug('Grains cache last modified {0} seconds ago and cache expiration is set to {1}. '
                          'Grains cache expired. Refreshing.'.format(
@@ -1019,27 +1364,14 @@ class Loader(object):
                 log.debug('Grains cache file does not exist.')
         grains_data = {}
         funcs = self.gen_functions()
-        for key, fun in funcs.items():
-            if key[key.index('.') + 1:] == 'core':
-                continue
-            try:
-                ret = fun()
-            except Exception:
-                log.critical(
-                    'Failed to load grains defined in grain file {0} in '
-                    'function {1}, error:\n'.format(
-                        key, fun
-                    ),
-                    exc_info=True
-                )
-                continue
-            if not isinstance(ret, dict):
-                continue
-            grains_data.update(ret)
-        for key, fun in funcs.items():
-            if key[key.index('.') + 1:] != 'core':
-                continue
-            ret = fun()
+        # The grains of the core functions are merged last
+        keys = [key for key in funcs if key[key.index('.') + 1:] != 'core']
+        keys.extend(
+            key for key in funcs if key[key.index('.') + 1:] == 'core'
+        )
+        results = self._call_grains(funcs, keys)
+        for key in keys:
+            ret = results.get(key)
             if not isinstance(ret, dict):
                 continue
             grains_data.update(ret)
@@ -1061,3 +1393,121 @@ class Loader(object):
                 log.error(msg.format(cfn))
             os.umask(cumask)
         return grains_data
+
+
+class LazyFunctions(collections.MutableMapping):
+    '''
+    The functions of a loader, the module of a function is only imported
+    and packed when the function is first looked up. Listing or copying the
+    functions loads every module.
+
+    This is not a dict subclass, on Python 2 ``dict(funcs)`` and
+    ``{}.update(funcs)`` would only copy the functions loaded so far.
+    Modules are loaded under a lock, so a thread looking up a function of a
+    module another thread is loading waits for it.
+    '''
+    def __init__(self,
+                 loader,
+                 names,
+                 virtual_map,
+                 pack=None,
+                 whitelist=None,
+                 provider_overrides=False):
+        self._dict = {}
+        self.loader = loader
+        self.names = names
+        self.virtual_map = virtual_map
+        self.pack = pack
+        self.whitelist = whitelist
+        self.overrides = {}
+        self.loaded = set()
+        self._lock = threading.RLock()
+        if provider_overrides and loader.opts.get('providers', False):
+            self.overrides = loader._provider_overrides(self)
+
+    def _load(self, module_name):
+        '''
+        Load the module files which provide a module name
+        '''
+        with self._lock:
+            if module_name in self.loaded:
+                return
+            # Mark the module first, its __virtual__ function may look up its
+            # own functions. The lock is reentrant, so only the loading thread
+            # sees the module as loaded before it is.
+            self.loaded.add(module_name)
+            for name in self.virtual_map.get(module_name, []):
+                if name not in self.names:
+                    continue
+                mod = self.loader._load_module(name, self.names[name])
+                if mod is None:
+                    continue
+                # The module's __virtual__ function may call other functions
+                self.loader._inject_salt(mod, self, self.pack)
+                funcs = {}
+                if self.loader._process_module(
+                        mod, funcs, self.pack, True, self.whitelist) is None:
+                    continue
+                # Enforce dependencies of module functions from "funcs"
+                Depends.enforce_dependencies(funcs)
+                self._dict.update(funcs)
+            for key, func in self.overrides.items():
+                if key.startswith('{0}.'.format(module_name)):
+                    self._dict[key] = func
+
+    def _load_all(self):
+        '''
+        Load every module
+        '''
+        with self._lock:
+            for module_name in list(self.virtual_map):
+                self._load(module_name)
+            for key, func in self.overrides.items():
+                self._dict[key] = func
+
+    def _load_key(self, key):
+        '''
+        Load the module which provides a function
+        '''
+        if isinstance(key, basestring) and '.' in key:
+            self._load(key[:key.index('.')])
+
+    def __getitem__(self, key):
+        if key not in self._dict:
+            self._load_key(key)
+        return self._dict[key]
+
+    def __setitem__(self, key, value):
+        self._load_key(key)
+        self._dict[key] = value
+
+    def __delitem__(self, key):
+        self._load_key(key)
+        del self._dict[key]
+
+    def __contains__(self, key):
+        if key not in self._dict:
+            self._load_key(key)
+        return key in self._dict
+
+    def has_key(self, key):
+        return key in self
+
+    def __iter__(self):
+        self._load_all()
+        return iter(self._dict)
+
+    def __len__(self):
+        self._load_all()
+        return len(self._dict)
+
+    def __nonzero__(self):
+        return bool(self.virtual_map) or bool(self._dict)
+
+    def __repr__(self):
+        self._load_all()
+        return repr(self._dict)
+
+    def copy(self):
+        self._load_all()
+        return self._dict.copy()
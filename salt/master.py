@@ -23,7 +23,10 @@ import getpass
 import resource
 import subprocess
 import multiprocessing
+import threading
+import bisect
 import sys
+from multiprocessing.pool import ThreadPool
 
 # Import third party libs
 import zmq
@@ -49,7 +52,10 @@ import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.verify
 import salt.utils.minions
+import salt.utils.ratelimit
+import salt.utils.rootswatch
 import salt.utils.gzip_util
+import salt.utils.jobindex
 from salt.utils.debug import enable_sigusr1_handler, enable_sigusr2_handler, inspect_stack
 from salt.exceptions import MasterExit
 from salt.utils.event import tagify
@@ -301,6 +307,10 @@ class Master(SMaster):
         clear_old_jobs_proc = multiprocessing.Process(
             target=self._clear_old_jobs)
         clear_old_jobs_proc.start()
+        roots_watcher = None
+        if salt.utils.rootswatch.enabled(self.opts):
+            roots_watcher = salt.utils.rootswatch.RootsWatcher(self.opts)
+            roots_watcher.start()
         reqserv = ReqServer(
                 self.opts,
                 self.crypticle,
@@ -323,6 +333,8 @@ class Master(SMaster):
                 )
             )
             clean_proc(clear_old_jobs_proc)
+            if roots_watcher is not None:
+                clean_proc(roots_watcher)
             clean_proc(reqserv.publisher)
             clean_proc(reqserv.eventpublisher)
             if hasattr(reqserv, 'halite'):
@@ -373,6 +385,7 @@ class Publisher(multiprocessing.Process):
         '''
         # Set up the context
         context = zmq.Context(1)
+        serial = salt.payload.Serial(self.opts)
         # Prepare minion publish socket
         pub_sock = context.socket(zmq.PUB)
         # if 2.1 >= zmq < 3.0, we only have one HWM setting
@@ -407,7 +420,17 @@ class Publisher(multiprocessing.Process):
                 # SIGUSR1 gracefully so we don't choke and die horribly
                 try:
                     package = pull_sock.recv()
-                    pub_sock.send(package)
+                    if not self.opts['zmq_filtering']:
+                        pub_sock.send(package)
+                        continue
+                    unpacked = serial.loads(package)
+                    if 'topic_lst' in unpacked:
+                        for topic in unpacked['topic_lst']:
+                            pub_sock.send_multipart(
+                                [topic, unpacked['payload']])
+                    else:
+                        pub_sock.send_multipart(
+                            [salt.utils.minions.BROADCAST_TOPIC, package])
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -461,11 +484,18 @@ class ReqServer(object):
         self.clients.bind(self.uri)
         self.work_procs = []
 
+        # The workers share the bucket, auth_rate limits all of them together
+        auth_limiter = None
+        if self.opts['auth_rate']:
+            auth_limiter = salt.utils.ratelimit.TokenBucket(
+                    self.opts['auth_rate'])
+
         for ind in range(int(self.opts['worker_threads'])):
             self.work_procs.append(MWorker(self.opts,
                     self.master_key,
                     self.key,
-                    self.crypticle))
+                    self.crypticle,
+                    auth_limiter))
 
         for ind, proc in enumerate(self.work_procs):
             log.info('Starting Salt worker process {0}'.format(ind))
@@ -549,28 +579,51 @@ class ReqServer(object):
         self.destroy()
 
 
+# Returned by MWorker._handle_payload when the reply is sent by the pool
+DEFERRED = object()
+
+
 class MWorker(multiprocessing.Process):
     '''
     The worker multiprocess instance to manage the backend operations for the
     salt master.
     '''
+    # The AES commands which can block a worker for a long time, these are run
+    # in the thread pool of the worker when worker_pool_threads is set. Each
+    # pool thread runs them with its own AESFuncs, so that the loaded modules,
+    # their __context__ and the file server backends are never shared between
+    # threads. What the AESFuncs of the threads do share, such as the minion
+    # data index, the job cache index and the gitfs repos, is safe to use
+    # from many threads. Check the same before adding a command here.
+    POOLED_CMDS = ('_pillar', '_ext_nodes', '_mine_get', '_file_recv')
+    # The upper bounds, in seconds, of the buckets of the latency histograms
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
     def __init__(self,
             opts,
             mkey,
             key,
-            crypticle):
+            crypticle,
+            auth_limiter=None):
         multiprocessing.Process.__init__(self)
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.crypticle = crypticle
         self.mkey = mkey
         self.key = key
+        self.auth_limiter = auth_limiter
         self.k_mtime = 0
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self.stats_start = time.time()
+        self._pool_local = threading.local()
 
     def __bind(self):
         '''
         Bind to the local port
         '''
+        if self.opts['worker_pool_threads']:
+            return self.__bind_pool()
         context = zmq.Context(1)
         socket = context.socket(zmq.REP)
         w_uri = 'ipc://{0}'.format(
@@ -586,6 +639,7 @@ class MWorker(multiprocessing.Process):
                     payload = self.serial.loads(package)
                     ret = self.serial.dumps(self._handle_payload(payload))
                     socket.send(ret)
+                    self._fire_stats()
                 # Properly handle EINTR from SIGUSR1
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
@@ -596,7 +650,93 @@ class MWorker(multiprocessing.Process):
         except KeyboardInterrupt:
             socket.close()
 
-    def _handle_payload(self, payload):
+    def __bind_pool(self):
+        '''
+        Bind to the local port with a DEALER socket so that many requests can
+        be in flight, the slow commands are run in a thread pool and their
+        replies are sent when they finish
+        '''
+        context = zmq.Context(1)
+        socket = context.socket(zmq.DEALER)
+        w_uri = 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'], 'workers.ipc')
+            )
+        # The replies of the pool threads are passed back through the results
+        # socket, the worker socket is only used from this thread
+        results = context.socket(zmq.PULL)
+        results.bind('inproc://results')
+        replies = context.socket(zmq.PUSH)
+        replies.connect('inproc://results')
+        pool = ThreadPool(self.opts['worker_pool_threads'])
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        poller.register(results, zmq.POLLIN)
+        log.info('Worker binding to socket {0}'.format(w_uri))
+        try:
+            socket.connect(w_uri)
+            while True:
+                try:
+                    socks = dict(poller.poll(1000))
+                    if socks.get(socket) == zmq.POLLIN:
+                        frames = socket.recv_multipart()
+                        # The leading frames route the reply to the client
+                        envelope = frames[:-1]
+                        self._update_aes()
+                        payload = self.serial.loads(frames[-1])
+
+                        def defer(func, data, envelope=envelope):
+                            pool.apply_async(
+                                self._run_pooled,
+                                (func, data),
+                                callback=lambda ret: replies.send_multipart(
+                                    envelope + [self.serial.dumps(ret)]))
+
+                        ret = self._handle_payload(payload, defer)
+                        if ret is not DEFERRED:
+                            socket.send_multipart(
+                                envelope + [self.serial.dumps(ret)])
+                    if socks.get(results) == zmq.POLLIN:
+                        self._send_results(socket, results)
+                    self._fire_stats()
+                # Properly handle EINTR from SIGUSR1
+                except zmq.ZMQError as exc:
+                    if exc.errno == errno.EINTR:
+                        continue
+                    raise exc
+        except KeyboardInterrupt:
+            pool.terminate()
+            socket.close()
+            results.close()
+            replies.close()
+
+    def _send_results(self, socket, results):
+        '''
+        Send every reply the pool threads finished, not only the first one
+        '''
+        while True:
+            try:
+                frames = results.recv_multipart(zmq.NOBLOCK)
+            except zmq.ZMQError as exc:
+                if exc.errno == errno.EAGAIN:
+                    return
+                raise
+            socket.send_multipart(frames)
+
+    def _run_pooled(self, func, data):
+        '''
+        Run a command in the thread pool, the pool only calls back with the
+        return of commands which did not raise
+        '''
+        try:
+            return func(data)
+        except Exception:
+            log.error(
+                'Error running command {0}:\n'.format(data.get('cmd')),
+                exc_info=True
+            )
+            return ''
+
+    def _handle_payload(self, payload, defer=None):
         '''
         The _handle_payload method is the key method used to figure out what
         needs to be done with communication to the server
@@ -606,8 +746,9 @@ class MWorker(multiprocessing.Process):
             load = payload['load']
         except KeyError:
             return ''
-        return {'aes': self._handle_aes,
-                'pub': self._handle_pub,
+        if key == 'aes':
+            return self._handle_aes(load, defer)
+        return {'pub': self._handle_pub,
                 'clear': self._handle_clear}[key](load)
 
     def _handle_clear(self, load):
@@ -617,7 +758,11 @@ class MWorker(multiprocessing.Process):
         log.info('Clear payload received with command {cmd}'.format(**load))
         if load['cmd'].startswith('__'):
             return False
-        return getattr(self.clear_funcs, load['cmd'])(load)
+        start = time.time()
+        try:
+            return getattr(self.clear_funcs, load['cmd'])(load)
+        finally:
+            self._record(load['cmd'], start)
 
     def _handle_pub(self, load):
         '''
@@ -627,9 +772,10 @@ class MWorker(multiprocessing.Process):
             return False
         log.info('Pubkey payload received with command {cmd}'.format(**load))
 
-    def _handle_aes(self, load):
+    def _handle_aes(self, load, defer=None):
         '''
-        Handle a command sent via an AES key
+        Handle a command sent via an AES key. If defer is passed the slow
+        commands are handed to it and DEFERRED is returned.
         '''
         try:
             data = self.crypticle.loads(load)
@@ -641,7 +787,81 @@ class MWorker(multiprocessing.Process):
         log.info('AES payload received with command {0}'.format(data['cmd']))
         if data['cmd'].startswith('__'):
             return False
-        return self.aes_funcs.run_func(data['cmd'], data)
+        if defer is not None and data['cmd'] in self.POOLED_CMDS:
+            defer(self._run_thread_aes, data)
+            return DEFERRED
+        return self._run_aes(data)
+
+    def _run_aes(self, data, aes_funcs=None):
+        '''
+        Run a decrypted AES command
+        '''
+        if aes_funcs is None:
+            aes_funcs = self.aes_funcs
+        start = time.time()
+        try:
+            return aes_funcs.run_func(data['cmd'], data)
+        finally:
+            self._record(data['cmd'], start)
+
+    def _run_thread_aes(self, data):
+        '''
+        Run a decrypted AES command in a pool thread, with the AESFuncs of
+        the thread
+        '''
+        aes_funcs = getattr(self._pool_local, 'aes_funcs', None)
+        if aes_funcs is None:
+            aes_funcs = AESFuncs(self.opts, self.crypticle)
+            self._pool_local.aes_funcs = aes_funcs
+        # Pick up a new AES key, the opts are shared with the worker
+        aes_funcs.crypticle = self.crypticle
+        return self._run_aes(data, aes_funcs)
+
+    def _record(self, cmd, start):
+        '''
+        Add the latency of a command to the statistics of the worker
+        '''
+        if not self.opts['master_stats']:
+            return
+        elapsed = time.time() - start
+        with self.stats_lock:
+            if cmd not in self.stats:
+                self.stats[cmd] = {
+                    'runs': 0,
+                    'total': 0.0,
+                    'max': 0.0,
+                    'histogram': [0] * (len(self.LATENCY_BUCKETS) + 1)}
+            stats = self.stats[cmd]
+            stats['runs'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['histogram'][
+                bisect.bisect_left(self.LATENCY_BUCKETS, elapsed)] += 1
+
+    def _fire_stats(self):
+        '''
+        Fire the command latencies of the last master_stats_event_iter
+        seconds on the master event bus and start a new period
+        '''
+        if not self.opts['master_stats']:
+            return
+        now = time.time()
+        if now - self.stats_start < self.opts['master_stats_event_iter']:
+            return
+        with self.stats_lock:
+            stats, self.stats = self.stats, {}
+        if not stats:
+            self.stats_start = now
+            return
+        for cmd in stats:
+            stats[cmd]['mean'] = stats[cmd]['total'] / stats[cmd]['runs']
+        self.clear_funcs.event.fire_event(
+                {'start': self.stats_start,
+                 'end': now,
+                 'buckets': list(self.LATENCY_BUCKETS),
+                 'stats': stats},
+                tagify([self.name, 'stats'], 'master'))
+        self.stats_start = now
 
     def _update_aes(self):
         '''
@@ -677,7 +897,8 @@ class MWorker(multiprocessing.Process):
                 self.opts,
                 self.key,
                 self.mkey,
-                self.crypticle)
+                self.crypticle,
+                self.auth_limiter)
         self.aes_funcs = AESFuncs(self.opts, self.crypticle)
         self.__bind()
 
@@ -694,6 +915,7 @@ class AESFuncs(object):
         self.serial = salt.payload.Serial(opts)
         self.crypticle = crypticle
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.job_index = salt.utils.jobindex.get_index(opts)
         # Create the tops dict for loading external top data
         self.tops = salt.loader.tops(self.opts)
         # Make a client
@@ -703,6 +925,11 @@ class AESFuncs(object):
                 self.opts,
                 states=False,
                 rend=False)
+        self.pillar_cache = None
+        if self.opts['pillar_cache']:
+            self.pillar_cache = salt.pillar.PillarCache(
+                    self.opts,
+                    self.mminion.functions)
         self.__setup_fileserver()
 
     def __setup_fileserver(self):
@@ -711,6 +938,7 @@ class AESFuncs(object):
         '''
         fs_ = salt.fileserver.Fileserver(self.opts)
         self._serve_file = fs_.serve_file
+        self._serve_dir = fs_.serve_dir
         self._file_hash = fs_.file_hash
         self._file_list = fs_.file_list
         self._file_list_emptydirs = fs_.file_list_emptydirs
@@ -1158,25 +1386,28 @@ class AESFuncs(object):
             return False
         if not salt.utils.verify.valid_id(self.opts, load['id']):
             return False
-        pillar = salt.pillar.Pillar(
-                self.opts,
-                load['grains'],
-                load['id'],
-                load.get('saltenv', load.get('env')),
-                load.get('ext'),
-                self.mminion.functions)
-        data = pillar.compile_pillar()
+        if self.pillar_cache is not None:
+            data = self.pillar_cache.compile_pillar(
+                    load['grains'],
+                    load['id'],
+                    load.get('saltenv', load.get('env')),
+                    load.get('ext'))
+        else:
+            pillar = salt.pillar.Pillar(
+                    self.opts,
+                    load['grains'],
+                    load['id'],
+                    load.get('saltenv', load.get('env')),
+                    load.get('ext'),
+                    self.mminion.functions)
+            data = pillar.compile_pillar()
         if self.opts.get('minion_data_cache', False):
-            cdir = os.path.join(self.opts['cachedir'], 'minions', load['id'])
-            if not os.path.isdir(cdir):
-                os.makedirs(cdir)
-            datap = os.path.join(cdir, 'data.p')
-            with salt.utils.fopen(datap, 'w+b') as fp_:
-                fp_.write(
-                        self.serial.dumps(
-                            {'grains': load['grains'],
-                             'pillar': data})
-                            )
+            salt.utils.minions.store_minion_data(
+                    self.opts,
+                    load['id'],
+                    load['grains'],
+                    data,
+                    self.serial)
         return data
 
     def _minion_event(self, load):
@@ -1280,6 +1511,8 @@ class AESFuncs(object):
                 os.path.join(hn_dir, 'return.p'), 'w+b'
             )
         )
+        if self.job_index is not None:
+            self.job_index.add_return(load['jid'], load['id'])
         if 'out' in load:
             self.serial.dump(
                 load['out'],
@@ -1290,11 +1523,41 @@ class AESFuncs(object):
                 )
             )
 
+    def _minion_batch(self, load):
+        '''
+        Receive the job returns and events a minion sent at once
+        '''
+        if 'id' not in load or not isinstance(load.get('loads'), list):
+            return False
+        handlers = {'_return': self._return,
+                    '_minion_event': self._minion_event}
+        for item in load['loads']:
+            if not isinstance(item, dict) or item.get('cmd') not in handlers:
+                continue
+            item['id'] = load['id']
+            try:
+                handlers[item['cmd']](item)
+            except Exception:
+                log.error(
+                    'Error in function {0}:\n'.format(item['cmd']),
+                    exc_info=True
+                )
+        return True
+
     def _syndic_return(self, load):
         '''
         Receive a syndic minion return and format it to look like returns from
-        individual minions.
+        individual minions. A syndic sends the returns of several jobs at
+        once in the ``jobs`` list of the load.
         '''
+        if isinstance(load.get('jobs'), list):
+            for job in load['jobs']:
+                if not isinstance(job, dict) or 'jobs' in job:
+                    continue
+                job['id'] = load.get('id')
+                if self._syndic_return(job) is False:
+                    return False
+            return
         # Verify the load
         if any(key not in load for key in ('return', 'jid', 'id')):
             return None
@@ -1311,6 +1574,8 @@ class AESFuncs(object):
             if 'load' in load:
                 with salt.utils.fopen(os.path.join(jid_dir, '.load.p'), 'w+b') as fp_:
                     self.serial.dump(load['load'], fp_)
+                if self.job_index is not None:
+                    self.job_index.add_job(load['jid'], load['load'])
         wtag = os.path.join(jid_dir, 'wtag_{0}'.format(load['id']))
         try:
             with salt.utils.fopen(wtag, 'w+b') as fp_:
@@ -1626,18 +1891,24 @@ class ClearFuncs(object):
     # the clear:
     # publish (The publish from the LocalClient)
     # _auth
-    def __init__(self, opts, key, master_key, crypticle):
+    def __init__(self, opts, key, master_key, crypticle, auth_limiter=None):
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.key = key
         self.master_key = master_key
         self.crypticle = crypticle
+        self.auth_limiter = auth_limiter
+        # The accepted minion keys and the signature of the current AES key
+        self.pub_keys = salt.crypt.PubKeyCache(
+                self.opts['auth_key_cache_size'])
+        self.aes_sig = None
         # Create the event manager
         self.event = salt.utils.event.MasterEvent(self.opts['sock_dir'])
         # Make a client
         self.local = salt.client.LocalClient(self.opts['conf_file'])
         # Make an minion checker object
         self.ckminions = salt.utils.minions.CkMinions(opts)
+        self.job_index = salt.utils.jobindex.get_index(opts)
         # Make an Auth object
         self.loadauth = salt.auth.LoadAuth(opts)
         # Stand up the master Minion to access returner data
@@ -1754,6 +2025,21 @@ class ClearFuncs(object):
             self.opts.get('autosign_file', None)
         )
 
+    def __sign_aes(self, aes):
+        '''
+        Sign the digest of the AES key sent to a minion. The signature of the
+        session key is the same for all minions, so it is only computed once
+        per key rotation.
+        '''
+        if aes != self.opts['aes']:
+            # The key is combined with a token from the minion
+            digest = hashlib.sha256(aes).hexdigest()
+            return self.master_key.key.private_encrypt(digest, 5)
+        if self.aes_sig is None or self.aes_sig[0] != aes:
+            digest = hashlib.sha256(aes).hexdigest()
+            self.aes_sig = (aes, self.master_key.key.private_encrypt(digest, 5))
+        return self.aes_sig[1]
+
     def _auth(self, load):
         '''
         Authenticate the client, use the sent public key to encrypt the AES key
@@ -1776,6 +2062,18 @@ class ClearFuncs(object):
                 )
             return {'enc': 'clear',
                     'load': {'ret': False}}
+        if self.auth_limiter is not None:
+            retry_after = self.auth_limiter.consume()
+            if retry_after:
+                log.debug(
+                    'Authentication request from {0} deferred for {1:.1f} '
+                    'seconds'.format(load['id'], retry_after)
+                )
+                # This is the reply to a minion whose key is pending, plus
+                # retry_after, so minions which do not know about
+                # retry_after wait and authenticate again
+                return {'enc': 'clear',
+                        'load': {'ret': True, 'retry_after': retry_after}}
         log.info('Authentication request from {id}'.format(**load))
 
         # Check if key is configured to be auto-rejected/signed
@@ -1810,7 +2108,7 @@ class ClearFuncs(object):
 
         elif os.path.isfile(pubfn):
             # The key has been accepted, check it
-            if salt.utils.fopen(pubfn, 'r').read() != load['pub']:
+            if self.pub_keys.read(pubfn) != load['pub']:
                 log.error(
                     'Authentication attempt from {id} failed, the public '
                     'keys did not match. This may be an attempt to compromise '
@@ -1971,7 +2269,7 @@ class ClearFuncs(object):
         # The key payload may sometimes be corrupt when using auto-accept
         # and an empty request comes in
         try:
-            pub = RSA.load_pub_key(pubfn)
+            pub = self.pub_keys.rsa(pubfn)
         except RSA.RSAError as err:
             log.error('Corrupt public key "{0}": {1}'.format(pubfn, err))
             return {'enc': 'clear',
@@ -2009,8 +2307,7 @@ class ClearFuncs(object):
             aes = self.opts['aes']
             ret['aes'] = pub.public_encrypt(self.opts['aes'], 4)
         # Be aggressive about the signature
-        digest = hashlib.sha256(aes).hexdigest()
-        ret['sig'] = self.master_key.key.private_encrypt(digest, 5)
+        ret['sig'] = self.__sign_aes(aes)
         eload = {'result': True,
                  'act': 'accept',
                  'id': load['id'],
@@ -2555,6 +2852,8 @@ class ClearFuncs(object):
                 minions,
                 salt.utils.fopen(os.path.join(jid_dir, '.minions.p'), 'w+b')
                 )
+        if self.job_index is not None:
+            self.job_index.add_job(clear_load['jid'], clear_load, minions)
         if self.opts['ext_job_cache']:
             try:
                 fstr = '{0}.save_load'.format(self.opts['ext_job_cache'])
@@ -2623,7 +2922,18 @@ class ClearFuncs(object):
             os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
             )
         pub_sock.connect(pull_uri)
-        pub_sock.send(self.serial.dumps(payload))
+        topics = salt.utils.minions.pub_topics(
+                self.opts,
+                clear_load['tgt'],
+                clear_load.get('tgt_type', 'glob'),
+                minions)
+        if topics is not None:
+            # Let the publisher send the job to the targeted minions only
+            int_payload = {'payload': self.serial.dumps(payload),
+                           'topic_lst': topics}
+            pub_sock.send(self.serial.dumps(int_payload))
+        else:
+            pub_sock.send(self.serial.dumps(payload))
         return {
             'enc': 'clear',
             'load': {
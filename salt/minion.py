@@ -62,11 +62,13 @@ import salt.client
 import salt.crypt
 import salt.loader
 import salt.utils
+import salt.utils.minions
 import salt.payload
 import salt.utils.schedule
 import salt.utils.event
 
-from salt._compat import string_types
+from salt._compat import string_types, Queue
+from salt.utils.odict import OrderedDict
 from salt.utils.debug import enable_sigusr1_handler
 from salt.utils.event import tagify
 import salt.syspaths
@@ -249,8 +251,11 @@ class SMinion(object):
     functions for general use.
     '''
     def __init__(self, opts):
+        # The time spent in each step of the startup, reported by
+        # salt-call --profile-startup
+        self.timings = []
         # Late setup of the opts grains, so we can log from the grains module
-        opts['grains'] = salt.loader.grains(opts)
+        opts['grains'] = self._timed('grains', salt.loader.grains, opts)
         self.opts = opts
 
         # Clean out the proc directory (default /var/cache/salt/minion/proc)
@@ -282,19 +287,36 @@ class SMinion(object):
         '''
         Load all of the modules for the minion
         '''
-        self.opts['pillar'] = salt.pillar.get_pillar(
-            self.opts,
-            self.opts['grains'],
-            self.opts['id'],
-            self.opts['environment'],
-        ).compile_pillar()
-        self.functions = salt.loader.minion_mods(self.opts)
-        self.returners = salt.loader.returners(self.opts, self.functions)
-        self.states = salt.loader.states(self.opts, self.functions)
-        self.rend = salt.loader.render(self.opts, self.functions)
+        self.opts['pillar'] = self._timed(
+            'pillar',
+            lambda: salt.pillar.get_pillar(
+                self.opts,
+                self.opts['grains'],
+                self.opts['id'],
+                self.opts['environment'],
+            ).compile_pillar()
+        )
+        self.functions = self._timed(
+            'modules', salt.loader.minion_mods, self.opts)
+        self.returners = self._timed(
+            'returners', salt.loader.returners, self.opts, self.functions)
+        self.states = self._timed(
+            'states', salt.loader.states, self.opts, self.functions)
+        self.rend = self._timed(
+            'renderers', salt.loader.render, self.opts, self.functions)
         self.matcher = Matcher(self.opts, self.functions)
         self.functions['sys.reload_modules'] = self.gen_modules
 
+    def _timed(self, name, func, *args, **kwargs):
+        '''
+        Call func and record how long the call took under the passed name
+        '''
+        start = time.time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.timings.append((name, time.time() - start))
+
 
 class MinionBase(object):
     def __init__(self, opts):
@@ -565,6 +587,12 @@ class Minion(MinionBase):
         Pass in the options dict
         '''
         self._running = None
+        # The connection to the master kept by the sender thread of the minion
+        # loop, and the queue of the loads it sends
+        self._sreq = None
+        self._req_owner = None
+        self._req_pid = None
+        self._req_queue = None
 
         # Warn if ZMQ < 3.2
         if HAS_ZMQ and (not(hasattr(zmq, 'zmq_version_info')) or
@@ -671,9 +699,8 @@ class Minion(MinionBase):
             load['tag'] = tag
         else:
             return
-        sreq = salt.payload.SREQ(self.opts['master_uri'])
         try:
-            sreq.send('aes', self.crypticle.dumps(load))
+            self._master_req(load)
         except Exception:
             pass
 
@@ -968,7 +995,6 @@ class Minion(MinionBase):
                     # The file is gone already
                     pass
         log.info('Returning information for job: {0}'.format(jid))
-        sreq = salt.payload.SREQ(self.opts['master_uri'])
         if ret_cmd == '_syndic_return':
             load = {'cmd': ret_cmd,
                     'id': self.opts['id'],
@@ -992,19 +1018,7 @@ class Minion(MinionBase):
         else:
             if isinstance(oput, string_types):
                 load['out'] = oput
-        try:
-            ret_val = sreq.send('aes', self.crypticle.dumps(load))
-        except SaltReqTimeoutError:
-            msg = ('The minion failed to return the job information for job '
-                   '{0}. This is often due to the master being shut down or '
-                   'overloaded. If the master is running consider incresing '
-                   'the worker_threads value.').format(jid)
-            log.warn(msg)
-            return ''
-        if isinstance(ret_val, string_types) and not ret_val:
-            # The master AES key has changed, reauth
-            self.authenticate()
-            ret_val = sreq.send('aes', self.crypticle.dumps(load))
+        ret_val = self._master_req(load)
         if self.opts['cache_jobs']:
             # Local job cache has been enabled
             fn_ = os.path.join(
@@ -1018,6 +1032,112 @@ class Minion(MinionBase):
             salt.utils.fopen(fn_, 'w+b').write(self.serial.dumps(ret))
         return ret_val
 
+    def _send_master(self, load):
+        '''
+        Send a load to the master. The sender thread of the minion loop keeps
+        its connection to the master open, the other threads and processes
+        open a new one.
+        '''
+        owner = self._req_owner is not None and \
+            self._req_owner == (os.getpid(), threading.current_thread().ident)
+        if owner:
+            if self._sreq is None:
+                self._sreq = salt.payload.SREQ(self.opts['master_uri'])
+            sreq = self._sreq
+        else:
+            sreq = salt.payload.SREQ(self.opts['master_uri'])
+        try:
+            ret_val = sreq.send('aes', self.crypticle.dumps(load))
+            if isinstance(ret_val, string_types) and not ret_val:
+                # The master AES key has changed, reauth
+                self.authenticate()
+                ret_val = sreq.send('aes', self.crypticle.dumps(load))
+        except SaltReqTimeoutError:
+            if owner:
+                # A request socket cannot send again before it got its reply
+                self._sreq.destroy()
+                self._sreq = None
+            msg = ('The minion failed to send the {0} request to the master. '
+                   'This is often due to the master being shut down or '
+                   'overloaded. If the master is running consider increasing '
+                   'the worker_threads value.').format(load['cmd'])
+            log.warn(msg)
+            return ''
+        return ret_val
+
+    def _master_req(self, load):
+        '''
+        Send a job return or an event to the master. While the minion loop
+        runs the loads are queued for its sender thread, so that neither the
+        loop nor the jobs wait on the master. The job processes hand their
+        loads to the loop over the minion event bus.
+        '''
+        if self._req_queue is None:
+            return self._send_master(load)
+        if self._req_pid == os.getpid():
+            self._req_queue.put(load)
+            return True
+        try:
+            event = salt.utils.event.MinionEvent(**self.opts)
+            try:
+                return event.fire_event({'load': load}, 'master_req')
+            finally:
+                event.destroy()
+        except Exception:
+            log.debug(
+                'Failed to hand the load to the minion loop, sending it to '
+                'the master', exc_info=True
+            )
+        return self._send_master(load)
+
+    def _master_sender(self, queue):
+        '''
+        Send the loads queued by _master_req to the master until a None is
+        queued. The loads queued within return_batch_window seconds are sent
+        in one request, up to return_batch_size of them.
+        '''
+        self._req_owner = (os.getpid(), threading.current_thread().ident)
+        running = True
+        while running:
+            loads = [queue.get()]
+            deadline = time.time() + self.opts['return_batch_window']
+            while loads[-1] is not None and \
+                    len(loads) < self.opts['return_batch_size']:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    loads.append(queue.get(timeout=timeout))
+                except Queue.Empty:
+                    break
+            if loads[-1] is None:
+                # The minion is shutting down
+                running = False
+                loads.pop()
+            try:
+                self._flush_master(loads)
+            except Exception:
+                log.error(
+                    'Failed to send the returns and events to the master',
+                    exc_info=True
+                )
+        if self._sreq is not None:
+            self._sreq.destroy()
+            self._sreq = None
+
+    def _flush_master(self, loads):
+        '''
+        Send the loads to the master, several loads in one request
+        '''
+        if not loads:
+            return
+        if len(loads) == 1:
+            self._send_master(loads[0])
+        else:
+            self._send_master({'cmd': '_minion_batch',
+                               'id': self.opts['id'],
+                               'loads': loads})
+
     def _state_run(self):
         '''
         Execute a state run based on information set in the minion config file
@@ -1119,12 +1239,28 @@ class Minion(MinionBase):
         )
 
     def _setsockopts(self):
-        self.socket.setsockopt(zmq.SUBSCRIBE, '')
+        if self.opts.get('zmq_filtering', False):
+            # Only receive the publications for this minion and the ones
+            # broadcast to all minions
+            self.socket.setsockopt(
+                zmq.SUBSCRIBE, salt.utils.minions.BROADCAST_TOPIC)
+            self.socket.setsockopt(
+                zmq.SUBSCRIBE,
+                salt.utils.minions.pub_topic(self.opts['id']))
+        else:
+            self.socket.setsockopt(zmq.SUBSCRIBE, '')
         self.socket.setsockopt(zmq.IDENTITY, self.opts['id'])
         self._set_ipv4only()
         self._set_reconnect_ivl_max()
         self._set_tcp_keepalive()
 
+    def _recv_pub(self, flags=0):
+        '''
+        Receive and load a publication from the master, publications sent
+        with zmq_filtering are prefixed with their topic
+        '''
+        return self.serial.loads(self.socket.recv_multipart(flags)[-1])
+
     @property
     def master_pub(self):
         '''
@@ -1248,6 +1384,15 @@ class Minion(MinionBase):
         self.poller.register(self.socket, zmq.POLLIN)
         self.poller.register(self.epull_sock, zmq.POLLIN)
 
+        # The returns and events are sent to the master by a thread of their
+        # own, the job processes hand them to it through this loop
+        self._req_pid = os.getpid()
+        self._req_queue = Queue.Queue()
+        sender = threading.Thread(target=self._master_sender,
+                                  args=(self._req_queue,))
+        sender.daemon = True
+        sender.start()
+
         self._fire_master_minion_start()
 
         # Make sure to gracefully handle SIGUSR1
@@ -1304,7 +1449,7 @@ class Minion(MinionBase):
                     loop_interval * 1000)
                 )
                 if socks.get(self.socket) == zmq.POLLIN:
-                    payload = self.serial.loads(self.socket.recv(zmq.NOBLOCK))
+                    payload = self._recv_pub(zmq.NOBLOCK)
                     log.trace('Handling payload')
                     self._handle_payload(payload)
 
@@ -1326,7 +1471,13 @@ class Minion(MinionBase):
                             log.debug('Forwarding master event tag={tag}'.format(tag=data['tag']))
                             self._fire_master(data['data'], data['tag'], data['events'], data['pretag'])
 
-                        self.epub_sock.send(package)
+                        if package.startswith('master_req'):
+                            # A job return or event from a job, only for the
+                            # master
+                            tag, data = salt.utils.event.MinionEvent.unpack(package)
+                            self._master_req(data['load'])
+                        else:
+                            self.epub_sock.send(package)
                     except Exception:
                         log.debug('Exception while handling events', exc_info=True)
 
@@ -1370,7 +1521,7 @@ class Minion(MinionBase):
                     loop_interval * 1000)
                 )
                 if self.socket in socks and socks[self.socket] == zmq.POLLIN:
-                    payload = self.serial.loads(self.socket.recv())
+                    payload = self._recv_pub()
                     self._handle_payload(payload)
                 # Check the event system
             except zmq.ZMQError:
@@ -1388,6 +1539,11 @@ class Minion(MinionBase):
         Tear down the minion
         '''
         self._running = False
+        if getattr(self, '_req_queue', None) is not None and \
+                self._req_pid == os.getpid():
+            # The sender thread stops once it sent the queued loads
+            self._req_queue.put(None)
+            self._req_queue = None
         if hasattr(self, 'poller'):
             if isinstance(self.poller.sockets, dict):
                 for socket in self.poller.sockets.keys():
@@ -1413,6 +1569,102 @@ class Minion(MinionBase):
         self.destroy()
 
 
+class SyndicBatch(object):
+    '''
+    Gather the job returns and the events a syndic forwards to its master.
+    A batch is due when it holds syndic_batch_size returns and events or
+    when its oldest one waited syndic_batch_window seconds.
+    '''
+    # The number of job loads kept in memory
+    LOAD_CACHE_SIZE = 1000
+
+    def __init__(self, opts, jid_load):
+        self.size = max(1, int(opts['syndic_batch_size']))
+        self.window = opts['syndic_batch_window']
+        self.jid_load = jid_load
+        self.loads = OrderedDict()
+        self._reset()
+
+    def _reset(self):
+        self.jids = OrderedDict()
+        self.events = []
+        self.count = 0
+        self.started = None
+
+    def _load(self, jid):
+        '''
+        Return the load of a job, the loads of the recent jobs are kept in
+        memory
+        '''
+        if jid in self.loads:
+            load = self.loads.pop(jid)
+        else:
+            load = self.jid_load(jid)
+            if not load:
+                # The job is not known yet, look again for the next return
+                return load
+        self.loads[jid] = load
+        while len(self.loads) > self.LOAD_CACHE_SIZE:
+            self.loads.popitem(last=False)
+        return load
+
+    def add(self, event):
+        '''
+        Add an event from the local event bus to the batch, return True when
+        the batch is full
+        '''
+        tag = event['tag']
+        data = event['data']
+        if salt.utils.is_jid(tag) and 'return' in data:
+            if tag not in self.jids:
+                if 'jid' not in data:
+                    # Not a job return
+                    return self.full()
+                self.jids[tag] = {'__fun__': data.get('fun'),
+                                  '__jid__': data['jid'],
+                                  '__load__': self._load(data['jid'])}
+            self.jids[tag][data['id']] = data['return']
+        elif 'retcode' not in data:
+            # Add generic event aggregation here
+            self.events.append(event)
+        else:
+            return self.full()
+        self.count += 1
+        if self.started is None:
+            self.started = time.time()
+        return self.full()
+
+    def full(self):
+        '''
+        Return True when the batch holds syndic_batch_size returns and events
+        '''
+        return self.count >= self.size
+
+    def timeout(self):
+        '''
+        Return the number of seconds until the batch is due, None if the
+        batch is empty
+        '''
+        if not self.count:
+            return None
+        return max(0, self.started + self.window - time.time())
+
+    def due(self):
+        '''
+        Return True when the batch needs to be forwarded
+        '''
+        return self.timeout() == 0 or self.full()
+
+    def flush(self):
+        '''
+        Return the job returns and the events of the batch and empty it
+        '''
+        jobs = self.jids.values()
+        events = self.events
+        self._reset()
+        return jobs, events
+
+
 class Syndic(Minion):
     '''
     Make a Syndic minion, this minion will use the minion keys on the
@@ -1537,44 +1789,24 @@ class Syndic(Minion):
         # Make sure to gracefully handle SIGUSR1
         enable_sigusr1_handler()
 
+        # The returns are read as soon as they reach the local event bus
+        self.poller.register(self.local.event.sub, zmq.POLLIN)
+        self._req_owner = (os.getpid(), threading.current_thread().ident)
+        batch = SyndicBatch(self.opts, self._jid_load)
+
         loop_interval = int(self.opts['loop_interval'])
         while True:
             try:
-                socks = dict(self.poller.poll(
-                    loop_interval * 1000)
-                )
+                timeout = batch.timeout()
+                if timeout is None:
+                    timeout = loop_interval
+                socks = dict(self.poller.poll(int(timeout * 1000)))
                 if self.socket in socks and socks[self.socket] == zmq.POLLIN:
-                    payload = self.serial.loads(self.socket.recv())
+                    payload = self._recv_pub()
                     self._handle_payload(payload)
-                time.sleep(0.05)
-                jids = {}
-                raw_events = []
-                while True:
-                    event = self.local.event.get_event(0.5, full=True)
-                    if event is None:
-                        # Timeout reached
-                        break
-                    if salt.utils.is_jid(event['tag']) and 'return' in event['data']:
-                        if not event['tag'] in jids:
-                            if not 'jid' in event['data']:
-                                # Not a job return
-                                continue
-                            jids[event['tag']] = {}
-                            jids[event['tag']]['__fun__'] = event['data'].get('fun')
-                            jids[event['tag']]['__jid__'] = event['data']['jid']
-                            jids[event['tag']]['__load__'] = salt.utils.jid_load(
-                                event['data']['jid'],
-                                self.local.opts['cachedir'],
-                                self.opts['hash_type'])
-                        jids[event['tag']][event['data']['id']] = event['data']['return']
-                    else:
-                        # Add generic event aggregation here
-                        if not 'retcode' in event['data']:
-                            raw_events.append(event)
-                if raw_events:
-                    self._fire_master(events=raw_events, pretag=tagify(self.opts['id'], base='syndic'))
-                for jid in jids:
-                    self._return_pub(jids[jid], '_syndic_return')
+                self._read_events(batch)
+                if batch.due():
+                    self._forward(*batch.flush())
             except zmq.ZMQError:
                 # This is thrown by the interrupt caused by python handling the
                 # SIGCHLD. This is a safe error and we just start the poll
@@ -1586,6 +1818,86 @@ class Syndic(Minion):
                     exc_info=True
                 )
 
+    def _jid_load(self, jid):
+        '''
+        Return the load of a job published by the local master
+        '''
+        return salt.utils.jid_load(
+            jid,
+            self.local.opts['cachedir'],
+            self.opts['hash_type'])
+
+    def _read_events(self, batch):
+        '''
+        Add the events waiting on the local event bus to the batch. A full
+        batch is forwarded before reading on, the events wait on the event
+        bus while the master takes the batch.
+        '''
+        event = self.local.event
+        while True:
+            if event.pending_events:
+                evt = event.pending_events.pop(0)
+            else:
+                try:
+                    raw = event.sub.recv(zmq.NOBLOCK)
+                except zmq.ZMQError as exc:
+                    if exc.errno == errno.EAGAIN:
+                        return
+                    raise
+                mtag, data = event.unpack(raw, event.serial)
+                evt = {'tag': mtag, 'data': data}
+            if batch.add(evt):
+                self._forward(*batch.flush())
+
+    def _syndic_load(self, ret):
+        '''
+        Return the _syndic_return load of the returns of a job
+        '''
+        fun = ret['__fun__']
+        load = {'cmd': '_syndic_return',
+                'id': self.opts['id'],
+                'jid': ret['__jid__'],
+                'fun': fun,
+                'load': ret['__load__'],
+                'return': {}}
+        for key, value in ret.items():
+            if key.startswith('__'):
+                continue
+            load['return'][key] = value
+        try:
+            oput = self.functions[fun].__outputter__
+        except (KeyError, AttributeError, TypeError):
+            pass
+        else:
+            if isinstance(oput, string_types):
+                load['out'] = oput
+        return load
+
+    def _forward(self, jobs, events):
+        '''
+        Forward a batch of job returns and events to the master. The returns
+        of several jobs are sent in a single _syndic_return load.
+        '''
+        if events:
+            self._send_master({'id': self.opts['id'],
+                               'cmd': '_minion_event',
+                               'pretag': tagify(self.opts['id'], base='syndic'),
+                               'tok': self.tok,
+                               'events': events})
+        if not jobs:
+            return
+        for ret in jobs:
+            log.info(
+                'Returning information for job: {0}'.format(ret['__jid__'])
+            )
+        loads = [self._syndic_load(ret) for ret in jobs]
+        if len(loads) == 1:
+            self._send_master(loads[0])
+        else:
+            self._send_master({'cmd': '_syndic_return',
+                               'id': self.opts['id'],
+                               'jobs': loads})
+
     def destroy(self):
         '''
         Tear down the syndic minion
@@ -1877,6 +2189,10 @@ class ProxyMinion(Minion):
             self.functions,
             self.returners)
         self.grains_cache = self.opts['grains']
+        self._sreq = None
+        self._req_owner = None
+        self._req_pid = None
+        self._req_queue = None
 
     def _prep_mod_opts(self):
         '''
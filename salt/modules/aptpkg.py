@@ -139,6 +139,85 @@ def _warn_software_properties(repo):
     log.warning('Best guess at ppa format: {0}'.format(repo))
 
 
+def _parse_policy(out):
+    '''
+    Return a dict of the install candidates found in the output of
+    ``apt-cache policy``, keyed by package name
+    '''
+    ret = {}
+    name = None
+    for line in out.splitlines():
+        if line.endswith(':') and not line[:1].isspace():
+            # Each package's section starts with an unindented "name:" line
+            name = line[:-1]
+            ret[name] = ''
+        elif name is not None and 'Candidate' in line:
+            cols = line.split()
+            if len(cols) >= 2:
+                ret[name] = cols[-1]
+    return ret
+
+
+def _policy_stamp():
+    '''
+    Return the modification times of the package lists and the pinning
+    preferences, which decide the install candidates
+    '''
+    ret = []
+    for path in ('/var/lib/apt/lists',
+                 '/etc/apt/preferences',
+                 '/etc/apt/preferences.d'):
+        try:
+            ret.append(os.stat(path).st_mtime)
+        except OSError:
+            ret.append(None)
+    return tuple(ret)
+
+
+def _latest_candidates(names, repo):
+    '''
+    Return a dict of the install candidates of the named packages. All the
+    packages which have not been looked up yet are queried with a single
+    ``apt-cache policy`` call, and the candidates are kept in __context__
+    until the package lists or the pinning change.
+    '''
+    stamp = _policy_stamp()
+    cache = __context__.get('pkg.latest_version')
+    if cache is None or cache['stamp'] != stamp:
+        cache = {'stamp': stamp, 'repos': {}}
+        __context__['pkg.latest_version'] = cache
+    candidates = cache['repos'].setdefault(tuple(repo), {})
+    missing = [x for x in names if x not in candidates]
+    if missing:
+        cmd = ['apt-cache', '-q', 'policy'] + missing + repo
+        out = __salt__['cmd.run_all'](cmd, python_shell=False,
+                                      output_loglevel='debug')
+        found = _parse_policy(out['stdout'])
+        for name in missing:
+            if name not in found:
+                # apt-cache may title the package differently than it was
+                # named (e.g. with its native arch), so ask for it alone
+                cmd = ['apt-cache', '-q', 'policy', name] + repo
+                out = __salt__['cmd.run_all'](cmd, python_shell=False,
+                                              output_loglevel='debug')
+                found[name] = ''.join(_parse_policy(out['stdout']).values())
+            candidates[name] = found[name]
+    return dict((x, candidates[x]) for x in names)
+
+
+def _forget_candidates(names):
+    '''
+    Drop the cached install candidates of packages which have been installed
+    or removed
+    '''
+    cache = __context__.get('pkg.latest_version')
+    if cache is None:
+        return
+    for candidates in cache['repos'].itervalues():
+        for name in names:
+            candidates.pop(name, None)
+
+
 def latest_version(*names, **kwargs):
     '''
     Return the latest version of the named package available for upgrade or
@@ -180,7 +259,7 @@ def latest_version(*names, **kwargs):
         ret[name] = ''
     pkgs = list_pkgs(versions_as_list=True)
     repo = ['-o', 'APT::Default-Release={0}'.format(fromrepo)] \
-        if fromrepo else ''
+        if fromrepo else []
 
     # Refresh before looking for the latest version available
     if refresh:
@@ -191,27 +270,16 @@ def latest_version(*names, **kwargs):
     for provides in virtpkgs.values():
         all_virt.update(provides)
 
+    candidates = _latest_candidates(names, repo)
     for name in names:
-        cmd = ['apt-cache', '-q', 'policy', name]
-        if isinstance(repo, list):
-            cmd = cmd + repo
-        out = __salt__['cmd.run_all'](cmd, python_shell=False,
-                                      output_loglevel='debug')
-        candidate = ''
-        for line in out['stdout'].splitlines():
-            if 'Candidate' in line:
-                candidate = line.split()
-        if len(candidate) >= 2:
-            candidate = candidate[-1]
-            if candidate.lower() == '(none)':
-                # Virtual package is a candidate for installation if and only
-                # if it is not currently installed.
-                if name in all_virt and name not in pkgs:
-                    candidate = '1'
-                else:
-                    candidate = ''
-        else:
-            candidate = ''
+        candidate = candidates[name]
+        if candidate.lower() == '(none)':
+            # Virtual package is a candidate for installation if and only
+            # if it is not currently installed.
+            if name in all_virt and name not in pkgs:
+                candidate = '1'
+            else:
+                candidate = ''
 
         installed = pkgs.get(name, [])
         if not installed:
@@ -238,6 +306,28 @@ def latest_version(*names, **kwargs):
 available_version = latest_version
 
 
+def cache_latest_version(*names, **kwargs):
+    '''
+    Look up the install candidates of the named packages with a single
+    ``apt-cache policy`` call and keep them, so that the following
+    ``pkg.latest_version`` calls for these packages do not run apt-cache
+    again. Returns ``True``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' pkg.cache_latest_version <package1> <package2> <package3> ...
+    '''
+    if salt.utils.is_true(kwargs.pop('refresh', True)):
+        refresh_db()
+    fromrepo = _get_repo(**kwargs)
+    repo = ['-o', 'APT::Default-Release={0}'.format(fromrepo)] \
+        if fromrepo else []
+    _latest_candidates(names, repo)
+    return True
+
+
 def version(*names, **kwargs):
     '''
     Returns a string representing the package version or an empty string if not
@@ -272,6 +362,7 @@ def refresh_db():
         salt '*' pkg.refresh_db
     '''
     ret = {}
+    __context__.pop('pkg.latest_version', None)
     cmd = 'apt-get -q update'
     out = __salt__['cmd.run_stdout'](cmd, output_loglevel='debug')
     for line in out.splitlines():
@@ -446,7 +537,9 @@ def install(name=None,
                         output_loglevel='debug')
     __context__.pop('pkg.list_pkgs', None)
     new = list_pkgs()
-    return salt.utils.compare_dicts(old, new)
+    ret = salt.utils.compare_dicts(old, new)
+    _forget_candidates(ret)
+    return ret
 
 
 def _uninstall(action='remove', name=None, pkgs=None, **kwargs):
@@ -479,6 +572,7 @@ def _uninstall(action='remove', name=None, pkgs=None, **kwargs):
     new_removed = list_pkgs(removed=True)
 
     ret = {'installed': salt.utils.compare_dicts(old, new)}
+    _forget_candidates(ret['installed'])
     if action == 'purge':
         ret['removed'] = salt.utils.compare_dicts(old_removed, new_removed)
         return ret
@@ -571,7 +665,9 @@ def upgrade(refresh=True, **kwargs):
     __salt__['cmd.run'](cmd, python_shell=False, output_loglevel='debug')
     __context__.pop('pkg.list_pkgs', None)
     new = list_pkgs()
-    return salt.utils.compare_dicts(old, new)
+    ret = salt.utils.compare_dicts(old, new)
+    _forget_candidates(ret)
+    return ret
 
 
 def _clean_pkglist(pkgs):
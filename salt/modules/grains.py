@@ -14,6 +14,7 @@ import yaml
 import logging
 
 # Import salt libs
+import salt.loader
 import salt.utils
 import salt.utils.dictupdate
 from salt.exceptions import SaltException
@@ -302,6 +303,25 @@ def ls():  # pylint: disable=C0103
     return sorted(__grains__)
 
 
+def profile():
+    '''
+    Call the grain functions again, without the grains caches, and return the
+    number of seconds each grain function took
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' grains.profile
+    '''
+    opts = dict(__opts__)
+    opts['grains_cache'] = False
+    opts['grains_cache_ttl'] = {}
+    timings = {}
+    salt.loader.grains(opts, profile=timings)
+    return dict((key, round(secs, 4)) for key, secs in timings.items())
+
+
 def filter_by(lookup_dict, grain='os_family', merge=None, default='default'):
     '''
     .. versionadded:: 0.17.0
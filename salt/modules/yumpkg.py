@@ -5,6 +5,7 @@ Support for YUM
 
 # Import python libs
 import copy
+import glob
 import logging
 import os
 import re
@@ -143,6 +144,55 @@ def _get_repo_options(**kwargs):
     return repo_arg
 
 
+def _metadata_stamp():
+    '''
+    Return the modification time of the newest cached repo metadata
+    '''
+    ret = None
+    for path in glob.glob('/var/cache/yum/*/repomd.xml') + \
+            glob.glob('/var/cache/yum/*/*/*/repomd.xml'):
+        try:
+            ret = max(ret, os.stat(path).st_mtime)
+        except OSError:
+            pass
+    return ret
+
+
+def _latest_updates(names, repo_arg):
+    '''
+    Return a dict of the available updates of the named packages. All the
+    packages which have not been looked up yet are queried with a single
+    repoquery call, and the updates are kept in __context__ until the repo
+    metadata changes.
+    '''
+    stamp = _metadata_stamp()
+    cache = __context__.get('pkg.latest_version')
+    if cache is None or cache['stamp'] != stamp:
+        cache = {'stamp': stamp, 'repos': {}}
+        __context__['pkg.latest_version'] = cache
+    updates = cache['repos'].setdefault(repo_arg, {})
+    missing = [x for x in names if x not in updates]
+    if missing:
+        found = _repoquery_pkginfo(
+            '{0} --pkgnarrow=available {1}'.format(repo_arg, ' '.join(missing))
+        )
+        for name in missing:
+            updates[name] = [x for x in found if x.name == name]
+    return dict((x, updates[x]) for x in names)
+
+
+def _forget_updates(names):
+    '''
+    Drop the cached updates of packages which have been installed or removed
+    '''
+    cache = __context__.get('pkg.latest_version')
+    if cache is None:
+        return
+    for updates in cache['repos'].itervalues():
+        for name in names:
+            updates.pop(name, None)
+
+
 def latest_version(*names, **kwargs):
     '''
     Return the latest version of the named package available for upgrade or
@@ -202,12 +252,10 @@ def latest_version(*names, **kwargs):
 
     # Get updates for specified package(s)
     repo_arg = _get_repo_options(**kwargs)
-    updates = _repoquery_pkginfo(
-        '{0} --pkgnarrow=available {1}'.format(repo_arg, ' '.join(names))
-    )
+    updates = _latest_updates(names, repo_arg)
 
     for name in names:
-        for pkg in (x for x in updates if x.name == name):
+        for pkg in updates[name]:
             if pkg.arch == 'noarch' or pkg.arch == namearch_map[name]:
                 ret[name] = pkg.version
                 # no need to check another match, if there was one
@@ -222,6 +270,25 @@ def latest_version(*names, **kwargs):
 available_version = latest_version
 
 
+def cache_latest_version(*names, **kwargs):
+    '''
+    Look up the available updates of the named packages with a single
+    repoquery call and keep them, so that the following
+    ``pkg.latest_version`` calls for these packages do not run repoquery
+    again. Returns ``True``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' pkg.cache_latest_version <package1> <package2> <package3> ...
+    '''
+    if salt.utils.is_true(kwargs.pop('refresh', True)):
+        refresh_db()
+    _latest_updates(names, _get_repo_options(**kwargs))
+    return True
+
+
 def upgrade_available(name):
     '''
     Check whether or not an upgrade is available for a given package
@@ -443,6 +510,7 @@ def refresh_db():
         1: False,
     }
 
+    __context__.pop('pkg.latest_version', None)
     cmd = 'yum -q clean expire-cache && yum -q check-update'
     ret = __salt__['cmd.retcode'](cmd)
     return retcodes.get(ret, False)
@@ -715,7 +783,9 @@ def install(name=None,
 
     __context__.pop('pkg.list_pkgs', None)
     new = list_pkgs()
-    return salt.utils.compare_dicts(old, new)
+    ret = salt.utils.compare_dicts(old, new)
+    _forget_updates(ret)
+    return ret
 
 
 def upgrade(refresh=True):
@@ -740,7 +810,9 @@ def upgrade(refresh=True):
     __salt__['cmd.run'](cmd, output_loglevel='debug')
     __context__.pop('pkg.list_pkgs', None)
     new = list_pkgs()
-    return salt.utils.compare_dicts(old, new)
+    ret = salt.utils.compare_dicts(old, new)
+    _forget_updates(ret)
+    return ret
 
 
 def remove(name=None, pkgs=None, **kwargs):
@@ -783,7 +855,9 @@ def remove(name=None, pkgs=None, **kwargs):
     __salt__['cmd.run'](cmd, output_loglevel='debug')
     __context__.pop('pkg.list_pkgs', None)
     new = list_pkgs()
-    return salt.utils.compare_dicts(old, new)
+    ret = salt.utils.compare_dicts(old, new)
+    _forget_updates(ret)
+    return ret
 
 
 def purge(name=None, pkgs=None, **kwargs):
@@ -5,11 +5,19 @@ Render the pillar data
 
 # Import python libs
 import os
+import json
+import time
+import shutil
+import hashlib
+import threading
 import collections
 import logging
 
 # Import salt libs
 import salt.loader
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
 import salt.fileclient
 import salt.minion
 import salt.crypt
@@ -512,3 +520,205 @@ class Pillar(object):
                 log.critical('Pillar render error: {0}'.format(error))
             pillar['_errors'] = errors
         return pillar
+
+
+def pillar_cache_dir(opts):
+    '''
+    Return the directory of the on disk tier of the pillar cache
+    '''
+    return os.path.join(opts['cachedir'], 'pillar_cache')
+
+
+def clear_pillar_cache(opts, minions=None):
+    '''
+    Clear the pillar cache of the given minions, or of all minions. The
+    masters workers drop their cached pillars compiled before the clear
+    marker of the minion or of the whole cache.
+    '''
+    cdir = pillar_cache_dir(opts)
+    if minions is None:
+        dirs = [cdir]
+    else:
+        dirs = [os.path.join(cdir, minion) for minion in minions]
+    for dir_ in dirs:
+        if os.path.isdir(dir_):
+            shutil.rmtree(dir_)
+        os.makedirs(dir_)
+        with salt.utils.fopen(os.path.join(dir_, '.clear'), 'w+'):
+            pass
+    return True
+
+
+class PillarCache(object):
+    '''
+    Cache the compiled pillar of the minions on the master.
+
+    The entries are keyed on the minion id, a hash of the grains, the saltenv
+    and the on demand ext pillar, and are kept in memory with the least
+    recently used entries evicted past pillar_cache_size. With
+    pillar_cache_disk the entries are also written under the cachedir, so
+    they are shared by the workers and survive a restart of the master.
+
+    An entry records the state of the pillar_roots environments it was
+    rendered from and is dropped when a file or directory in them changes.
+    The whole tree of each environment is checked because Jinja includes and
+    imports read files without going through the file client. The data of the
+    ext_pillar sources can not be checked this way, the entries expire after
+    pillar_cache_ttl seconds or when they are cleared with the
+    pillar.clear_cache runner.
+    '''
+    # How often to check the pillar_roots and the clear marker of the cache
+    STAT_INTERVAL = 1
+
+    def __init__(self, opts, functions=None):
+        self.opts = opts
+        self.functions = functions
+        self.serial = salt.payload.Serial(opts)
+        self.cachedir = pillar_cache_dir(opts)
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stamps = {}
+        self.cleared = 0
+        self.checked = 0
+
+    def _key(self, id_, grains, saltenv, ext):
+        '''
+        Return the cache key of a pillar
+        '''
+        data = json.dumps([grains, saltenv, ext], sort_keys=True, default=repr)
+        return '{0}/{1}'.format(id_, hashlib.md5(data).hexdigest())
+
+    def _check(self):
+        '''
+        Forget the stamps of the pillar_roots and read the clear marker of the
+        cache again if they are older than STAT_INTERVAL
+        '''
+        now = time.time()
+        if now - self.checked < self.STAT_INTERVAL:
+            return
+        self.stamps = {}
+        self.cleared = self._mtime(os.path.join(self.cachedir, '.clear'))
+        self.checked = now
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0
+
+    def _env_stamp(self, saltenv):
+        '''
+        Return a hash of the paths, sizes and mtimes of the files and
+        directories in the pillar_roots of the environment
+        '''
+        if saltenv in self.stamps:
+            return self.stamps[saltenv]
+        stamp = hashlib.md5()
+        for root in self.opts['pillar_roots'].get(saltenv, []):
+            for path, dirs, files in os.walk(root):
+                dirs.sort()
+                for name in [''] + sorted(files):
+                    fn_ = os.path.join(path, name)
+                    try:
+                        st_ = os.stat(fn_)
+                    except OSError:
+                        continue
+                    stamp.update('{0}:{1}:{2}\n'.format(
+                        fn_, st_.st_mtime, st_.st_size))
+        self.stamps[saltenv] = stamp.hexdigest()
+        return self.stamps[saltenv]
+
+    def _env_stamps(self, saltenv):
+        '''
+        Return the stamps of the environments a pillar for saltenv is
+        rendered from, the top files of every environment are read unless
+        the saltenv is set
+        '''
+        if saltenv:
+            envs = [saltenv]
+        else:
+            envs = list(self.opts['pillar_roots'])
+        return dict((env, self._env_stamp(env)) for env in envs)
+
+    def _valid(self, entry, id_):
+        '''
+        Return True if the cache entry is still current
+        '''
+        if time.time() - entry['time'] > self.opts['pillar_cache_ttl']:
+            return False
+        if entry['time'] <= self.cleared:
+            return False
+        if entry['time'] <= self._mtime(
+                os.path.join(self.cachedir, id_, '.clear')):
+            return False
+        for env, stamp in entry['stamps'].items():
+            if self._env_stamp(env) != stamp:
+                return False
+        return True
+
+    def _path(self, key):
+        return os.path.join(self.cachedir, '{0}.p'.format(key))
+
+    def _get(self, key, id_):
+        '''
+        Return the current cache entry of the key or None
+        '''
+        with self.lock:
+            self._check()
+            entry = self.entries.pop(key, None)
+            if entry is None and self.opts['pillar_cache_disk']:
+                try:
+                    with salt.utils.fopen(self._path(key), 'rb') as fp_:
+                        entry = self.serial.load(fp_)
+                except (IOError, OSError, ValueError):
+                    pass
+            if entry is None or not self._valid(entry, id_):
+                return None
+            self.entries[key] = entry
+            return entry
+
+    def _put(self, key, entry):
+        '''
+        Store a cache entry
+        '''
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            while len(self.entries) > self.opts['pillar_cache_size']:
+                self.entries.popitem(last=False)
+        if self.opts['pillar_cache_disk']:
+            path = self._path(key)
+            try:
+                if not os.path.isdir(os.path.dirname(path)):
+                    os.makedirs(os.path.dirname(path))
+                with salt.utils.atomicfile.atomic_open(path, 'w+b') as fp_:
+                    self.serial.dump(entry, fp_)
+            except (IOError, OSError) as exc:
+                log.warning(
+                    'Unable to write the pillar cache file {0}: {1}'.format(
+                        path, exc))
+
+    def compile_pillar(self, grains, id_, saltenv=None, ext=None):
+        '''
+        Return the pillar of the minion, from the cache if it is current
+        '''
+        key = self._key(id_, grains, saltenv, ext)
+        entry = self._get(key, id_)
+        if entry is not None:
+            log.debug('Returning the cached pillar of {0}'.format(id_))
+            return entry['pillar']
+        # Take the stamps before rendering, so that a change made while the
+        # pillar renders invalidates the entry
+        with self.lock:
+            stamps = self._env_stamps(saltenv)
+        start = time.time()
+        pillar = Pillar(
+                self.opts,
+                grains,
+                id_,
+                saltenv,
+                ext,
+                self.functions).compile_pillar()
+        if '_errors' not in pillar:
+            self._put(key, {'time': start, 'stamps': stamps, 'pillar': pillar})
+        return pillar
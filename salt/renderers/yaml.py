@@ -4,11 +4,14 @@ from __future__ import absolute_import
 # Import python libs
 import logging
 import warnings
+import collections
+from yaml import YAMLError
 from yaml.scanner import ScannerError
 from yaml.constructor import ConstructorError
 
 # Import salt libs
-from salt.utils.yamlloader import CustomLoader, load
+import salt.utils.yamlloader
+from salt.utils.yamlloader import CustomLoader, HAS_LIBYAML, load
 from salt.utils.odict import OrderedDict
 from salt.exceptions import SaltRenderError
 
@@ -20,15 +23,34 @@ _ERROR_MAP = {
 }
 
 
-def get_yaml_loader(argline):
+def get_yaml_loader(argline, libyaml=False):
     '''
-    Return the ordered dict yaml loader
+    Return the ordered dict yaml loader, on the libyaml parser if libyaml is
+    set and available
     '''
+    loader_class = CustomLoader
+    if libyaml and HAS_LIBYAML:
+        loader_class = salt.utils.yamlloader.CCustomLoader
+
     def yaml_loader(*args):
-        return CustomLoader(*args, dictclass=OrderedDict)
+        return loader_class(*args, dictclass=OrderedDict)
     return yaml_loader
 
 
+def _load(yaml_data, argline):
+    '''
+    Load the YAML document with the libyaml loader when available. A document
+    libyaml fails on is loaded again by the pure python loader, which reports
+    the error with the context of the faulty line.
+    '''
+    if HAS_LIBYAML:
+        try:
+            return load(yaml_data, Loader=get_yaml_loader(argline, True))
+        except YAMLError:
+            pass
+    return load(yaml_data, Loader=get_yaml_loader(argline))
+
+
 def render(yaml_data, saltenv='base', sls='', argline='', **kws):
     '''
     Accepts YAML as a string or as a file object and runs it through the YAML
@@ -40,7 +62,13 @@ def render(yaml_data, saltenv='base', sls='', argline='', **kws):
         yaml_data = yaml_data.read()
     with warnings.catch_warnings(record=True) as warn_list:
         try:
-            data = load(yaml_data, Loader=get_yaml_loader(argline))
+            cache = salt.utils.yamlloader.get_yaml_cache(
+                __opts__.get('yaml_cache_size', 0))
+            if cache is None:
+                data = _load(yaml_data, argline)
+            else:
+                data = cache.load(
+                    yaml_data, lambda data: _load(data, argline))
         except ScannerError as exc:
             err_type = _ERROR_MAP.get(exc.problem, 'Unknown yaml render error')
             line_num = exc.problem_mark.line + 1
@@ -57,7 +85,7 @@ def render(yaml_data, saltenv='base', sls='', argline='', **kws):
         if not data:
             data = {}
         else:
-            if isinstance(__salt__, dict):
+            if isinstance(__salt__, collections.Mapping):
                 if 'config.get' in __salt__:
                     if __salt__['config.get']('yaml_utf8', False):
                         data = _yaml_result_unicode_to_utf8(data)
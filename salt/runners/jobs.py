@@ -12,6 +12,7 @@ import salt.payload
 import salt.utils
 import salt.output
 import salt.minion
+import salt.utils.jobindex
 
 
 def active():
@@ -37,7 +38,11 @@ def active():
                 ret[job['jid']].update({'Running': [], 'Returned': []})
             else:
                 ret[job['jid']]['Running'].append({minion: job['pid']})
+    index = salt.utils.jobindex.get_index(__opts__)
     for jid in ret:
+        if index is not None:
+            ret[jid]['Returned'].extend(index.returned(jid))
+            continue
         jid_dir = salt.utils.jid_dir(
                 jid,
                 __opts__['cachedir'],
@@ -107,7 +112,20 @@ def list_job(jid):
     jid_dir = salt.utils.jid_dir(jid, __opts__['cachedir'], __opts__['hash_type'])
     load_path = os.path.join(jid_dir, '.load.p')
     minions_path = os.path.join(jid_dir, '.minions.p')
-    if os.path.isfile(load_path):
+    index = salt.utils.jobindex.get_index(__opts__)
+    if index is not None:
+        load = index.get_job(jid)
+        if load:
+            ret = _format_jid_instance(jid, load)
+            ret.update({'jid': jid})
+            if 'minions' in load:
+                ret['Minions'] = load['minions']
+            elif os.path.isfile(minions_path):
+                # Jobs indexed without their minions, e.g. before the index
+                # recorded them
+                minions = serial.load(salt.utils.fopen(minions_path, 'rb'))
+                ret['Minions'] = minions
+    elif os.path.isfile(load_path):
         load = serial.load(salt.utils.fopen(load_path, 'rb'))
         jid = load['jid']
         ret = _format_jid_instance(jid, load)
@@ -120,19 +138,33 @@ def list_job(jid):
     return ret
 
 
-def list_jobs():
+def list_jobs(search_function=None, search_minion=None):
     '''
-    List all detectable jobs and associated functions
+    List all detectable jobs and associated functions, optionally only the
+    jobs which ran a given function or which a given minion returned for
 
     CLI Example:
 
     .. code-block:: bash
 
         salt-run jobs.list_jobs
+        salt-run jobs.list_jobs search_function=state.highstate
+        salt-run jobs.list_jobs search_minion=web1
     '''
     ret = {}
+    index = salt.utils.jobindex.get_index(__opts__)
+    if index is not None:
+        for jid, job in index.list_jobs(search_function, search_minion).items():
+            ret[jid] = _format_jid_instance(jid, job)
+        salt.output.display_output(ret, 'yaml', __opts__)
+        return ret
     job_dir = os.path.join(__opts__['cachedir'], 'jobs')
     for jid, job, t_path, final in _walk_through(job_dir):
+        if search_function is not None and job.get('fun') != search_function:
+            continue
+        if search_minion is not None and not os.path.isdir(
+                os.path.join(t_path, final, search_minion)):
+            continue
         ret[jid] = _format_jid_instance(jid, job)
     salt.output.display_output(ret, 'yaml', __opts__)
     return ret
@@ -150,23 +182,27 @@ def print_job(job_id):
     '''
     serial = salt.payload.Serial(__opts__)
     ret = {}
-    job_dir = os.path.join(__opts__['cachedir'], 'jobs')
-    for jid, job, t_path, final in _walk_through(job_dir):
-        if job_id == jid:
-            hosts_path = os.path.join(t_path, final)
-            hosts_return = {}
-            for host in os.listdir(hosts_path):
-                host_path = os.path.join(hosts_path, host)
-                if os.path.isdir(host_path):
-                    return_file = os.path.join(host_path, 'return.p')
-                    if not os.path.isfile(return_file):
-                        continue
-                    return_data = serial.load(
-                        salt.utils.fopen(return_file, 'rb')
-                    )
-                    hosts_return[host] = return_data
-                    ret[jid] = _format_jid_instance(jid, job)
-                    ret[jid].update({'Result': hosts_return})
+    hosts_path = salt.utils.jid_dir(
+            job_id,
+            __opts__['cachedir'],
+            __opts__['hash_type'])
+    load_path = os.path.join(hosts_path, '.load.p')
+    if os.path.isfile(load_path):
+        job = serial.load(salt.utils.fopen(load_path, 'rb'))
+        jid = job['jid']
+        hosts_return = {}
+        for host in os.listdir(hosts_path):
+            host_path = os.path.join(hosts_path, host)
+            if os.path.isdir(host_path):
+                return_file = os.path.join(host_path, 'return.p')
+                if not os.path.isfile(return_file):
+                    continue
+                return_data = serial.load(
+                    salt.utils.fopen(return_file, 'rb')
+                )
+                hosts_return[host] = return_data
+                ret[jid] = _format_jid_instance(jid, job)
+                ret[jid].update({'Result': hosts_return})
 
     salt.output.display_output(ret, 'yaml', __opts__)
     return ret
@@ -192,6 +228,12 @@ def _walk_through(job_dir):
     for top in os.listdir(job_dir):
         t_path = os.path.join(job_dir, top)
 
+        if len(top) == 10 and top.isdigit():
+            # An hour shard of the job cache, walk its hash dirs
+            for item in _walk_through(t_path):
+                yield item
+            continue
+
         for final in os.listdir(t_path):
             load_path = os.path.join(t_path, final, '.load.p')
 
@@ -35,3 +35,23 @@ def show_top(minion=None, saltenv='base'):
 
     salt.output.display_output(top, 'nested', __opts__)
     return top
+
+
+def clear_cache(tgt=None, expr_form='glob'):
+    '''
+    Clear the master pillar cache, see the pillar_cache option. If a target
+    is passed only the cached pillars of the targeted minions are cleared.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run pillar.clear_cache
+        salt-run pillar.clear_cache 'web*'
+    '''
+    minions = None
+    if tgt is not None:
+        minions = salt.utils.minions.CkMinions(__opts__).check_minions(
+                tgt,
+                expr_form)
+    return salt.pillar.clear_pillar_cache(__opts__, minions)
@@ -17,9 +17,12 @@ import os
 import sys
 import copy
 import site
+import select
 import fnmatch
 import logging
+import itertools
 import collections
+import multiprocessing
 import traceback
 import datetime
 
@@ -31,8 +34,8 @@ import salt.pillar
 import salt.fileclient
 import salt.utils.event
 import salt.syspaths as syspaths
-from salt.utils import context
-from salt._compat import string_types
+from salt.utils import context, immutabletypes
+from salt._compat import string_types, pickle
 from salt.template import compile_template, compile_template_str
 from salt.exceptions import SaltRenderError, SaltReqTimeoutError, SaltException
 
@@ -53,6 +56,7 @@ STATE_INTERNAL_KEYWORDS = frozenset([
     'require_in',
     'fail_hard',
     'reload_modules',
+    'parallel',
     'saltenv',
     '__id__',
     '__sls__',
@@ -194,6 +198,16 @@ def ishashable(obj):
     return True
 
 
+def _pickled(value):
+    '''
+    Return the pickle of a value, None if it can not be pickled
+    '''
+    try:
+        return pickle.dumps(value, -1)
+    except Exception:
+        return None
+
+
 class StateError(Exception):
     '''
     Custom exception class.
@@ -522,6 +536,74 @@ class Compiler(object):
         return high
 
 
+class RequisiteIndex(object):
+    '''
+    Find the chunks a requisite refers to without scanning every chunk.
+
+    Requisites which name a state exactly are looked up in dicts built once
+    per list of chunks, only requisites using glob patterns are matched
+    against every chunk. The matches of each requisite are cached, so a
+    requisite shared by many states is only resolved once per run.
+    '''
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self._cache = {}
+        self.by_name = collections.defaultdict(list)
+        self.by_id = collections.defaultdict(list)
+        self.by_sls = collections.defaultdict(list)
+        for pos, chunk in enumerate(chunks):
+            self.by_name[os.path.normcase(chunk['name'])].append(pos)
+            self.by_id[os.path.normcase(chunk['__id__'])].append(pos)
+            # The states from state.high, template_str or pydsl have no sls
+            if chunk.get('__sls__'):
+                self.by_sls[os.path.normcase(chunk['__sls__'])].append(pos)
+
+    def match(self, req_key, req_val):
+        '''
+        Return the chunks matched by a trimmed requisite, in chunk order
+        '''
+        if req_val is None:
+            return []
+        key = (req_key, req_val)
+        if key not in self._cache:
+            if any(char in req_val for char in '*?['):
+                self._cache[key] = self._glob_match(req_key, req_val)
+            else:
+                self._cache[key] = self._exact_match(req_key, req_val)
+        return self._cache[key]
+
+    def _exact_match(self, req_key, req_val):
+        '''
+        Look up a requisite which does not use a glob
+        '''
+        val = os.path.normcase(req_val)
+        named = set(self.by_name.get(val, ())) | set(self.by_id.get(val, ()))
+        if req_key == 'sls':
+            # A chunk with a matching name or id is never tracked by sls
+            found = set(self.by_sls.get(val, ())) - named
+        else:
+            found = [pos for pos in named
+                     if self.chunks[pos]['state'] == req_key]
+        return [self.chunks[pos] for pos in sorted(found)]
+
+    def _glob_match(self, req_key, req_val):
+        '''
+        Match a requisite using a glob against every chunk
+        '''
+        ret = []
+        for chunk in self.chunks:
+            if (fnmatch.fnmatch(chunk['name'], req_val) or
+                    fnmatch.fnmatch(chunk['__id__'], req_val)):
+                if chunk['state'] == req_key:
+                    ret.append(chunk)
+            elif req_key == 'sls':
+                # Allow requisite tracking of entire sls files
+                if chunk.get('__sls__') and \
+                        fnmatch.fnmatch(chunk['__sls__'], req_val):
+                    ret.append(chunk)
+        return ret
+
+
 class State(object):
     '''
     Class used to execute salt states
@@ -539,6 +621,11 @@ class State(object):
         self.pre = {}
         self.__run_num = 0
         self.jid = jid
+        self.req_index = None
+        # The chunks running in parallel, keyed by tag
+        self.parallel = {}
+        self.parallel_child = False
+        self.parallel_failhard = False
 
     def _gather_pillar(self):
         '''
@@ -618,6 +705,10 @@ class State(object):
         possible module type, e.g. a python, pyx, or .so. Always refresh if the
         function is recurse, since that can lay down anything.
         '''
+        if self.parallel_child:
+            # The process which started the parallel state refreshes
+            return
+
         if data.get('reload_modules', False) is True:
             # User explicitly requests a reload
             self.module_refresh()
@@ -1330,13 +1421,14 @@ class State(object):
         )
 
         inject_globals = {
-            # Pass a copy of the running dictionary, the low state chunks and
-            # the current state dictionaries.
-            # We pass deep copies here because we don't want any misbehaving
-            # state module to change these at runtime.
+            # Pass a copy of the current state dictionary and views of the
+            # running dictionary and the low state chunks.
+            # We don't want any misbehaving state module to change these at
+            # runtime. The running dictionary and the chunks are passed as
+            # read only views, deep copies of them grow with every state run.
             '__low__': copy.deepcopy(low),
-            '__running__': copy.deepcopy(running) if running else {},
-            '__lowstate__': copy.deepcopy(chunks) if chunks else {}
+            '__running__': immutabletypes.freeze(running) if running else {},
+            '__lowstate__': immutabletypes.freeze(chunks) if chunks else {}
         }
 
         if low.get('__prereq__'):
@@ -1420,16 +1512,23 @@ class State(object):
         Iterate over a list of chunks and call them, checking for requires.
         '''
         running = {}
+        self.req_index = RequisiteIndex(chunks)
+        self.parallel_failhard = False
         for low in chunks:
-            if '__FAILHARD__' in running:
-                running.pop('__FAILHARD__')
+            if self.parallel:
+                self.reap_parallel(running)
+            if '__FAILHARD__' in running or self.parallel_failhard:
+                self.reap_parallel(running, block=True)
+                running.pop('__FAILHARD__', None)
                 return running
             tag = _gen_tag(low)
             if tag not in running:
                 running = self.call_chunk(low, running, chunks)
                 if self.check_failhard(low, running):
+                    self.reap_parallel(running, block=True)
                     return running
             self.active = set()
+        self.reap_parallel(running, block=True)
         return running
 
     def check_failhard(self, low, running):
@@ -1437,11 +1536,174 @@ class State(object):
         Check if the low data chunk should send a failhard signal
         '''
         tag = _gen_tag(low)
+        if tag in running and running[tag].get('__parallel__'):
+            # The result is checked when the parallel state returns
+            return False
         if (low.get('failhard', False) or self.opts['failhard']
                 and tag in running):
             return not running[tag]['result']
         return False
 
+    def run_parallel(self, low):
+        '''
+        Return True if the low data chunk can be run in parallel with the
+        chunks which follow it
+        '''
+        if salt.utils.is_windows():
+            # Parallel states are forked off of the state run
+            return False
+        if not low.get('parallel', self.opts.get('state_parallel', False)):
+            return False
+        # Prereqs run states in test mode and back, which needs them to run
+        # in the state run itself
+        for key in ('prereq', 'prerequired', '__prereq__', '__prerequired__'):
+            if low.get(key):
+                return False
+        return True
+
+    def call_parallel(self, low, chunks, running):
+        '''
+        Fork off a process to call a state, the result is added to running
+        when the process returns. Returns the placeholder of the state in
+        running.
+        '''
+        workers = max(1, self.opts.get('state_parallel_workers', 4))
+        while len(self.parallel) >= workers:
+            self.reap_parallel(running, wait_any=True)
+        tag = _gen_tag(low)
+        # Reserve the run number so the output keeps the order the states
+        # were started in
+        run_num = self.__run_num
+        self.__run_num += 1
+        recv, send = multiprocessing.Pipe(False)
+        proc = multiprocessing.Process(
+            target=self._parallel_target,
+            args=(low, chunks, running, run_num, send))
+        proc.start()
+        send.close()
+        self.parallel[tag] = (proc, recv, low, len(chunks))
+        running[tag] = {'changes': {},
+                        'result': None,
+                        'comment': 'Running in parallel',
+                        '__run_num__': run_num,
+                        '__sls__': low['__sls__'],
+                        '__parallel__': True}
+        return running[tag]
+
+    def _parallel_target(self, low, chunks, running, run_num, send):
+        '''
+        Call a state in a forked process and send back the result, along
+        with the changes the state made to the __context__ of the modules
+        '''
+        self.parallel_child = True
+        self.parallel = {}
+        self.__run_num = run_num
+        before = dict((key, (val, _pickled(val)))
+                      for key, val in self.state_con.items())
+        try:
+            ret = self.call(low, chunks, running)
+        except Exception:
+            ret = {'result': False,
+                   'name': low['name'],
+                   'changes': {},
+                   'comment': 'An exception occurred in this state: '
+                              '{0}'.format(traceback.format_exc()),
+                   '__run_num__': run_num}
+        updates = {}
+        for key, val in self.state_con.items():
+            old, dumped = before.get(key, (None, None))
+            if dumped is None:
+                if val is not old:
+                    updates[key] = val
+            elif _pickled(val) != dumped:
+                updates[key] = val
+        removed = [key for key in before if key not in self.state_con]
+        # A context which can not be sent back makes the parent clear its own
+        for con in ((updates, removed), None):
+            try:
+                send.send({'ret': ret, 'context': con})
+                break
+            except Exception:
+                continue
+        else:
+            send.send({'ret': {'result': False,
+                               'name': low['name'],
+                               'changes': {},
+                               'comment': 'The return of the state could not '
+                                          'be serialized: {0!r}'.format(ret),
+                               '__run_num__': run_num},
+                       'context': None})
+        send.close()
+
+    def _merge_context(self, con):
+        '''
+        Apply the __context__ changes sent back by a parallel state, None
+        clears the context since the changes are not known
+        '''
+        if con is None:
+            self.state_con.clear()
+            return
+        updates, removed = con
+        for key in removed:
+            self.state_con.pop(key, None)
+        self.state_con.update(updates)
+
+    def reap_parallel(self, running, tags=None, block=False, wait_any=False):
+        '''
+        Collect the results of the parallel states which returned.
+
+        tags
+            Only collect the states with these tags
+
+        block
+            Wait for all of the states to return
+
+        wait_any
+            Wait for at least one state to return
+        '''
+        pending = [tag for tag in self.parallel
+                   if tags is None or tag in tags]
+        if not pending:
+            return
+        if block:
+            ready = pending
+        else:
+            conns = dict((self.parallel[tag][1].fileno(), tag)
+                         for tag in pending)
+            timeout = None if wait_any else 0
+            readable = select.select(list(conns), [], [], timeout)[0]
+            ready = [conns[fd_] for fd_ in readable]
+        for tag in ready:
+            proc, recv, low, length = self.parallel.pop(tag)
+            try:
+                reply = recv.recv()
+            except (EOFError, IOError):
+                reply = {'ret': {'result': False,
+                                 'name': low['name'],
+                                 'changes': {},
+                                 'comment': 'The process running this state '
+                                            'exited without returning',
+                                 '__run_num__': running[tag]['__run_num__']},
+                         'context': None}
+            recv.close()
+            proc.join()
+            ret = reply['ret']
+            self._merge_context(reply['context'])
+            ret['__sls__'] = low['__sls__']
+            running[tag] = ret
+            self.check_refresh(low, ret)
+            self.event(ret, length)
+            if self.check_failhard(low, running):
+                self.parallel_failhard = True
+
+    def requisite_index(self, chunks):
+        '''
+        Return the requisite index of the passed chunks
+        '''
+        if self.req_index is None or self.req_index.chunks is not chunks:
+            self.req_index = RequisiteIndex(chunks)
+        return self.req_index
+
     def check_requisite(self, low, running, chunks, pre=False):
         '''
         Look into the running data to check the status of all requisite
@@ -1468,28 +1730,23 @@ class State(object):
         reqs = {'require': [], 'watch': [], 'prereq': []}
         if pre:
             reqs['prerequired'] = []
+        index = self.requisite_index(chunks)
         for r_state in reqs:
             if r_state in low and low[r_state] is not None:
                 for req in low[r_state]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                found = True
-                                reqs[r_state].append(chunk)
-                        elif req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
+                    req_key = next(iter(req))
+                    found = index.match(req_key, req[req_key])
                     if not found:
                         return 'unmet'
+                    reqs[r_state].extend(found)
+        if self.parallel:
+            # Wait for the requisites which are running in parallel
+            self.reap_parallel(
+                running,
+                tags=set(_gen_tag(chunk) for chunk in
+                         itertools.chain(*reqs.values())),
+                block=True)
         fun_stats = set()
         for r_state, chunks in reqs.items():
             if r_state == 'prereq':
@@ -1557,34 +1814,21 @@ class State(object):
         if status == 'unmet':
             lost = {}
             reqs = []
+            index = self.requisite_index(chunks)
             for requisite in requisites:
                 lost[requisite] = []
                 if requisite not in low:
                     continue
                 for req in low[requisite]:
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
-                        elif req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    req_key = next(iter(req))
+                    found = index.match(req_key, req[req_key])
+                    for chunk in found:
+                        if requisite == 'prereq':
+                            chunk['__prereq__'] = True
+                        elif requisite == 'prerequired' and req_key != 'sls':
+                            chunk['__prerequired__'] = True
+                        reqs.append(chunk)
                     if not found:
                         lost[requisite].append(req)
             if lost['require'] or lost['watch'] or lost['prereq'] or lost.get('prerequired'):
@@ -1648,6 +1892,10 @@ class State(object):
         elif status == 'met':
             if low.get('__prereq__'):
                 self.pre[tag] = self.call(low, chunks, running)
+            elif self.run_parallel(low):
+                # The event is fired when the parallel state returns
+                self.call_parallel(low, chunks, running)
+                return running
             else:
                 running[tag] = self.call(low, chunks, running)
         elif status == 'fail':
@@ -34,6 +34,7 @@ This is necessary and can not be replaced by a require clause in the pkg.
 '''
 
 # Import python libs
+import copy
 import logging
 import os
 import re
@@ -83,6 +84,37 @@ def __gen_rtag():
     return os.path.join(__opts__['cachedir'], 'pkg_refresh')
 
 
+def _cache_latest(desired, fromrepo, refresh, **kwargs):
+    '''
+    Have the pkg module look up the latest versions of the desired packages
+    and of the packages of all the other pkg.latest states in this run which
+    use the same repos with a single query of the package manager. Returns
+    True if the pkg module supports this, in which case it has refreshed the
+    package database when asked to.
+    '''
+    if 'pkg.cache_latest_version' not in __salt__:
+        return False
+    repos = {'fromrepo': fromrepo}
+    for key in ('repo', 'enablerepo', 'disablerepo'):
+        repos[key] = kwargs.get(key)
+    names = set(desired)
+    for chunk in __lowstate__:
+        if chunk.get('state') != 'pkg' or chunk.get('fun') != 'latest' \
+                or chunk.get('sources'):
+            continue
+        if [x for x in repos if chunk.get(x) != repos[x]]:
+            continue
+        if chunk.get('pkgs'):
+            names.update(_repack_pkgs(copy.deepcopy(chunk['pkgs'])))
+        else:
+            names.add(chunk['name'])
+    __salt__['pkg.cache_latest_version'](*sorted(names),
+                                         fromrepo=fromrepo,
+                                         refresh=refresh,
+                                         **kwargs)
+    return True
+
+
 def _fulfills_version_spec(versions, oper, desired_version):
     '''
     Returns True if any of the installed versions match the specified version,
@@ -634,10 +666,12 @@ def latest(
     else:
         desired_pkgs = [name]
 
+    # Look up the packages of the other pkg.latest states of this run at once
+    cached = _cache_latest(desired_pkgs, fromrepo, refresh, **kwargs)
     cur = __salt__['pkg.version'](*desired_pkgs, **kwargs)
     avail = __salt__['pkg.latest_version'](*desired_pkgs,
                                            fromrepo=fromrepo,
-                                           refresh=refresh,
+                                           refresh=refresh and not cached,
                                            **kwargs)
     # Remove the rtag if it exists, ensuring only one refresh per salt run
     # (unless overridden with refresh=True)
@@ -565,11 +565,19 @@ def prep_jid(cachedir, sum_type, user='root', nocache=False):
 
 def jid_dir(jid, cachedir, sum_type):
     '''
-    Return the jid_dir for the given job id
+    Return the jid_dir for the given job id, jobs are sharded by the hour
+    they were created in so that old jobs can be cleaned an hour at a time.
+    The jobs cached before the sharding are found in the old layout.
     '''
     jid = str(jid)
     jhash = getattr(hashlib, sum_type)(jid).hexdigest()
-    return os.path.join(cachedir, 'jobs', jhash[:2], jhash[2:])
+    old_dir = os.path.join(cachedir, 'jobs', jhash[:2], jhash[2:])
+    if not is_jid(jid):
+        return old_dir
+    new_dir = os.path.join(cachedir, 'jobs', jid[:10], jhash[:2], jhash[2:])
+    if not os.path.isdir(new_dir) and os.path.isdir(old_dir):
+        return old_dir
+    return new_dir
 
 
 def jid_load(jid, cachedir, sum_type, serial='msgpack'):
@@ -49,6 +49,7 @@ Namspaced tag
 
 # Import python libs
 import os
+import re
 import fnmatch
 import glob
 import hashlib
@@ -56,8 +57,10 @@ import errno
 import logging
 import time
 import datetime
+import threading
 import multiprocessing
 from multiprocessing import Process
+from multiprocessing.pool import ThreadPool
 from collections import MutableMapping
 
 # Import third party libs
@@ -97,6 +100,7 @@ TAGS = {
     'wheel': 'wheel',  # prefix for all salt/wheel events
     'cloud': 'cloud',  # prefix for all salt/cloud events
     'fileserver': 'fileserver',  # prefix for all salt/fileserver events
+    'master': 'master',  # prefix for all salt/master events
 }
 
 
@@ -479,6 +483,64 @@ class EventPublisher(Process):
                 self.context.term()
 
 
+class ReactorDispatch(object):
+    '''
+    The reactor map compiled for matching event tags. The tags without glob
+    characters are looked up in a dict, the tags which only end with a ``*``
+    in a prefix trie, and the other ones are matched as compiled globs.
+    '''
+    GLOB_CHARS = re.compile(r'[*?[]')
+
+    def __init__(self, react_map):
+        self.exact = {}
+        self.prefixes = {}
+        self.globs = []
+        for index, ropt in enumerate(react_map or []):
+            if not isinstance(ropt, dict):
+                continue
+            if len(ropt) != 1:
+                continue
+            key, val = ropt.items()[0]
+            if not isinstance(key, string_types):
+                continue
+            if isinstance(val, string_types):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            # The index keeps the reactors in the order of the map
+            entry = (index, val)
+            wild = self.GLOB_CHARS.search(key)
+            if wild is None:
+                self.exact.setdefault(key, []).append(entry)
+            elif wild.start() == len(key) - 1 and key.endswith('*'):
+                node = self.prefixes
+                for char in key[:-1]:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(entry)
+            else:
+                self.globs.append((re.compile(fnmatch.translate(key)), entry))
+
+    def match(self, tag):
+        '''
+        Return the reactors of the tag, in the order of the map
+        '''
+        matches = list(self.exact.get(tag, ()))
+        node = self.prefixes
+        matches.extend(node.get(None, ()))
+        for char in tag:
+            node = node.get(char)
+            if node is None:
+                break
+            matches.extend(node.get(None, ()))
+        for regex, entry in self.globs:
+            if regex.match(tag):
+                matches.append(entry)
+        reactors = []
+        for _, val in sorted(matches, key=lambda entry: entry[0]):
+            reactors.extend(val)
+        return reactors
+
+
 class Reactor(multiprocessing.Process, salt.state.Compiler):
     '''
     Read in the reactor configuration variable and compare it to events
@@ -486,10 +548,20 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
     The reactor has the capability to execute pre-programmed executions
     as reactions to events
     '''
+    # Check the reactor map file for changes at most once in this many seconds
+    STAT_INTERVAL = 1
+
     def __init__(self, opts):
         multiprocessing.Process.__init__(self)
         salt.state.Compiler.__init__(self, opts)
         self.wrap = ReactWrap(self.opts)
+        self.dispatch = None
+        self.map_stamp = None
+        self.map_checked = 0
+        self.pool = None
+        self.backlog = 0
+        self.stats_lock = threading.Lock()
+        self._reset_stats(time.time())
 
     def render_reaction(self, glob_ref, tag, data):
         '''
@@ -507,44 +579,65 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
                 log.error('Failed to render "{0}"'.format(fn_))
         return react
 
+    def _read_map(self):
+        '''
+        Return the reactor map from the reactor file, or None if it cannot be
+        read
+        '''
+        try:
+            with salt.utils.fopen(self.opts['reactor']) as fp_:
+                return yaml.safe_load(fp_.read()) or []
+        except (OSError, IOError):
+            log.error(
+                'Failed to read reactor map: "{0}"'.format(
+                    self.opts['reactor']
+                    )
+                )
+        except Exception:
+            log.error(
+                'Failed to parse YAML in reactor map: "{0}"'.format(
+                    self.opts['reactor']
+                    )
+                )
+        return None
+
+    def get_dispatch(self):
+        '''
+        Return the compiled reactor map. A reactor map file is compiled again
+        when it changes, if it cannot be read the last compiled map is kept.
+        '''
+        if not isinstance(self.opts['reactor'], string_types):
+            if self.dispatch is None:
+                self.dispatch = ReactorDispatch(self.opts['reactor'])
+            return self.dispatch
+        now = time.time()
+        if self.dispatch is not None and \
+                now - self.map_checked < self.STAT_INTERVAL:
+            return self.dispatch
+        self.map_checked = now
+        try:
+            stat = os.stat(self.opts['reactor'])
+            stamp = (stat.st_mtime, stat.st_size)
+        except OSError:
+            stamp = None
+        if self.dispatch is not None and stamp == self.map_stamp:
+            return self.dispatch
+        self.map_stamp = stamp
+        react_map = self._read_map()
+        if react_map is not None:
+            log.debug('Compiling reactor map {0}'.format(self.opts['reactor']))
+            self.dispatch = ReactorDispatch(react_map)
+        elif self.dispatch is None:
+            self.dispatch = ReactorDispatch([])
+        return self.dispatch
+
     def list_reactors(self, tag):
         '''
         Take in the tag from an event and return a list of the reactors to
         process
         '''
         log.debug('Gathering reactors for tag {0}'.format(tag))
-        reactors = []
-        if isinstance(self.opts['reactor'], basestring):
-            try:
-                with salt.utils.fopen(self.opts['reactor']) as fp_:
-                    react_map = yaml.safe_load(fp_.read())
-            except (OSError, IOError):
-                log.error(
-                    'Failed to read reactor map: "{0}"'.format(
-                        self.opts['reactor']
-                        )
-                    )
-            except Exception:
-                log.error(
-                    'Failed to parse YAML in reactor map: "{0}"'.format(
-                        self.opts['reactor']
-                        )
-                    )
-        else:
-            react_map = self.opts['reactor']
-        for ropt in react_map:
-            if not isinstance(ropt, dict):
-                continue
-            if len(ropt) != 1:
-                continue
-            key = ropt.keys()[0]
-            val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
-        return reactors
+        return self.get_dispatch().match(tag)
 
     def reactions(self, tag, data, reactors):
         '''
@@ -562,25 +655,127 @@ class Reactor(multiprocessing.Process, salt.state.Compiler):
             chunks = self.order_chunks(self.compile_high_data(high))
         return chunks
 
+    def _run_chunks(self, chunks):
+        '''
+        Execute the chunks of one event in order
+        '''
+        try:
+            for chunk in chunks:
+                self.wrap.run(chunk)
+        except Exception:
+            log.error(
+                'Failed to execute the reaction {0}'.format(chunks),
+                exc_info=True
+            )
+        finally:
+            with self.stats_lock:
+                self.backlog -= 1
+                self.stats['reactions'] += 1
+
     def call_reactions(self, chunks):
         '''
-        Execute the reaction state
+        Execute the reaction state, in the worker pool if there is one
+        '''
+        with self.stats_lock:
+            if self.pool is not None and \
+                    self.backlog >= self.opts['reactor_worker_hwm']:
+                self.stats['dropped'] += 1
+                log.warning(
+                    'The reactor has {0} reactions waiting for a worker, '
+                    'dropping the reaction'.format(self.backlog)
+                )
+                return
+            self.backlog += 1
+        if self.pool is None:
+            self._run_chunks(chunks)
+        else:
+            self.pool.apply_async(self._run_chunks, (chunks,))
+
+    def _reset_stats(self, now):
+        '''
+        Start a new statistics period
         '''
-        for chunk in chunks:
-            self.wrap.run(chunk)
+        self.stats_start = now
+        self.stats = {'events': 0,
+                      'reactions': 0,
+                      'dropped': 0,
+                      'lag_total': 0.0,
+                      'lag_max': 0.0}
+
+    def _record_event(self, data):
+        '''
+        Count the event and the time it spent on its way to the reactor
+        '''
+        if not self.opts['master_stats']:
+            return
+        lag = 0.0
+        stamp = data['data'].get('_stamp') \
+            if isinstance(data['data'], dict) else None
+        if isinstance(stamp, string_types):
+            fmt = '%Y-%m-%d_%H:%M:%S.%f' if '.' in stamp \
+                else '%Y-%m-%d_%H:%M:%S'
+            try:
+                fired = datetime.datetime.strptime(stamp, fmt)
+                lag = max(0.0, time.time() - time.mktime(fired.timetuple()) -
+                          fired.microsecond / 1e6)
+            except ValueError:
+                pass
+        with self.stats_lock:
+            self.stats['events'] += 1
+            self.stats['lag_total'] += lag
+            self.stats['lag_max'] = max(self.stats['lag_max'], lag)
+
+    def _fire_stats(self):
+        '''
+        Fire the event lag and the reaction rate of the last
+        master_stats_event_iter seconds on the master event bus and start a
+        new period
+        '''
+        if not self.opts['master_stats']:
+            return
+        now = time.time()
+        if now - self.stats_start < self.opts['master_stats_event_iter']:
+            return
+        with self.stats_lock:
+            stats = self.stats
+            backlog = self.backlog
+            start = self.stats_start
+            self._reset_stats(now)
+        if not stats['events']:
+            return
+        elapsed = now - start
+        self.event.fire_event(
+                {'start': start,
+                 'end': now,
+                 'events': stats['events'],
+                 'reactions': stats['reactions'],
+                 'reactions_per_sec': stats['reactions'] / elapsed,
+                 'dropped': stats['dropped'],
+                 'backlog': backlog,
+                 'lag_mean': stats['lag_total'] / stats['events'],
+                 'lag_max': stats['lag_max']},
+                tagify(['reactor', 'stats'], 'master'))
 
     def run(self):
         '''
         Enter into the server loop
         '''
         self.event = SaltEvent('master', self.opts['sock_dir'])
-        for data in self.event.iter_events(full=True):
-            reactors = self.list_reactors(data['tag'])
-            if not reactors:
-                continue
-            chunks = self.reactions(data['tag'], data['data'], reactors)
-            if chunks:
-                self.call_reactions(chunks)
+        if self.opts['reactor_worker_threads']:
+            self.pool = ThreadPool(self.opts['reactor_worker_threads'])
+        self._reset_stats(time.time())
+        while True:
+            data = self.event.get_event(full=True)
+            if data is not None:
+                self._record_event(data)
+                reactors = self.list_reactors(data['tag'])
+                if reactors:
+                    chunks = self.reactions(
+                        data['tag'], data['data'], reactors
+                    )
+                    if chunks:
+                        self.call_reactions(chunks)
+            self._fire_stats()
 
 
 class ReactWrap(object):
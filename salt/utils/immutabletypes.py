@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+'''
+Read only views of mutable data structures.
+
+The views wrap the original objects instead of copying them, so they are
+cheap to create and always show the current contents of the wrapped object,
+but do not allow it to be changed through the view.
+'''
+
+# Import python libs
+import copy
+import collections
+
+
+class ImmutableDict(collections.Mapping):
+    '''
+    A read only view of a dict
+    '''
+    def __init__(self, obj):
+        self.__obj = obj
+
+    def __len__(self):
+        return len(self.__obj)
+
+    def __iter__(self):
+        return iter(self.__obj)
+
+    def __getitem__(self, key):
+        return freeze(self.__obj[key])
+
+    def __eq__(self, other):
+        if isinstance(other, ImmutableDict):
+            other = other._ImmutableDict__obj
+        return self.__obj == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, repr(self.__obj))
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.__obj, memo)
+
+
+class ImmutableList(collections.Sequence):
+    '''
+    A read only view of a list
+    '''
+    def __init__(self, obj):
+        self.__obj = obj
+
+    def __len__(self):
+        return len(self.__obj)
+
+    def __iter__(self):
+        for item in self.__obj:
+            yield freeze(item)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ImmutableList(self.__obj[key])
+        return freeze(self.__obj[key])
+
+    def __eq__(self, other):
+        if isinstance(other, ImmutableList):
+            other = other._ImmutableList__obj
+        return self.__obj == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, repr(self.__obj))
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.__obj, memo)
+
+
+class ImmutableSet(collections.Set):
+    '''
+    A read only view of a set
+    '''
+    def __init__(self, obj):
+        self.__obj = obj
+
+    def __len__(self):
+        return len(self.__obj)
+
+    def __iter__(self):
+        return iter(self.__obj)
+
+    def __contains__(self, key):
+        return key in self.__obj
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(self.__class__.__name__, repr(self.__obj))
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.__obj, memo)
+
+
+def freeze(obj):
+    '''
+    Return a read only view of obj if it is a dict, list or set, and obj
+    itself otherwise
+    '''
+    if isinstance(obj, dict):
+        return ImmutableDict(obj)
+    if isinstance(obj, list):
+        return ImmutableList(obj)
+    if isinstance(obj, set):
+        return ImmutableSet(obj)
+    return obj
@@ -4,14 +4,17 @@ Jinja loading utils to enable a more powerful backend for jinja templates
 '''
 
 # Import python libs
+import os
 from os import path
 import logging
+import threading
 import json
 import pprint
 from functools import wraps
 
 # Import third party libs
 from jinja2 import BaseLoader, Markup, TemplateNotFound, nodes
+from jinja2.bccache import FileSystemBytecodeCache
 from jinja2.environment import TemplateModule
 from jinja2.ext import Extension
 from jinja2.exceptions import TemplateRuntimeError
@@ -20,6 +23,8 @@ import yaml
 # Import salt libs
 import salt
 import salt.fileclient
+import salt.utils
+import salt.utils.atomicfile
 from salt.utils.odict import OrderedDict
 from salt._compat import string_types
 
@@ -27,9 +32,15 @@ log = logging.getLogger(__name__)
 
 __all__ = [
     'SaltCacheLoader',
-    'SerializerExtension'
+    'SaltBytecodeCache',
+    'SerializerExtension',
+    'get_bytecode_cache'
 ]
 
+# The process wide bytecode caches, keyed on their directory
+_BYTECODE_CACHES = {}
+_BYTECODE_CACHES_LOCK = threading.Lock()
+
 
 # To dump OrderedDict objects as regular dicts. Used by the yaml
 # template filter.
@@ -124,6 +135,125 @@ class SaltCacheLoader(BaseLoader):
         raise TemplateNotFound(template)
 
 
+class SaltBytecodeCache(FileSystemBytecodeCache):
+    '''
+    A bytecode cache for the compiled templates, kept in memory and, when a
+    directory is passed, on disk so that the compiled code is shared between
+    processes and kept across restarts. The cache files are replaced
+    atomically and a file which can not be loaded is ignored. A template with
+    a name has a single cache file which a new version of its source replaces,
+    and the oldest files are removed when there are more than SIZE of them.
+    '''
+    # The number of compiled templates kept in memory and on disk
+    SIZE = 1000
+
+    def __init__(self, directory=None):
+        self.persist = directory is not None
+        if self.persist and not path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                self.persist = False
+        # Set the attributes of FileSystemBytecodeCache directly, its
+        # constructor creates a directory in the system temp dir when it is
+        # not passed one
+        self.directory = directory
+        self.pattern = '%s.jinja.cache'
+        self.codes = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _remember(self, bucket):
+        with self.lock:
+            self.codes.pop(bucket.key, None)
+            self.codes[bucket.key] = (bucket.checksum, bucket.code)
+            while len(self.codes) > self.SIZE:
+                self.codes.popitem(last=False)
+
+    def _prune(self):
+        '''
+        Remove the least recently written cache files over SIZE
+        '''
+        try:
+            names = [name for name in os.listdir(self.directory)
+                     if name.endswith('.jinja.cache')]
+        except OSError:
+            return
+        if len(names) <= self.SIZE:
+            return
+        files = []
+        for name in names:
+            filepath = path.join(self.directory, name)
+            try:
+                files.append((path.getmtime(filepath), filepath))
+            except OSError:
+                continue
+        files.sort()
+        for _, filepath in files[:len(files) - self.SIZE]:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+
+    def load_bytecode(self, bucket):
+        with self.lock:
+            cached = self.codes.get(bucket.key)
+        if cached is not None and cached[0] == bucket.checksum:
+            bucket.code = cached[1]
+            return
+        if not self.persist:
+            return
+        try:
+            FileSystemBytecodeCache.load_bytecode(self, bucket)
+        except Exception:
+            bucket.reset()
+        if bucket.code is not None:
+            self._remember(bucket)
+
+    def dump_bytecode(self, bucket):
+        self._remember(bucket)
+        if not self.persist:
+            return
+        try:
+            with salt.utils.atomicfile.atomic_open(
+                    self._get_cache_filename(bucket), 'wb') as fp_:
+                bucket.write_bytecode(fp_)
+        except (IOError, OSError) as exc:
+            log.debug('Unable to write the jinja bytecode cache: {0}'.format(
+                exc))
+        self._prune()
+
+    def compile_string(self, env, source, signature='', name=None):
+        '''
+        Return a template for the source, compiled or taken from the cache.
+        The signature identifies the settings of the environment which change
+        the compiled code. The name, the path of the template, keys the cache
+        entry so that it is replaced when the source changes; a template
+        without a name is keyed on its source.
+        '''
+        if name is None:
+            name = self.get_source_checksum(source)
+        bucket = self.get_bucket(
+            env, '{0}|{1}'.format(signature, name), None, source)
+        if bucket.code is None:
+            bucket.code = env.compile(source)
+            self.set_bucket(bucket)
+        return env.template_class.from_code(
+                env, bucket.code, env.make_globals(None))
+
+
+def get_bytecode_cache(opts):
+    '''
+    Return the bytecode cache of the process for the cachedir in opts
+    '''
+    directory = None
+    if opts.get('cachedir'):
+        directory = path.join(opts['cachedir'], 'jinja')
+    with _BYTECODE_CACHES_LOCK:
+        if directory not in _BYTECODE_CACHES:
+            _BYTECODE_CACHES[directory] = SaltBytecodeCache(directory)
+        return _BYTECODE_CACHES[directory]
+
+
 class PrintableDict(OrderedDict):
     '''
     Ensures that dict str() and repr() are YAML friendly.
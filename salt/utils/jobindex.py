@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+'''
+An SQLite index of the local job cache.
+
+The job cache itself stays on disk under ``cachedir/jobs``, sharded by the
+hour the job was published in. This index records the load of every job and
+the minions which returned, so the jobs runner can list and search jobs
+without walking the whole job cache. Enable it with the ``job_cache_index``
+master option.
+'''
+
+# Import python libs
+import os
+import logging
+import threading
+
+# Import third party libs
+try:
+    import sqlite3
+    HAS_SQLITE3 = True
+except ImportError:
+    HAS_SQLITE3 = False
+
+# Import salt libs
+import salt.payload
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS jobs ('
+    'jid TEXT PRIMARY KEY, fun TEXT, tgt TEXT, user TEXT, load BLOB)',
+    'CREATE INDEX IF NOT EXISTS jobs_fun ON jobs (fun)',
+    'CREATE TABLE IF NOT EXISTS returns ('
+    'jid TEXT, minion TEXT, PRIMARY KEY (jid, minion))',
+    'CREATE INDEX IF NOT EXISTS returns_minion ON returns (minion)',
+)
+
+
+def get_index(opts):
+    '''
+    Return a JobIndex if the job cache index is enabled, None otherwise
+    '''
+    if not opts.get('job_cache_index', False):
+        return None
+    if not HAS_SQLITE3:
+        log.error(
+            'The job cache index is enabled but the sqlite3 module is not '
+            'available'
+        )
+        return None
+    return JobIndex(opts)
+
+
+class JobIndex(object):
+    '''
+    Read and write the job cache index
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.path = os.path.join(opts['cachedir'], 'jobs.db')
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        '''
+        The connection to the index database of the calling thread, sqlite
+        connections are never shared between threads or with a forked process
+        '''
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.text_factory = str
+            # The WAL allows the jobs runner to read while the master
+            # workers write returns
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def _write(self, stmt, args):
+        '''
+        Run a write statement, failures to update the index never fail the
+        job cache write itself
+        '''
+        try:
+            with self.conn:
+                self.conn.execute(stmt, args)
+        except sqlite3.Error as exc:
+            log.error('Failed to update the job cache index: {0}'.format(exc))
+
+    def add_job(self, jid, load, minions=None):
+        '''
+        Record the load of a newly published job, along with the list of
+        minions it targeted if it is known
+        '''
+        if minions is not None:
+            load = dict(load, minions=list(minions))
+        fun = load.get('fun', '')
+        if isinstance(fun, list):
+            fun = ','.join(fun)
+        self._write(
+            'INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?)',
+            (jid,
+             fun,
+             str(load.get('tgt', '')),
+             load.get('user', 'root'),
+             sqlite3.Binary(self.serial.dumps(load))))
+
+    def add_return(self, jid, minion):
+        '''
+        Record that a minion returned for a job
+        '''
+        self._write(
+            'INSERT OR IGNORE INTO returns VALUES (?, ?)', (jid, minion))
+
+    def expire(self, oldest):
+        '''
+        Drop the jobs with a jid older than the passed jid, or jid prefix
+        '''
+        try:
+            with self.conn:
+                self.conn.execute('DELETE FROM jobs WHERE jid < ?', (oldest,))
+                self.conn.execute(
+                    'DELETE FROM returns WHERE jid < ?', (oldest,))
+        except sqlite3.Error as exc:
+            log.error('Failed to expire the job cache index: {0}'.format(exc))
+
+    def get_job(self, jid):
+        '''
+        Return the load of a job, or an empty dict
+        '''
+        row = self.conn.execute(
+            'SELECT load FROM jobs WHERE jid = ?', (jid,)).fetchone()
+        if row is None:
+            return {}
+        return self.serial.loads(str(row[0]))
+
+    def list_jobs(self, fun=None, minion=None):
+        '''
+        Return a dict of jid to job load, optionally limited to the jobs
+        running a function or which a minion returned for
+        '''
+        stmt = 'SELECT jid, load FROM jobs'
+        where = []
+        args = []
+        if fun is not None:
+            where.append('fun = ?')
+            args.append(fun)
+        if minion is not None:
+            where.append(
+                'jid IN (SELECT jid FROM returns WHERE minion = ?)')
+            args.append(minion)
+        if where:
+            stmt += ' WHERE ' + ' AND '.join(where)
+        return dict(
+            (jid, self.serial.loads(str(load)))
+            for jid, load in self.conn.execute(stmt, args)
+        )
+
+    def returned(self, jid):
+        '''
+        Return the list of minions which returned for a job
+        '''
+        return [
+            row[0] for row in self.conn.execute(
+                'SELECT minion FROM returns WHERE jid = ?', (jid,))
+        ]
@@ -17,6 +17,7 @@ import salt.client
 import salt.pillar
 import salt.utils
 import salt.payload
+import salt.utils.minions
 from salt.exceptions import SaltException
 
 log = logging.getLogger(__name__)
@@ -353,7 +354,6 @@ class MasterPillarUtil(object):
                 if not os.path.isdir(cdir):
                     # Cache dir for this minion does not exist. Nothing to do.
                     continue
-                data_file = os.path.join(cdir, 'data.p')
                 mine_file = os.path.join(cdir, 'mine.p')
                 minion_pillar = pillars.pop(minion_id, False)
                 minion_grains = grains.pop(minion_id, False)
@@ -361,13 +361,16 @@ class MasterPillarUtil(object):
                     (clear_pillar and not minion_grains) or
                     (clear_grains and not minion_pillar)):
                     # Not saving pillar or grains, so just delete the cache file
-                    os.remove(os.path.join(data_file))
+                    salt.utils.minions.remove_minion_data(
+                        self.opts, minion_id)
                 elif clear_pillar and minion_grains:
-                    with salt.utils.fopen(data_file, 'w+b') as fp_:
-                        fp_.write(self.serial.dumps({'grains': minion_grains}))
+                    salt.utils.minions.write_minion_data(
+                        self.opts, minion_id, {'grains': minion_grains},
+                        self.serial)
                 elif clear_grains and minion_pillar:
-                    with salt.utils.fopen(data_file, 'w+b') as fp_:
-                        fp_.write(self.serial.dumps({'pillar': minion_pillar}))
+                    salt.utils.minions.write_minion_data(
+                        self.opts, minion_id, {'pillar': minion_pillar},
+                        self.serial)
                 if clear_mine:
                     # Delete the whole mine file
                     os.remove(os.path.join(mine_file))
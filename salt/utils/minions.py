@@ -7,8 +7,10 @@ expected to return
 # Import python libs
 import os
 import glob
+import hashlib
 import re
 import logging
+import threading
 
 # Import salt libs
 import salt.payload
@@ -24,6 +26,335 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# Once the journal grows past this size the next writer truncates it, which
+# forces every reader to do one full reload of the minion data cache
+JOURNAL_MAX_SIZE = 1048576
+
+# Shared, per-process minion data indexes keyed on the cachedir
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+# With zmq_filtering every minion subscribes to this topic as well as its own
+BROADCAST_TOPIC = 'broadcast'
+
+# The target types check_minions resolves to exactly the minions which will
+# match the target, publications for other targets are broadcast
+TOPIC_TGT_TYPES = ('list', 'glob', 'pcre')
+
+
+def _journal_path(opts):
+    '''
+    Return the path to the minion data journal, the journal is kept outside
+    of the minions cache dir since that dir is expected to hold minion ids
+    only
+    '''
+    return os.path.join(opts['cachedir'], 'minion_data.journal')
+
+
+def notify_minion_data(opts, minion):
+    '''
+    Record that the cached data for a minion has changed so that the
+    minion data indexes held by other processes pick up the change
+    '''
+    jpath = _journal_path(opts)
+    try:
+        if os.path.isfile(jpath) \
+                and os.path.getsize(jpath) > JOURNAL_MAX_SIZE:
+            # Replace the journal instead of truncating it in place, the
+            # new inode tells readers to do a full reload
+            tmp = salt.utils.mkstemp(dir=opts['cachedir'])
+            os.rename(tmp, jpath)
+        with salt.utils.fopen(jpath, 'a') as fp_:
+            fp_.write('{0}\n'.format(minion))
+    except (IOError, OSError) as exc:
+        log.error(
+            'Failed to update the minion data journal {0}: {1}'.format(
+                jpath, exc
+            )
+        )
+
+
+def store_minion_data(opts, minion, grains, pillar, serial=None):
+    '''
+    Write the grains and pillar for a minion into the minion data cache and
+    notify the minion data indexes of the change
+    '''
+    write_minion_data(
+        opts, minion, {'grains': grains, 'pillar': pillar}, serial)
+
+
+def write_minion_data(opts, minion, data, serial=None):
+    '''
+    Write the data dict for a minion into the minion data cache and notify
+    the minion data indexes of the change
+    '''
+    if serial is None:
+        serial = salt.payload.Serial(opts)
+    cdir = os.path.join(opts['cachedir'], 'minions', minion)
+    if not os.path.isdir(cdir):
+        os.makedirs(cdir)
+    datap = os.path.join(cdir, 'data.p')
+    with salt.utils.fopen(datap, 'w+b') as fp_:
+        fp_.write(serial.dumps(data))
+    notify_minion_data(opts, minion)
+
+
+def remove_minion_data(opts, minion):
+    '''
+    Remove the cached grains and pillar of a minion and notify the minion
+    data indexes of the change
+    '''
+    datap = os.path.join(opts['cachedir'], 'minions', minion, 'data.p')
+    try:
+        os.remove(datap)
+    finally:
+        notify_minion_data(opts, minion)
+
+
+def minion_data_index(opts):
+    '''
+    Return the minion data index shared by everything in this process that
+    uses the same cachedir, or None if the index is disabled
+    '''
+    if not opts.get('minion_data_cache', False):
+        return None
+    if not opts.get('minion_data_index', True):
+        return None
+    with _INDEXES_LOCK:
+        if opts['cachedir'] not in _INDEXES:
+            _INDEXES[opts['cachedir']] = MinionDataIndex(opts)
+        return _INDEXES[opts['cachedir']]
+
+
+class MinionDataIndex(object):
+    '''
+    An in memory copy of the minion data cache with inverted indexes on the
+    grain and pillar key paths.
+
+    The full cache is read once, after that only the minions listed in the
+    minion data journal since the last refresh are reloaded from disk. This
+    keeps every process, such as each of the MWorkers, in sync with the
+    writes made by the others.
+    '''
+    # Characters which make a target a glob rather than a literal value
+    _glob_chars = frozenset('*?[')
+
+    def __init__(self, opts, delim=':'):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.cdir = os.path.join(opts['cachedir'], 'minions')
+        self.journal = _journal_path(opts)
+        self.delim = delim
+        self.data = {}
+        # {'grains': {'os': {'ubuntu': set(['web1'])}}}
+        self.index = {'grains': {}, 'pillar': {}}
+        # Minions which hold data that cannot be indexed, like lists of
+        # dicts, these are always evaluated with subdict_match
+        self.unindexed = {'grains': set(), 'pillar': set()}
+        self._paths = {}
+        self._loaded = False
+        self._journal_ino = None
+        self._journal_pos = 0
+        self._lock = threading.RLock()
+
+    def refresh(self):
+        '''
+        Bring the index up to date with the minion data cache
+        '''
+        with self._lock:
+            try:
+                jstat = os.stat(self.journal)
+                ino, size = jstat.st_ino, jstat.st_size
+            except OSError:
+                ino, size = None, 0
+            if not self._loaded \
+                    or ino != self._journal_ino \
+                    or size < self._journal_pos:
+                self._full_load(ino, size)
+            elif size > self._journal_pos:
+                self._journal_load(size)
+
+    def _full_load(self, ino, size):
+        '''
+        Load every minion found in the minion data cache
+        '''
+        for minion in list(self.data):
+            self._drop(minion)
+        # Record the journal position first, changes made while the cache is
+        # read in are picked up again by the next refresh
+        self._journal_ino = ino
+        self._journal_pos = size
+        self._loaded = True
+        if not os.path.isdir(self.cdir):
+            return
+        for minion in os.listdir(self.cdir):
+            self._load(minion)
+
+    def _journal_load(self, size):
+        '''
+        Reload the minions recorded in the journal since the last refresh
+        '''
+        try:
+            with salt.utils.fopen(self.journal, 'r') as fp_:
+                fp_.seek(self._journal_pos)
+                chunk = fp_.read(size - self._journal_pos)
+        except (IOError, OSError):
+            return
+        # Only consume complete lines, a partial line is finished by its
+        # writer before the next refresh
+        end = chunk.rfind('\n') + 1
+        self._journal_pos += end
+        for minion in set(chunk[:end].splitlines()):
+            if minion:
+                self._load(minion)
+
+    def _load(self, minion):
+        '''
+        (Re)load the cached data of a single minion
+        '''
+        self._drop(minion)
+        datap = os.path.join(self.cdir, minion, 'data.p')
+        if not os.path.isfile(datap):
+            return
+        try:
+            with salt.utils.fopen(datap, 'rb') as fp_:
+                data = self.serial.load(fp_)
+        except Exception as exc:
+            log.debug(
+                'Failed to load minion data for {0}: {1}'.format(minion, exc)
+            )
+            return
+        if not isinstance(data, dict):
+            return
+        self.data[minion] = data
+        self._paths[minion] = {}
+        for kind in self.index:
+            paths = []
+            if not self._flatten(data.get(kind), [], paths):
+                self.unindexed[kind].add(minion)
+            for path, value in paths:
+                self.index[kind].setdefault(
+                    path, {}).setdefault(value, set()).add(minion)
+            self._paths[minion][kind] = paths
+
+    def _drop(self, minion):
+        '''
+        Remove a minion from the index
+        '''
+        self.data.pop(minion, None)
+        for kind, paths in self._paths.pop(minion, {}).items():
+            for path, value in paths:
+                values = self.index[kind].get(path, {})
+                ids = values.get(value)
+                if ids is None:
+                    continue
+                ids.discard(minion)
+                if not ids:
+                    values.pop(value)
+                if not values:
+                    self.index[kind].pop(path, None)
+        for unindexed in self.unindexed.values():
+            unindexed.discard(minion)
+
+    def _flatten(self, data, prefix, paths):
+        '''
+        Append a (key path, lowercase value) tuple to paths for every scalar
+        value found in data. Returns False if part of data can only be
+        matched with subdict_match.
+        '''
+        if not isinstance(data, dict):
+            return True
+        indexed = True
+        for key, val in data.items():
+            if not isinstance(key, basestring) or self.delim in key:
+                # Keys like these can never be reached by traverse_dict
+                continue
+            path = prefix + [key]
+            if isinstance(val, dict):
+                indexed &= self._flatten(val, path, paths)
+                continue
+            members = val if isinstance(val, list) else [val]
+            for member in members:
+                if isinstance(member, (dict, list)):
+                    indexed = False
+                    continue
+                try:
+                    paths.append((self.delim.join(path), str(member).lower()))
+                except UnicodeError:
+                    indexed = False
+        return indexed
+
+    def ids(self):
+        '''
+        Return the set of minions with cached data
+        '''
+        with self._lock:
+            return set(self.data)
+
+    def get(self, minion, kind=None):
+        '''
+        Return the cached data of a minion, or only its grains or pillar if
+        kind is passed
+        '''
+        with self._lock:
+            data = self.data.get(minion)
+        if data is None or kind is None:
+            return data
+        return data.get(kind)
+
+    def match(self, kind, expr, regex_match=False):
+        '''
+        Return the set of minions whose grains or pillar match the target
+        expression, with the same semantics as ``salt.utils.subdict_match``
+        '''
+        # The index is updated in place by refresh(), which may run in another
+        # thread of the same process
+        with self._lock:
+            if regex_match or self._glob_chars.intersection(expr):
+                return set([
+                    minion for minion, data in self.data.items()
+                    if salt.utils.subdict_match(data.get(kind),
+                                                expr,
+                                                delim=self.delim,
+                                                regex_match=regex_match)
+                ])
+            ret = set()
+            splits = expr.split(self.delim)
+            for idx in range(1, len(splits)):
+                path = self.delim.join(splits[:idx])
+                value = self.delim.join(splits[idx:]).lower()
+                ret.update(self.index[kind].get(path, {}).get(value, ()))
+            for minion in self.unindexed[kind].difference(ret):
+                if salt.utils.subdict_match(self.data[minion].get(kind),
+                                            expr,
+                                            delim=self.delim):
+                    ret.add(minion)
+            return ret
+
+
+def pub_topic(minion_id):
+    '''
+    Return the publish topic of the given minion
+    '''
+    if isinstance(minion_id, unicode):
+        minion_id = minion_id.encode('utf-8')
+    return hashlib.sha1(minion_id).hexdigest()
+
+
+def pub_topics(opts, tgt, tgt_type, minions):
+    '''
+    Return the list of topics to send a publication to, or None if the
+    publication needs to be broadcast to all minions
+    '''
+    if not opts.get('zmq_filtering', False):
+        return None
+    if opts.get('order_masters', False):
+        # The syndics need to see every publication
+        return None
+    if tgt_type not in TOPIC_TGT_TYPES or tgt == '*':
+        return None
+    return [pub_topic(minion) for minion in minions]
+
 
 def get_minion_data(minion, opts):
     '''
@@ -92,6 +423,26 @@ class CkMinions(object):
         self.serial = salt.payload.Serial(opts)
         self.ip_addrs = salt.utils.network.ip_addrs()
 
+    def _data_index(self):
+        '''
+        Return the refreshed minion data index, or None if it is disabled
+        '''
+        index = minion_data_index(self.opts)
+        if index is not None:
+            index.refresh()
+        return index
+
+    def _check_index_minions(self, minions, index, kind, expr,
+                             regex_match=False):
+        '''
+        Return the minions matching expr in the minion data index, minions
+        without cached data are kept just like the on disk lookups do
+        '''
+        cached = minions.intersection(index.ids())
+        matched = index.match(kind, expr, regex_match=regex_match)
+        return list(minions.difference(cached).union(
+            cached.intersection(matched)))
+
     def _check_glob_minions(self, expr):
         '''
         Return the minions found by looking via globs
@@ -139,6 +490,9 @@ class CkMinions(object):
         minions = set(
             os.listdir(os.path.join(self.opts['pki_dir'], 'minions'))
         )
+        index = self._data_index()
+        if index is not None:
+            return self._check_index_minions(minions, index, 'grains', expr)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions')
             if not os.path.isdir(cdir):
@@ -163,6 +517,10 @@ class CkMinions(object):
         minions = set(
             os.listdir(os.path.join(self.opts['pki_dir'], 'minions'))
         )
+        index = self._data_index()
+        if index is not None:
+            return self._check_index_minions(
+                minions, index, 'grains', expr, regex_match=True)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions')
             if not os.path.isdir(cdir):
@@ -188,6 +546,9 @@ class CkMinions(object):
         minions = set(
             os.listdir(os.path.join(self.opts['pki_dir'], 'minions'))
         )
+        index = self._data_index()
+        if index is not None:
+            return self._check_index_minions(minions, index, 'pillar', expr)
         if self.opts.get('minion_data_cache', False):
             cdir = os.path.join(self.opts['cachedir'], 'minions')
             if not os.path.isdir(cdir):
@@ -398,17 +759,25 @@ class CkMinions(object):
             addrs = salt.utils.network.local_port_tcp(int(self.opts['publish_port']))
             if '127.0.0.1' in addrs:
                 addrs.update(self.ip_addrs)
+            index = self._data_index()
             if subset:
                 search = subset
+            elif index is not None:
+                search = index.ids()
             else:
                 search = os.listdir(cdir)
             for id_ in search:
-                datap = os.path.join(cdir, id_, 'data.p')
-                if not os.path.isfile(datap):
-                    continue
-                grains = self.serial.load(
-                    salt.utils.fopen(datap, 'rb')
-                ).get('grains')
+                if index is not None:
+                    grains = index.get(id_, 'grains')
+                    if grains is None:
+                        continue
+                else:
+                    datap = os.path.join(cdir, id_, 'data.p')
+                    if not os.path.isfile(datap):
+                        continue
+                    grains = self.serial.load(
+                        salt.utils.fopen(datap, 'rb')
+                    ).get('grains')
                 for ipv4 in grains.get('ipv4', []):
                     if ipv4 == '127.0.0.1' or ipv4 == '0.0.0.0':
                         continue
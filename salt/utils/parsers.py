@@ -2054,6 +2054,13 @@ class SaltCallOptionParser(OptionParser, ConfigDirMixIn, MergeConfigMixIn,
             action='store_true',
             help=('Force a refresh of the grains cache')
     )
+        self.add_option(
+            '--profile-startup',
+            default=False,
+            action='store_true',
+            help=('Report the time spent loading the grains, pillar and '
+                  'modules, and running the function, on stderr.')
+        )
 
     def _mixin_after_parsed(self):
         if not self.args and not self.options.grains_run \
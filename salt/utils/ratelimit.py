@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+'''
+A token bucket rate limiter which can be shared between processes.
+
+The bucket holds its state in shared memory, so a bucket created before the
+worker processes are forked limits the combined rate of all of them.
+'''
+
+# Import python libs
+import time
+import random
+import multiprocessing
+
+
+class TokenBucket(object):
+    '''
+    Allow rate requests per second, with bursts of up to burst requests.
+
+    Requests which are refused are counted in a backlog which drains at the
+    rate of the bucket, the wait returned to a refused request is spread over
+    the time needed to drain the backlog so the refused requests do not all
+    come back at the same time.
+    '''
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1, self.rate))
+        self._lock = multiprocessing.Lock()
+        self._tokens = multiprocessing.Value('d', self.burst, lock=False)
+        self._backlog = multiprocessing.Value('d', 0, lock=False)
+        self._stamp = multiprocessing.Value('d', time.time(), lock=False)
+
+    def consume(self):
+        '''
+        Take a token from the bucket. Returns 0 if a token was available,
+        otherwise the number of seconds to wait before trying again.
+        '''
+        with self._lock:
+            now = time.time()
+            elapsed = max(0, now - self._stamp.value)
+            self._stamp.value = now
+            tokens = min(self.burst,
+                         self._tokens.value + elapsed * self.rate)
+            backlog = max(0, self._backlog.value - elapsed * self.rate)
+            if tokens >= 1:
+                self._tokens.value = tokens - 1
+                self._backlog.value = backlog
+                return 0
+            self._tokens.value = tokens
+            self._backlog.value = backlog + 1
+        wait = (1 - tokens) / self.rate
+        return wait + random.uniform(0, backlog / self.rate)
@@ -0,0 +1,436 @@
+# -*- coding: utf-8 -*-
+'''
+Keep the file lists and the mtime map of the roots fileserver up to date with
+inotify.
+
+The fileserver workers walk the file_roots whenever their file list cache has
+expired, and the master maintenance process walks them again to build the
+mtime map. The RootsWatcher process keeps an index of the file_roots instead,
+reads again only the directories inotify reports as changed, and writes the
+file list caches and the mtime map as they change. It also keeps them fresh
+while nothing changes, so the workers do not walk the file_roots as long as the
+watcher runs. If pyinotify is not installed the watcher is not started and the
+file_roots are walked as before.
+'''
+
+# Import python libs
+import os
+import time
+import logging
+import multiprocessing
+
+# Import salt libs
+import salt.fileserver
+import salt.payload
+import salt.utils
+import salt.utils.atomicfile
+
+# Import third party libs
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
+log = logging.getLogger(__name__)
+
+
+def enabled(opts):
+    '''
+    Return True if the watcher should run for the master configured in opts
+    '''
+    if not opts.get('fileserver_watch', False):
+        return False
+    if 'roots' not in opts['fileserver_backend']:
+        return False
+    if not HAS_PYINOTIFY:
+        log.info('pyinotify is not installed, the file_roots will be walked '
+                 'to refresh the fileserver file lists')
+        return False
+    return True
+
+
+def list_cache_path(opts, saltenv):
+    '''
+    Return the path of the file list cache of the roots fileserver for saltenv
+    '''
+    return os.path.join(opts['cachedir'],
+                        'file_lists/roots',
+                        '{0}.p'.format(saltenv))
+
+
+def mtime_map_path(opts):
+    '''
+    Return the path of the mtime map written by the watcher
+    '''
+    return os.path.join(opts['cachedir'], 'roots/watch_mtime_map.p')
+
+
+def _fresh_interval(opts):
+    '''
+    The files written by the watcher are refreshed at this interval
+    '''
+    return max(1, opts.get('fileserver_list_cache_time', 30) / 3.0)
+
+
+def read_mtime_map(opts):
+    '''
+    Return the mtime map written by the watcher, or None if the watcher does
+    not keep it fresh
+    '''
+    path = mtime_map_path(opts)
+    try:
+        age = time.time() - os.stat(path).st_mtime
+        if age > opts.get('fileserver_list_cache_time', 30):
+            return None
+        with salt.utils.fopen(path, 'rb') as fp_:
+            return salt.payload.Serial(opts).load(fp_)
+    except Exception:
+        return None
+
+
+class RootsIndex(object):
+    '''
+    The dirs and files below the file_roots, read one directory at a time.
+
+    For every root the index maps the path of each dir, relative to the root
+    as os.walk reports it, to its subdirs, its files (with whether they are
+    symlinks and their mtime) and whether it was reached through a symlink.
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.followlinks = opts['fileserver_followsymlinks']
+        self.tree = {}
+
+    def roots(self):
+        '''
+        Return the roots of all the environments
+        '''
+        ret = set()
+        for paths in self.opts['file_roots'].values():
+            ret.update(paths)
+        return sorted(ret)
+
+    def envs(self, root):
+        '''
+        Return the environments which serve the root
+        '''
+        return sorted(saltenv for saltenv, paths
+                      in self.opts['file_roots'].iteritems()
+                      if root in paths)
+
+    def full_path(self, root, reldir):
+        '''
+        Return the full path of a dir, the way os.walk builds it
+        '''
+        if reldir == '.':
+            return root
+        return os.path.join(root, reldir)
+
+    def scan(self):
+        '''
+        Read all the file_roots, returns the full paths of the dirs read
+        '''
+        self.tree = {}
+        ret = []
+        for root in self.roots():
+            self.tree[root] = {}
+            ret.extend(self.refresh(root, '.'))
+        return ret
+
+    def refresh(self, root, reldir, link=False):
+        '''
+        Read the dir again. Its new subdirs are read recursively and the
+        subdirs which are gone are dropped. Returns the full paths of the dirs
+        read.
+        '''
+        tree = self.tree.setdefault(root, {})
+        old = tree.get(reldir)
+        if old is not None:
+            link = old['link']
+        full = self.full_path(root, reldir)
+        try:
+            names = os.listdir(full)
+        except OSError:
+            self._drop(tree, reldir)
+            return []
+        dirs = []
+        files = {}
+        for name in names:
+            path = os.path.join(full, name)
+            if os.path.isdir(path):
+                dirs.append(name)
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                # Broken symlink
+                mtime = None
+            files[name] = (os.path.islink(path), mtime)
+        tree[reldir] = {'dirs': dirs, 'files': files, 'link': link}
+        ret = [full]
+        walked = set()
+        for name in dirs:
+            is_link = os.path.islink(os.path.join(full, name))
+            if is_link and not self.followlinks:
+                continue
+            sub = name if reldir == '.' else os.path.join(reldir, name)
+            walked.add(sub)
+            if sub not in tree:
+                ret.extend(self.refresh(root, sub, link or is_link))
+        if old is not None:
+            for name in old['dirs']:
+                sub = name if reldir == '.' else os.path.join(reldir, name)
+                if sub not in walked:
+                    self._drop(tree, sub)
+        return ret
+
+    def _drop(self, tree, reldir):
+        '''
+        Remove a dir and the dirs below it from the tree of a root
+        '''
+        if reldir == '.':
+            tree.clear()
+            return
+        prefix = reldir + os.sep
+        for key in [key for key in tree
+                    if key == reldir or key.startswith(prefix)]:
+            del tree[key]
+
+    def file_lists(self, saltenv):
+        '''
+        Return the files, dirs, empty_dirs and links of the environment, as
+        the roots fileserver lists them
+        '''
+        ret = {'files': [],
+               'dirs': [],
+               'empty_dirs': [],
+               'links': []}
+        ignoresymlinks = self.opts['fileserver_ignoresymlinks']
+        for root in self.opts['file_roots'].get(saltenv, []):
+            for reldir, entry in self.tree.get(root, {}).iteritems():
+                ret['dirs'].append(reldir)
+                if not entry['dirs'] and not entry['files']:
+                    if not salt.fileserver.is_file_ignored(self.opts, reldir):
+                        ret['empty_dirs'].append(reldir)
+                for name, (is_link, _) in entry['files'].iteritems():
+                    if is_link:
+                        ret['links'].append(name)
+                        if ignoresymlinks:
+                            continue
+                    rel_fn = name if reldir == '.' \
+                        else os.path.join(reldir, name)
+                    if not salt.fileserver.is_file_ignored(self.opts, rel_fn):
+                        ret['files'].append(rel_fn)
+        for form in ret:
+            ret[form].sort()
+        return ret
+
+    def mtime_map(self):
+        '''
+        Return the mtime map of the file_roots, as generate_mtime_map builds
+        it; the dirs reached through symlinks are left out
+        '''
+        ret = {}
+        for root, tree in self.tree.iteritems():
+            for reldir, entry in tree.iteritems():
+                if entry['link']:
+                    continue
+                full = self.full_path(root, reldir)
+                for name, (_, mtime) in entry['files'].iteritems():
+                    if mtime is not None:
+                        ret[os.path.join(full, name)] = mtime
+        return ret
+
+
+class RootsWatcher(multiprocessing.Process):
+    '''
+    Watch the file_roots with inotify and keep the file list caches and the
+    mtime map of the roots fileserver up to date
+    '''
+    MASK = 0
+    if HAS_PYINOTIFY:
+        MASK = (pyinotify.IN_CREATE | pyinotify.IN_DELETE |
+                pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO |
+                pyinotify.IN_CLOSE_WRITE | pyinotify.IN_ATTRIB |
+                pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF)
+    # Wait for the changes to settle for this many seconds before writing the
+    # file lists, but do not wait longer than SETTLE_MAX
+    SETTLE = 0.5
+    SETTLE_MAX = 5
+
+    def __init__(self, opts):
+        super(RootsWatcher, self).__init__()
+        self.opts = opts
+        self.index = RootsIndex(opts)
+        self.serial = salt.payload.Serial(opts)
+        self.wdirs = {}
+        self.dirty = set()
+        self.first_event = None
+        self.last_event = None
+        self.written = {}
+
+    def _watch(self, wm, paths):
+        '''
+        Add a watch on every path, returns False if inotify refused one
+        '''
+        for path in paths:
+            wd = wm.add_watch(path, self.MASK, quiet=True).get(path, -1)
+            if wd < 0:
+                if os.path.isdir(path):
+                    log.error(
+                        'Unable to watch {0}, the roots fileserver file lists '
+                        'will be refreshed by walking the file_roots. The '
+                        'number of inotify watches can be raised with the '
+                        'fs.inotify.max_user_watches sysctl.'.format(path)
+                    )
+                    return False
+                continue
+            self.wdirs.setdefault(wd, set()).add(path)
+        return True
+
+    def _dirs_of(self, path):
+        '''
+        Return the (root, reldir) pairs of the index which are read from path
+        '''
+        ret = []
+        for root, tree in self.index.tree.iteritems():
+            if path == root:
+                if '.' in tree:
+                    ret.append((root, '.'))
+                continue
+            if not path.startswith(root.rstrip(os.sep) + os.sep):
+                continue
+            reldir = os.path.relpath(path, root)
+            if reldir in tree:
+                ret.append((root, reldir))
+        return ret
+
+    def _event(self, event):
+        '''
+        Mark the dirs the event happened in as changed
+        '''
+        if event.mask & pyinotify.IN_IGNORED:
+            # The watch is gone with its dir
+            self.wdirs.pop(event.wd, None)
+            return
+        if event.mask & pyinotify.IN_Q_OVERFLOW:
+            self.dirty.add(None)
+        else:
+            for path in self.wdirs.get(event.wd, ()):
+                if event.mask & (pyinotify.IN_DELETE_SELF |
+                                 pyinotify.IN_MOVE_SELF):
+                    # The parent dir reports the change, unless the dir is a
+                    # root
+                    if path not in self.index.tree:
+                        continue
+                self.dirty.update(self._dirs_of(path))
+        if not self.dirty:
+            return
+        now = time.time()
+        self.last_event = now
+        if self.first_event is None:
+            self.first_event = now
+
+    def _write(self, path, data):
+        '''
+        Atomically write the data to the file and remember its mtime
+        '''
+        dirname = os.path.dirname(path)
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with salt.utils.atomicfile.atomic_open(path, 'w+b') as fp_:
+            fp_.write(self.serial.dumps(data))
+        self.written[path] = os.stat(path).st_mtime
+
+    def _write_envs(self, envs):
+        '''
+        Write the file lists of the environments and the mtime map
+        '''
+        for saltenv in envs:
+            self._write(list_cache_path(self.opts, saltenv),
+                        self.index.file_lists(saltenv))
+        self._write(mtime_map_path(self.opts), self.index.mtime_map())
+
+    def _keep_fresh(self):
+        '''
+        Touch the written files so they do not expire, the files which were
+        written by someone else are written again
+        '''
+        stale = set()
+        for saltenv in self.opts['file_roots']:
+            path = list_cache_path(self.opts, saltenv)
+            try:
+                if os.stat(path).st_mtime != self.written.get(path):
+                    stale.add(saltenv)
+                    continue
+                os.utime(path, None)
+                self.written[path] = os.stat(path).st_mtime
+            except OSError:
+                stale.add(saltenv)
+        if stale:
+            self._write_envs(stale)
+            return
+        path = mtime_map_path(self.opts)
+        try:
+            os.utime(path, None)
+            self.written[path] = os.stat(path).st_mtime
+        except OSError:
+            self._write(path, self.index.mtime_map())
+
+    def _flush(self, wm):
+        '''
+        Read the changed dirs again and write the file lists of the
+        environments they belong to
+        '''
+        dirty, self.dirty = self.dirty, set()
+        self.first_event = self.last_event = None
+        if None in dirty:
+            log.warning('The inotify queue overflowed, reading the '
+                        'file_roots again')
+            if not self._watch(wm, self.index.scan()):
+                return False
+            self._write_envs(self.opts['file_roots'])
+            return True
+        envs = set()
+        for root, reldir in sorted(dirty):
+            if reldir not in self.index.tree.get(root, {}):
+                # Dropped with its parent
+                continue
+            if not self._watch(wm, self.index.refresh(root, reldir)):
+                return False
+            envs.update(self.index.envs(root))
+        if envs:
+            self._write_envs(envs)
+        return True
+
+    def run(self):
+        '''
+        Watch the file_roots until the process is stopped
+        '''
+        wm = pyinotify.WatchManager()
+        notifier = pyinotify.Notifier(wm, self._event, timeout=100)
+        start = time.time()
+        if not self._watch(wm, self.index.scan()):
+            return
+        self._write_envs(self.opts['file_roots'])
+        log.info('Watching the file_roots, read in {0:.2f}s'.format(
+            time.time() - start))
+        fresh = _fresh_interval(self.opts)
+        last_fresh = time.time()
+        while True:
+            try:
+                if notifier.check_events():
+                    notifier.read_events()
+                    notifier.process_events()
+            except KeyboardInterrupt:
+                break
+            now = time.time()
+            if self.first_event is not None and \
+                    (now - self.last_event >= self.SETTLE or
+                     now - self.first_event >= self.SETTLE_MAX):
+                if not self._flush(wm):
+                    return
+            if now - last_fresh >= fresh:
+                self._keep_fresh()
+                last_fresh = now
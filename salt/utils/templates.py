@@ -23,6 +23,7 @@ import salt.utils
 from salt.exceptions import SaltRenderError
 from salt.utils.jinja import SaltCacheLoader as JinjaSaltCacheLoader
 from salt.utils.jinja import SerializerExtension as JinjaSerializerExtension
+from salt.utils.jinja import get_bytecode_cache as jinja_bytecode_cache
 from salt import __path__ as saltpath
 
 log = logging.getLogger(__name__)
@@ -239,6 +240,17 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
         log.debug('Jinja2 lstrip_blocks is enabled')
         env_args['lstrip_blocks'] = True
 
+    # The compiled code of the templates is cached for the process and in the
+    # cachedir, the signature holds the settings which change the code
+    bcc = None
+    if opts.get('jinja_bytecode_cache', False):
+        bcc = jinja_bytecode_cache(opts)
+        env_args['bytecode_cache'] = bcc
+        signature = repr((
+            [getattr(ext, '__name__', ext) for ext in env_args['extensions']],
+            env_args.get('trim_blocks', False),
+            env_args.get('lstrip_blocks', False)))
+
     if opts.get('allow_undefined', False):
         jinja_env = jinja2.Environment(**env_args)
     else:
@@ -258,7 +270,11 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
         unicode_context[key] = unicode(value, 'utf-8')
 
     try:
-        template = jinja_env.from_string(tmplstr)
+        if bcc is not None:
+            template = bcc.compile_string(
+                jinja_env, tmplstr, signature, tmplpath)
+        else:
+            template = jinja_env.from_string(tmplstr)
         template.globals.update(unicode_context)
         output = template.render(**unicode_context)
     except jinja2.exceptions.TemplateSyntaxError as exc:
@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 # Import python libs
 from __future__ import absolute_import
+import hashlib
 import warnings
+import threading
+import cPickle as pickle
+from collections import OrderedDict as _LRU
 
 # Import third party libs
 import yaml
@@ -13,6 +17,9 @@ try:
 except Exception:
     pass
 
+HAS_LIBYAML = getattr(yaml, '__with_libyaml__', False) \
+    and hasattr(yaml, 'CSafeLoader')
+
 # This function is safe and needs to stay as yaml.load. The load function
 # accepts a custom loader, and every time this function is used in Salt
 # the custom loader defined below is used. This should be altered though to
@@ -29,14 +36,13 @@ warnings.simplefilter('always', category=DuplicateKeyWarning)
 
 
 # with code integrated from https://gist.github.com/844388
-class CustomLoader(yaml.SafeLoader):
+class SaltYamlConstructor(object):
     '''
-    Create a custom YAML loader that uses the custom constructor. This allows
-    for the YAML loading defaults to be manipulated based on needs within salt
-    to make things like sls file more intuitive.
+    The custom constructor of the salt YAML loaders. This allows for the YAML
+    loading defaults to be manipulated based on needs within salt to make
+    things like sls file more intuitive.
     '''
-    def __init__(self, stream, dictclass=dict):
-        yaml.SafeLoader.__init__(self, stream)
+    def _set_dictclass(self, dictclass):
         if dictclass is not dict:
             # then assume ordered dict and use it for both !map and !omap
             self.add_constructor(
@@ -97,3 +103,83 @@ class CustomLoader(yaml.SafeLoader):
                 if node.value == '':
                     node.value = '0'
         return yaml.constructor.SafeConstructor.construct_scalar(self, node)
+
+
+class CustomLoader(SaltYamlConstructor, yaml.SafeLoader):
+    '''
+    Create a custom YAML loader that uses the custom constructor on the pure
+    python parser
+    '''
+    def __init__(self, stream, dictclass=dict):
+        yaml.SafeLoader.__init__(self, stream)
+        self._set_dictclass(dictclass)
+
+
+if HAS_LIBYAML:
+    class CCustomLoader(SaltYamlConstructor, yaml.CSafeLoader):
+        '''
+        Create a custom YAML loader that uses the custom constructor on the
+        libyaml parser, which is many times faster than the pure python one
+        '''
+        def __init__(self, stream, dictclass=dict):
+            yaml.CSafeLoader.__init__(self, stream)
+            self._set_dictclass(dictclass)
+
+
+class YamlCache(object):
+    '''
+    Keep the data loaded from YAML documents, keyed on a hash of the
+    document, so that a document rendered identically for many minions is
+    only parsed once. The data is stored pickled, every hit returns a fresh
+    copy which the caller is free to modify.
+    '''
+    def __init__(self, size):
+        self.size = size
+        self.cache = _LRU()
+        self.lock = threading.Lock()
+
+    def load(self, data, load_func, key=''):
+        '''
+        Return the data loaded from the YAML document data by load_func. The
+        key tells apart the load functions which build different data from
+        the same document.
+        '''
+        if isinstance(data, unicode):
+            digest = hashlib.md5(data.encode('utf-8'))
+        else:
+            digest = hashlib.md5(data)
+        digest.update(key)
+        digest = digest.hexdigest()
+        with self.lock:
+            pickled = self.cache.pop(digest, None)
+            if pickled is not None:
+                self.cache[digest] = pickled
+        if pickled is not None:
+            return pickle.loads(pickled)
+        ret = load_func(data)
+        pickled = pickle.dumps(ret, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.cache[digest] = pickled
+            while len(self.cache) > self.size:
+                self.cache.popitem(last=False)
+        return ret
+
+
+# The process wide YAML cache, see get_yaml_cache
+_YAML_CACHE = None
+_YAML_CACHE_LOCK = threading.Lock()
+
+
+def get_yaml_cache(size):
+    '''
+    Return the YAML cache of this process, which is shared by all the loaded
+    renderers. Returns None when size is 0.
+    '''
+    global _YAML_CACHE
+    if not size:
+        return None
+    with _YAML_CACHE_LOCK:
+        if _YAML_CACHE is None:
+            _YAML_CACHE = YamlCache(size)
+        _YAML_CACHE.size = size
+        return _YAML_CACHE
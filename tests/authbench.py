@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+#/usr/bin/env python
+'''
+The authbench script measures how long a master takes to authenticate a swarm
+of minions which all sign in at the same time, as happens after a master
+restart or an AES key rotation. It generates the minion configs with the
+minionswarm script and signs the minions in without starting them:
+
+    python tests/authbench.py -m 2000 -p 200 --master 10.0.0.1
+
+The master needs to accept the keys of the swarm, run it with auto_accept
+set, and set auth_rate on the master to test the authentication rate limit.
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import os
+import time
+import shutil
+import multiprocessing
+
+# Import salt libs
+import salt.config
+import salt.crypt
+
+# Import salt test libs
+import minionswarm
+
+
+def parse():
+    '''
+    Parse the cli options, the minionswarm options are used to generate the
+    minion configs
+    '''
+    parser = minionswarm.parser()
+    parser.add_option('-p',
+            '--processes',
+            dest='processes',
+            default=100,
+            type='int',
+            help='The number of minions to sign in concurrently')
+    parser.add_option('-r',
+            '--rounds',
+            dest='rounds',
+            default=2,
+            type='int',
+            help=('The number of times to sign in the whole swarm, the first '
+                  'round also has the master read the minion keys'))
+
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def sign_in(path):
+    '''
+    Sign in the minion configured in path, return the time it took and
+    whether it was accepted
+    '''
+    opts = salt.config.minion_config(os.path.join(path, 'minion'))
+    auth = salt.crypt.Auth(opts)
+    start = time.time()
+    creds = auth.sign_in(timeout=opts['auth_timeout'] * 20)
+    return time.time() - start, creds != 'retry'
+
+
+def report(rnd, elapsed, results):
+    '''
+    Print the results of one round
+    '''
+    times = sorted(result[0] for result in results)
+    accepted = len([result for result in results if result[1]])
+
+    def percentile(pct):
+        return times[min(len(times) - 1, int(len(times) * pct / 100))]
+
+    print('Round {0}: {1} of {2} minions signed in in {3:.2f}s, '
+          '{4:.1f} per second'.format(
+        rnd, accepted, len(times), elapsed, len(times) / elapsed))
+    print('    sign in time p50 {0:.2f}s, p90 {1:.2f}s, p99 {2:.2f}s, '
+          'max {3:.2f}s'.format(
+        percentile(50), percentile(90), percentile(99), times[-1]))
+
+
+def run(opts):
+    '''
+    Sign the swarm in and report the time spent
+    '''
+    swarm = minionswarm.Swarm(opts)
+    try:
+        swarm.prep_configs()
+        pool = multiprocessing.Pool(opts['processes'])
+        for rnd in range(1, opts['rounds'] + 1):
+            start = time.time()
+            results = pool.map(sign_in, sorted(swarm.confs), chunksize=1)
+            report(rnd, time.time() - start, results)
+        pool.close()
+        pool.join()
+    finally:
+        if not opts['no_clean']:
+            shutil.rmtree(swarm.swarm_root)
+
+
+if __name__ == '__main__':
+    run(parse())
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+#/usr/bin/env python
+'''
+The filebench script measures the throughput of the salt file server by
+fetching a salt:// file through the minion's remote file client. Run it on a
+minion against a large file in the master's file_roots:
+
+    dd if=/dev/urandom of=/srv/salt/big.bin bs=1M count=500
+    python tests/filebench.py -p salt://big.bin
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import os
+import time
+import optparse
+import tempfile
+
+# Import salt libs
+import salt.config
+import salt.fileclient
+import salt.syspaths
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('-c',
+            '--config-dir',
+            dest='config_dir',
+            default=salt.syspaths.CONFIG_DIR,
+            help='The location of the salt minion configuration directory')
+    parser.add_option('-p',
+            '--path',
+            dest='path',
+            help='The salt:// path of the file to fetch')
+    parser.add_option('-s',
+            '--saltenv',
+            dest='saltenv',
+            default='base',
+            help='The salt environment to fetch the file from')
+    parser.add_option('-r',
+            '--runs',
+            dest='runs',
+            default=3,
+            type='int',
+            help='The number of times to fetch the file')
+    parser.add_option('-b',
+            '--buffer-size',
+            dest='file_buffer_size',
+            type='int',
+            help='Override the file_buffer_size of the minion')
+    parser.add_option('-w',
+            '--window',
+            dest='file_transfer_window',
+            type='int',
+            help='Override the file_transfer_window of the minion')
+
+    options, args = parser.parse_args()
+    if not options.path:
+        parser.error('A salt:// path to fetch is required')
+    return options.__dict__
+
+
+def run(opts):
+    '''
+    Fetch the file the requested number of times and report the throughput
+    '''
+    minion_opts = salt.config.minion_config(
+            os.path.join(opts['config_dir'], 'minion'))
+    if opts['file_buffer_size']:
+        minion_opts['file_buffer_size'] = opts['file_buffer_size']
+    if opts['file_transfer_window']:
+        minion_opts['file_transfer_window'] = opts['file_transfer_window']
+    client = salt.fileclient.RemoteClient(minion_opts)
+    for run_num in range(opts['runs']):
+        fd_, dest = tempfile.mkstemp()
+        os.close(fd_)
+        try:
+            start = time.time()
+            client.get_file(opts['path'], dest, saltenv=opts['saltenv'])
+            elapsed = time.time() - start
+            size = os.path.getsize(dest)
+        finally:
+            os.remove(dest)
+        print('Run {0}: {1} bytes in {2:.2f}s, {3:.2f} MB/s'.format(
+            run_num + 1,
+            size,
+            elapsed,
+            size / elapsed / 1048576 if elapsed else 0))
+
+
+if __name__ == '__main__':
+    run(parse())
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+#/usr/bin/env python
+'''
+The jinjabench script renders one sls template many times through the salt
+jinja renderer, with and without the jinja bytecode cache, and reports the
+time spent:
+
+    python tests/jinjabench.py -n 10000
+    python tests/jinjabench.py -n 10000 -t /srv/salt/top.sls
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import time
+import shutil
+import tempfile
+import optparse
+
+# Import salt libs
+import salt.utils
+from salt.utils.templates import render_jinja_tmpl
+
+TEMPLATE = '''
+{% for num in range(count) %}
+file_{{ num }}:
+  file.managed:
+    - name: /tmp/bench/{{ num }}
+    - source: salt://bench/{{ num % 7 }}.conf
+    {% if num is divisibleby 3 %}
+    - mode: 644
+    {% else %}
+    - mode: 600
+    {% endif %}
+    - context:
+        host: {{ grains['id'] }}
+{% endfor %}
+'''
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('-n',
+            '--renders',
+            dest='renders',
+            default=10000,
+            type='int',
+            help='The number of times to render the template')
+    parser.add_option('-t',
+            '--template',
+            dest='template',
+            default=None,
+            help=('The template to render, defaults to a generated sls. The '
+                  'template is rendered with only the id grain and an empty '
+                  'pillar'))
+    parser.add_option('-c',
+            '--count',
+            dest='count',
+            default=20,
+            type='int',
+            help='The number of states in the generated sls')
+
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def bench(opts, tmplstr, cache):
+    '''
+    Render the template opts['renders'] times and return the time spent
+    '''
+    cachedir = tempfile.mkdtemp()
+    context = {'opts': {'cachedir': cachedir,
+                        'jinja_bytecode_cache': cache},
+               'saltenv': None,
+               'grains': {'id': 'bench'},
+               'pillar': {},
+               'count': opts['count']}
+    try:
+        start = time.time()
+        for _ in range(opts['renders']):
+            render_jinja_tmpl(tmplstr, dict(context))
+        return time.time() - start
+    finally:
+        shutil.rmtree(cachedir)
+
+
+def run(opts):
+    '''
+    Run the benchmark with and without the bytecode cache
+    '''
+    tmplstr = TEMPLATE
+    if opts['template']:
+        with salt.utils.fopen(opts['template'], 'r') as fp_:
+            tmplstr = fp_.read()
+    for cache in (False, True):
+        elapsed = bench(opts, tmplstr, cache)
+        print('Bytecode cache {0:<5}: {1} renders in {2:.3f}s, '
+              '{3:.3f}ms per render'.format(
+            str(cache), opts['renders'], elapsed,
+            elapsed * 1000 / opts['renders']))
+
+
+if __name__ == '__main__':
+    run(parse())
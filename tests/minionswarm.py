@@ -24,9 +24,9 @@ import salt
 import yaml
 
 
-def parse():
+def parser():
     '''
-    Parse the cli options
+    Return the cli option parser of the swarm
     '''
     parser = optparse.OptionParser()
     parser.add_option('-m',
@@ -72,8 +72,14 @@ def parse():
                   '%default')
         )
     parser.add_option('-u', '--user', default=pwd.getpwuid(os.getuid()).pw_name)
+    return parser
 
-    options, args = parser.parse_args()
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    options, args = parser().parse_args()
 
     opts = {}
 
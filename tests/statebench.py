@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+#/usr/bin/env python
+'''
+The statebench script measures the overhead of ordering and requisite
+resolution in a state run, the time spent calling each state and the peak
+memory use of the run. It runs a generated high data structure of
+file.exists states, each requiring the states before it, through the
+minion's state system:
+
+    python tests/statebench.py -n 5000 -r 3
+'''
+
+# Import Python Libs
+from __future__ import print_function
+import os
+import time
+import resource
+import optparse
+
+# Import salt libs
+import salt.config
+import salt.state
+import salt.syspaths
+
+
+def parse():
+    '''
+    Parse the cli options
+    '''
+    parser = optparse.OptionParser()
+    parser.add_option('-c',
+            '--config-dir',
+            dest='config_dir',
+            default=salt.syspaths.CONFIG_DIR,
+            help='The location of the salt minion configuration directory')
+    parser.add_option('-n',
+            '--states',
+            dest='states',
+            default=5000,
+            type='int',
+            help='The number of states to generate')
+    parser.add_option('-r',
+            '--requires',
+            dest='requires',
+            default=3,
+            type='int',
+            help='The number of preceding states each state requires')
+    parser.add_option('-s',
+            '--sls',
+            dest='sls',
+            default=50,
+            type='int',
+            help='The number of sls files to spread the states over')
+
+    options, args = parser.parse_args()
+    return options.__dict__
+
+
+def gen_high(opts):
+    '''
+    Generate the high data of the benchmark
+    '''
+    high = {}
+    for num in range(opts['states']):
+        args = [{'name': '/'}]
+        reqs = [{'file': 'bench_{0:06d}'.format(req)}
+                for req in range(max(0, num - opts['requires']), num)]
+        if reqs:
+            args.append({'require': reqs})
+        args.append('exists')
+        high['bench_{0:06d}'.format(num)] = {
+            'file': args,
+            '__sls__': 'bench{0}'.format(num % opts['sls']),
+            '__env__': 'base'}
+    return high
+
+
+def run(opts):
+    '''
+    Run the generated states and report the time spent
+    '''
+    minion_opts = salt.config.minion_config(
+            os.path.join(opts['config_dir'], 'minion'))
+    minion_opts['file_client'] = 'local'
+    minion_opts['state_events'] = False
+    state = salt.state.State(minion_opts)
+    high = gen_high(opts)
+
+    start = time.time()
+    chunks = state.compile_high_data(high)
+    compiled = time.time() - start
+
+    calls = []
+    call = state.call
+
+    def timed_call(*args, **kwargs):
+        call_start = time.time()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            calls.append(time.time() - call_start)
+    state.call = timed_call
+
+    start = time.time()
+    ret = state.call_chunks(chunks)
+    elapsed = time.time() - start
+    failed = len([tag for tag in ret if not ret[tag]['result']])
+
+    print('{0} states, {1} requisites each, {2} failed'.format(
+        len(chunks), opts['requires'], failed))
+    print('Compile:  {0:.3f}s'.format(compiled))
+    print('Run:      {0:.3f}s'.format(elapsed))
+    print('Ordering: {0:.3f}s ({1:.3f}ms per state)'.format(
+        elapsed - sum(calls),
+        (elapsed - sum(calls)) * 1000 / max(1, len(chunks))))
+    print('Calls:    {0:.3f}s ({1:.3f}ms per state, {2:.3f}ms for the '
+          'last state)'.format(
+        sum(calls),
+        sum(calls) * 1000 / max(1, len(calls)),
+        calls[-1] * 1000 if calls else 0))
+    print('Peak RSS: {0:.1f}MB'.format(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0))
+
+
+if __name__ == '__main__':
+    run(parse())
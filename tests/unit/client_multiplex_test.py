@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libs
+import itertools
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
+ensure_in_syspath('../')
+
+# Import Salt libs
+import salt.client
+import salt.utils
+from salt.client import multiplex
+
+JID1 = '20140101000000000001'
+JID2 = '20140101000000000002'
+
+
+def _ret(jid, minion):
+    return {'tag': jid, 'data': {'id': minion, 'return': minion}}
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class MultiplexClientTestCase(TestCase):
+    def _client(self, events):
+        with patch.object(salt.client.LocalClient, '__init__',
+                          MagicMock(return_value=None)):
+            local = multiplex.MultiplexClient(mopts={})
+        local.opts = {'timeout': 5,
+                      'order_masters': False,
+                      'gather_job_timeout': 1,
+                      'interface': '127.0.0.1',
+                      'ret_port': 4506}
+        local.event = MagicMock()
+        local.event.get_event.side_effect = itertools.chain(
+            events, itertools.repeat(None))
+        local.collector = salt.client.ReturnCollector(local.event)
+        self.addCleanup(local.close)
+        return local
+
+    def test_returns_dispatched_per_job(self):
+        local = self._client([_ret(JID1, 'm1'),
+                              _ret(JID2, 'm2'),
+                              _ret(JID1, 'm3')])
+        ret1 = local.get_returns(JID1, ['m1', 'm3'])
+        ret2 = local.get_returns(JID2, ['m2'])
+        self.assertEqual(ret1, {'m1': 'm1', 'm3': 'm3'})
+        self.assertEqual(ret2, {'m2': 'm2'})
+        self.assertEqual(local.collector.jobs, {})
+
+    def test_early_returns_expire(self):
+        local = self._client([])
+        local._early[JID1] = [(0, _ret(JID1, 'm1'))]
+        local._expire_early()
+        self.assertEqual(local._early, {})
+
+    def test_pooled_channel_reused(self):
+        local = self._client([])
+        sreq = MagicMock()
+        sreq.send.return_value = {'data': True}
+        with patch('salt.transport.Channel.factory',
+                   MagicMock(return_value=sreq)) as factory:
+            local.wheel(fun='key.list_all')
+            local.runner(fun='jobs.active')
+        self.assertEqual(factory.call_count, 1)
+        self.assertEqual(sreq.send.call_args[0][0]['cmd'], 'runner')
+
+    def test_cmd_matches_local_client(self):
+        pub_data = {'jid': JID1, 'minions': ['m1', 'm2']}
+        cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cachedir)
+        opts = {'timeout': 5, 'cachedir': cachedir, 'hash_type': 'md5'}
+        os.makedirs(salt.utils.jid_dir(JID1, cachedir, 'md5'))
+        with patch.object(salt.client.LocalClient, '__init__',
+                          MagicMock(return_value=None)):
+            local = salt.client.LocalClient()
+        local.opts = opts
+        local.event = MagicMock()
+        local.event.get_event.side_effect = [
+            _ret(JID1, 'm1')['data'], _ret(JID1, 'm2')['data']]
+        multi = self._client([_ret(JID1, 'm1'), _ret(JID1, 'm2')])
+        for client in (local, multi):
+            client.run_job = MagicMock(return_value=pub_data)
+        ret = local.cmd('m*', 'test.ping')
+        self.assertEqual(ret, {'m1': 'm1', 'm2': 'm2'})
+        self.assertEqual(multi.cmd('m*', 'test.ping'), ret)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(MultiplexClientTestCase, needs_daemon=False)
@@ -9,7 +9,7 @@ import os
 # Import Salt Testing libs
 from salttesting import TestCase, skipIf
 from salttesting.helpers import ensure_in_syspath
-from salttesting.mock import patch, NO_MOCK, NO_MOCK_REASON
+from salttesting.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 ensure_in_syspath('../')
 
 # Import Salt libs
@@ -84,3 +84,97 @@ class LocalClientTestCase(TestCase,
                 self.assertRaises(SaltInvocationError,
                                   self.local_client.pub,
                                   'non_existant_group', 'test.ping', expr_form='nodegroup')
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ReturnCollectorTestCase(TestCase):
+    def test_poll_dispatches_per_jid(self):
+        events = [
+            {'tag': '20140101000000000002',
+             'data': {'id': 'm2', 'return': True}},
+            {'tag': '20140101000000000001',
+             'data': {'id': 'm1', 'return': True}},
+            None,
+        ]
+        event = MagicMock()
+        event.get_event.side_effect = events
+        collector = client.ReturnCollector(event)
+        job1 = collector.add('20140101000000000001', set(['m1']))
+        job2 = collector.add('20140101000000000002', set(['m2', 'm3']))
+        self.assertEqual(collector.poll(), '20140101000000000002')
+        self.assertEqual(collector.poll(), '20140101000000000001')
+        self.assertIsNone(collector.poll())
+        self.assertEqual(job1['found'], set(['m1']))
+        self.assertEqual(job2['found'], set(['m2']))
+        self.assertEqual(len(job2['returns']), 1)
+        tags = event.get_event.call_args[0][1]
+        self.assertEqual(sorted(tags),
+                         ['20140101000000000001', '20140101000000000002'])
+        collector.discard('20140101000000000001')
+        self.assertEqual(list(collector.jobs), ['20140101000000000002'])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class GetIterReturnsTestCase(TestCase):
+    def setUp(self):
+        self.local_client = client.LocalClient.__new__(client.LocalClient)
+        self.local_client.opts = {'cachedir': '/tmp/salttest/cache',
+                                  'hash_type': 'md5',
+                                  'order_masters': False,
+                                  'timeout': 5}
+        self.events = 0
+        event = MagicMock()
+        event.get_event.side_effect = self._other_job_event
+        self.local_client.collector = client.ReturnCollector(event)
+        self.local_client.collector.add('20140101000000000002', set(['m2']))
+        self.now = 1000
+
+    def _other_job_event(self, *args, **kwargs):
+        '''
+        Keep another tracked job busy for the first 100 events
+        '''
+        self.events += 1
+        if self.events > 100:
+            return None
+        return {'tag': '20140101000000000002',
+                'data': {'minions': ['m2']}}
+
+    def _time(self):
+        self.now += 1
+        return self.now
+
+    def test_timeout_with_other_job_events(self):
+        gather_job_info = MagicMock(return_value={})
+        with patch('time.time', self._time):
+            with patch.object(self.local_client, 'gather_job_info',
+                              gather_job_info):
+                rets = list(self.local_client.get_iter_returns(
+                    '20140101000000000001', set(['m1']), timeout=5))
+        self.assertEqual([ret for ret in rets if ret], [])
+        self.assertEqual(gather_job_info.call_count, 1)
+        self.assertLess(self.events, 100)
+        self.assertEqual(list(self.local_client.collector.jobs),
+                         ['20140101000000000002'])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PresentMinionsTestCase(TestCase):
+    def setUp(self):
+        self.local_client = client.LocalClient.__new__(client.LocalClient)
+        self.local_client.opts = {'order_masters': False,
+                                  'minion_data_cache': True}
+
+    @patch('salt.utils.minions.CkMinions')
+    def test_find_job_by_default(self, ckminions):
+        self.assertEqual(
+            self.local_client._present_minions(set(['m1', 'm2'])),
+            set(['m1', 'm2']))
+        self.assertFalse(ckminions.called)
+
+    @patch('salt.utils.minions.CkMinions')
+    def test_skip_disconnected(self, ckminions):
+        ckminions.return_value.connected_ids.return_value = set(['m1'])
+        self.local_client.opts['skip_disconnected_minions'] = True
+        self.assertEqual(
+            self.local_client._present_minions(set(['m1', 'm2'])),
+            set(['m1']))
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import os
+import time
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.crypt
+
+
+class PubKeyCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.pki_dir = tempfile.mkdtemp()
+        self.cache = salt.crypt.PubKeyCache(size=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.pki_dir)
+
+    def _write_key(self, minion, key, mtime=None):
+        path = os.path.join(self.pki_dir, minion)
+        with open(path, 'w') as fp_:
+            fp_.write(key)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_read_cached_until_changed(self):
+        now = time.time()
+        path = self._write_key('web1', 'one', now - 60)
+        self.assertEqual(self.cache.read(path), 'one')
+        # Same mtime, the cached key is used
+        self._write_key('web1', 'two', now - 60)
+        self.assertEqual(self.cache.read(path), 'one')
+        self._write_key('web1', 'three', now)
+        self.assertEqual(self.cache.read(path), 'three')
+
+    def test_least_recently_used_evicted(self):
+        web1 = self._write_key('web1', 'web1')
+        web2 = self._write_key('web2', 'web2')
+        web3 = self._write_key('web3', 'web3')
+        self.cache.read(web1)
+        self.cache.read(web2)
+        self.cache.read(web1)
+        self.cache.read(web3)
+        self.assertEqual(list(self.cache.keys), [web1, web3])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SignInRetryTestCase(TestCase):
+
+    def setUp(self):
+        self.auth = salt.crypt.Auth.__new__(salt.crypt.Auth)
+        self.auth.opts = {'master': 'salt',
+                          'master_ip': '127.0.0.1',
+                          'master_uri': 'tcp://127.0.0.1:4506',
+                          'ipv6': False,
+                          'acceptance_wait_time': 10,
+                          'acceptance_wait_time_max': 0,
+                          'pki_dir': '/nonexistent'}
+        self.auth.mpub = 'minion_master.pub'
+        self.auth.minion_sign_in_payload = MagicMock(return_value={})
+        self.clock = [1000.0]
+        self.sleeps = []
+
+    def _sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.clock[0] += seconds
+
+    def _sign_in(self, replies):
+        sreq = MagicMock()
+        sreq.send_auto.side_effect = replies
+        with patch('salt.utils.dns_check',
+                   MagicMock(return_value='127.0.0.1')), \
+                patch('salt.payload.SREQ', MagicMock(return_value=sreq)), \
+                patch('time.time', lambda: self.clock[0]), \
+                patch('time.sleep', self._sleep):
+            return self.auth.sign_in()
+
+    def test_busy_master_bounded(self):
+        busy = {'enc': 'clear', 'load': {'ret': True, 'retry_after': 4}}
+        self.assertEqual(self._sign_in([busy] * 10), 'retry')
+        self.assertEqual(self.sleeps, [4, 4, 2])
+
+    def test_pending_key(self):
+        pend = {'enc': 'clear', 'load': {'ret': True}}
+        self.assertEqual(self._sign_in([pend]), 'retry')
+        self.assertEqual(self.sleeps, [])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(PubKeyCacheTestCase, SignInRetryTestCase, needs_daemon=False)
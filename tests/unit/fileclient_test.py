@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import threading
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.fileclient
+from salt.exceptions import SaltReqTimeoutError
+
+
+def _channel(opts, **kwargs):
+    channel = MagicMock()
+    channel.ttype = 'zeromq'
+    channel.auth = kwargs.get('auth', MagicMock())
+    return channel
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RemoteClientChannelTestCase(TestCase):
+
+    @patch('salt.transport.Channel.factory', MagicMock(side_effect=_channel))
+    def test_channel_per_thread(self):
+        client = salt.fileclient.RemoteClient({'cachedir': '/tmp'})
+        channels = []
+        for _ in range(2):
+            client._send({'cmd': '_file_list'})
+            channels.append(client._channel())
+
+        def _other():
+            client._send({'cmd': '_file_list'})
+            channels.append(client._channel())
+
+        thread = threading.Thread(target=_other)
+        thread.start()
+        thread.join()
+        self.assertIs(channels[0], channels[1])
+        self.assertIsNot(channels[0], channels[2])
+        # Every channel shares the sign in of the first one
+        self.assertIs(channels[2].auth, client.auth)
+
+    @patch('salt.transport.Channel.factory', MagicMock(side_effect=_channel))
+    def test_reset_on_error(self):
+        client = salt.fileclient.RemoteClient({'cachedir': '/tmp'})
+        for exc in (SaltReqTimeoutError, KeyError):
+            channel = client._channel()
+            channel.send.side_effect = exc
+            # The channel signed in again before the request failed
+            channel.auth = MagicMock()
+            self.assertRaises(exc, client._send, {'cmd': '_file_list'})
+            self.assertIs(client.auth, channel.auth)
+            self.assertIsNot(client._channel(), channel)
+            self.assertIs(client._channel().auth, channel.auth)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(RemoteClientChannelTestCase, needs_daemon=False)
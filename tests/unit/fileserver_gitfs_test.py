@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.utils
+from salt.fileserver import gitfs
+
+gitfs.__opts__ = {}
+
+
+def _git(cwd, *args, **kwargs):
+    '''
+    Run a git command in cwd and return its output without the newline
+    '''
+    env = dict(os.environ,
+               GIT_AUTHOR_NAME='salt', GIT_AUTHOR_EMAIL='salt@localhost',
+               GIT_COMMITTER_NAME='salt', GIT_COMMITTER_EMAIL='salt@localhost')
+    proc = subprocess.Popen(['git'] + list(args),
+                            cwd=cwd,
+                            env=env,
+                            stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE)
+    return proc.communicate(kwargs.get('stdin'))[0].strip()
+
+
+def _mktree(cwd, entries):
+    '''
+    Write a tree of (mode, type, sha, name) entries and return its SHA
+    '''
+    return _git(cwd, 'mktree', stdin=''.join(
+        '{0} {1} {2}\t{3}\n'.format(*entry) for entry in entries))
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(not gitfs.HAS_GITPYTHON, 'GitPython is not installed')
+@skipIf(not salt.utils.which('git'), 'git is not installed')
+class GitPythonIndexTestCase(TestCase):
+    '''
+    The trees are written with the git plumbing commands, since an empty dir
+    and a submodule can not be committed from a work tree without a remote
+    '''
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        _git(self.tmp, 'init', '-q')
+        blob = _git(self.tmp, 'hash-object', '-w', '--stdin', stdin='a: b\n')
+        empty = _mktree(self.tmp, [])
+        sub = _mktree(self.tmp, [('100644', 'blob', blob, 'b.sls')])
+        root = _mktree(self.tmp, [
+            ('100644', 'blob', blob, 'a.sls'),
+            ('040000', 'tree', empty, 'empty'),
+            ('040000', 'tree', sub, 'sub'),
+            ('160000', 'commit', '1' * 40, 'module')])
+        self.top = _mktree(self.tmp, [
+            ('100644', 'blob', blob, 'top.sls'),
+            ('040000', 'tree', root, 'root')])
+        self.tag(self.top)
+        self.repo = gitfs.git.Repo(self.tmp)
+        self.opts = patch.dict(gitfs.__opts__, {'gitfs_root': ''})
+        self.opts.start()
+        gitfs._TREE_INDEXES.clear()
+
+    def tearDown(self):
+        self.opts.stop()
+        gitfs._TREE_INDEXES.clear()
+        shutil.rmtree(self.tmp)
+
+    def tag(self, tree, name='v1'):
+        commit = _git(self.tmp, 'commit-tree', tree, '-m', 'tree',
+                      stdin='')
+        _git(self.tmp, 'tag', '-f', name, commit)
+
+    def build_index(self, gitfs_root):
+        tree = gitfs._get_tree_gitpython(self.repo, 'v1')
+        return gitfs._build_index(self.repo, 'gitpython', tree, gitfs_root)
+
+    def test_build_index(self):
+        index = self.build_index('')
+        self.assertEqual(
+            sorted(index['files']),
+            ['root/a.sls', 'root/sub/b.sls', 'top.sls'])
+        self.assertEqual(
+            index['dirs'], set(['root', 'root/empty', 'root/sub']))
+        self.assertEqual(index['empty_dirs'], set(['root/empty']))
+
+    def test_build_index_gitfs_root(self):
+        index = self.build_index('root')
+        self.assertEqual(sorted(index['files']), ['a.sls', 'sub/b.sls'])
+        self.assertEqual(index['files']['a.sls'],
+                         _git(self.tmp, 'rev-parse', 'v1:top.sls'))
+        self.assertEqual(index['dirs'], set(['empty', 'sub']))
+        self.assertEqual(index['empty_dirs'], set(['empty']))
+        for gitfs_root in ('top.sls', 'missing'):
+            self.assertEqual(
+                self.build_index(gitfs_root),
+                {'files': {}, 'dirs': set(), 'empty_dirs': set()})
+
+    def test_tree_index(self):
+        index = gitfs._tree_index(self.repo, 'gitpython', 'v1')
+        self.assertIs(gitfs._tree_index(self.repo, 'gitpython', 'v1'), index)
+
+        # The index is built again when the ref points to another tree
+        self.tag(_mktree(self.tmp, [
+            ('100644', 'blob', index['files']['top.sls'], 'new.sls')]))
+        self.assertEqual(
+            sorted(gitfs._tree_index(self.repo, 'gitpython', 'v1')['files']),
+            ['new.sls'])
+
+    def test_tree_index_lru(self):
+        self.tag(self.top, 'v2')
+        with patch.object(gitfs, 'TREE_INDEX_SIZE', 1):
+            index = gitfs._tree_index(self.repo, 'gitpython', 'v1')
+            gitfs._tree_index(self.repo, 'gitpython', 'v2')
+            self.assertEqual(len(gitfs._TREE_INDEXES), 1)
+            self.assertIsNot(
+                gitfs._tree_index(self.repo, 'gitpython', 'v1'), index)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class InitTestCase(TestCase):
+
+    @patch('salt.fileserver.gitfs._get_provider',
+           MagicMock(return_value='gitpython'))
+    @patch('salt.fileserver.gitfs._init_repos',
+           MagicMock(side_effect=lambda: ([object()], True)))
+    def test_repos_per_thread(self):
+        repos = []
+        with patch.dict(gitfs.__opts__, {'cachedir': '/tmp',
+                                         'gitfs_remotes': ['file:///repo']}):
+            repos.extend(gitfs.init())
+            repos.extend(gitfs.init())
+            thread = threading.Thread(
+                target=lambda: repos.extend(gitfs.init()))
+            thread.start()
+            thread.join()
+        self.assertIs(repos[0], repos[1])
+        self.assertIsNot(repos[0], repos[2])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(GitPythonIndexTestCase, InitTestCase, needs_daemon=False)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import os
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock
+ensure_in_syspath('../')
+
+# Import salt libs
+import salt.fileserver
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class ReadFileTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'big.bin')
+        with open(self.path, 'wb') as fp_:
+            fp_.write('x' * 1024)
+        self.fileserver = salt.fileserver.Fileserver.__new__(
+            salt.fileserver.Fileserver)
+        self.fileserver.opts = {}
+        self.fileserver.find_file = MagicMock(
+            return_value={'path': self.path, 'rel': 'big.bin',
+                          'back': 'roots'})
+        self.serve_file = MagicMock(side_effect=[{'data': 'x' * 1024},
+                                                 {'data': ''}])
+        self.fileserver.servers = {'roots.serve_file': self.serve_file}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_read_file(self):
+        self.assertEqual(
+            self.fileserver._read_file('big.bin', 'base', 1024), 'x' * 1024)
+
+    def test_skip_over_budget(self):
+        self.assertIsNone(
+            self.fileserver._read_file('big.bin', 'base', 1023))
+        self.assertFalse(self.serve_file.called)
+
+
+class ServeChunkSizeTestCase(TestCase):
+
+    def setUp(self):
+        self.opts = {'file_buffer_size': 1024,
+                     'file_transfer_window_max': 16}
+
+    def test_default(self):
+        self.assertEqual(salt.fileserver.serve_chunk_size(self.opts, {}), 1024)
+        self.assertEqual(
+            salt.fileserver.serve_chunk_size({'file_buffer_size': 1024},
+                                             {'window': 32}),
+            16 * 1024)
+
+    def test_window(self):
+        self.assertEqual(
+            salt.fileserver.serve_chunk_size(self.opts, {'window': 4}),
+            4 * 1024)
+        self.assertEqual(
+            salt.fileserver.serve_chunk_size(self.opts, {'window': '4'}),
+            4 * 1024)
+
+    def test_capped(self):
+        self.assertEqual(
+            salt.fileserver.serve_chunk_size(self.opts, {'window': 17}),
+            16 * 1024)
+
+    def test_clamped(self):
+        for window in (0, -3, None, 'a lot', [4]):
+            self.assertEqual(
+                salt.fileserver.serve_chunk_size(self.opts,
+                                                 {'window': window}),
+                1024)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ReadFileTestCase, ServeChunkSizeTestCase, needs_daemon=False)
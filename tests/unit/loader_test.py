@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libs
+import os
+import shutil
+import time
+import tempfile
+import textwrap
+import threading
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../')
+
+# Import Salt libs
+import salt.loader
+
+MODULES = {
+    'plain.py': '''
+        def ping():
+            return True
+        ''',
+    'renamed_mod.py': '''
+        __virtualname__ = 'renamed'
+
+        def __virtual__():
+            return __virtualname__
+
+        def hello():
+            return __salt__['plain.ping']()
+        ''',
+    'slow.py': '''
+        import time
+
+        def __virtual__():
+            time.sleep(0.2)
+            return True
+
+        def run():
+            return True
+        ''',
+    'never.py': '''
+        def __virtual__():
+            return False
+
+        def run():
+            return True
+        ''',
+}
+
+
+class LazyLoaderTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.mod_dir = os.path.join(self.tmpdir, 'lazymods')
+        os.makedirs(self.mod_dir)
+        for name, code in MODULES.items():
+            with open(os.path.join(self.mod_dir, name), 'w') as fp_:
+                fp_.write(textwrap.dedent(code))
+        self.opts = {'cachedir': self.tmpdir,
+                     'cython_enable': False,
+                     'grains': {'os': 'Ubuntu'}}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _loader(self):
+        return salt.loader.Loader([self.mod_dir], self.opts, tag='lazymod')
+
+    def test_first_load_is_full(self):
+        funcs = self._loader().gen_lazy_functions()
+        self.assertNotIsInstance(funcs, salt.loader.LazyFunctions)
+        self.assertEqual(sorted(funcs),
+                         ['plain.ping', 'renamed.hello', 'slow.run'])
+
+    def test_cached_load_is_lazy(self):
+        self._loader().gen_lazy_functions()
+        funcs = self._loader().gen_lazy_functions()
+        self.assertIsInstance(funcs, salt.loader.LazyFunctions)
+        self.assertEqual(funcs.loaded, set())
+        self.assertTrue(funcs['renamed.hello']())
+        self.assertEqual(funcs.loaded, set(['renamed', 'plain']))
+        self.assertNotIn('never.run', funcs)
+        self.assertEqual(sorted(funcs),
+                         ['plain.ping', 'renamed.hello', 'slow.run'])
+
+    def test_copy_loads_every_module(self):
+        self._loader().gen_lazy_functions()
+        copies = (dict,
+                  lambda funcs: dict(**funcs),
+                  lambda funcs: funcs.copy())
+        for copier in copies:
+            funcs = self._loader().gen_lazy_functions()
+            self.assertEqual(sorted(copier(funcs)),
+                             ['plain.ping', 'renamed.hello', 'slow.run'])
+        funcs = self._loader().gen_lazy_functions()
+        ret = {}
+        ret.update(funcs)
+        self.assertEqual(sorted(ret),
+                         ['plain.ping', 'renamed.hello', 'slow.run'])
+
+    def test_load_from_threads(self):
+        self._loader().gen_lazy_functions()
+        funcs = self._loader().gen_lazy_functions()
+        rets = []
+
+        def _run():
+            try:
+                rets.append(funcs['slow.run']())
+            except KeyError as exc:
+                rets.append(exc)
+
+        threads = [threading.Thread(target=_run) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(rets, [True, True])
+
+    def test_grains_change_invalidates_cache(self):
+        self._loader().gen_lazy_functions()
+        self.opts['grains'] = {'os': 'CentOS'}
+        funcs = self._loader().gen_lazy_functions()
+        self.assertNotIsInstance(funcs, salt.loader.LazyFunctions)
+
+
+class GrainsCacheTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.grains_dir = os.path.join(self.tmpdir, 'grains')
+        os.makedirs(self.grains_dir)
+        self.opts = {'cachedir': self.tmpdir,
+                     'cython_enable': False,
+                     'grains_cache': True}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_grains(self, value, mtime):
+        path = os.path.join(self.grains_dir, 'custom.py')
+        with open(path, 'w') as fp_:
+            fp_.write('def custom():\n    return {{"custom": {0!r}}}\n'.format(
+                value))
+        os.utime(path, (mtime, mtime))
+        for ext in ('c', 'o'):
+            if os.path.isfile(path + ext):
+                os.remove(path + ext)
+
+    def _grains(self):
+        return salt.loader.Loader(
+            [self.grains_dir], self.opts, tag='cachegrain').gen_grains()
+
+    def test_cache_refreshed_when_grains_module_changes(self):
+        self._write_grains('one', time.time() - 60)
+        self.assertEqual(self._grains()['custom'], 'one')
+        self._write_grains('two', time.time() - 60)
+        self.assertEqual(self._grains()['custom'], 'one')
+        self._write_grains('three', time.time() + 60)
+        self.assertEqual(self._grains()['custom'], 'three')
+
+
+GRAINS = '''
+import os
+import time
+
+COUNT = os.path.join(os.path.dirname(__file__), 'count')
+
+
+def _count(name):
+    with open(COUNT, 'a') as fp_:
+        fp_.write(name + '\\n')
+
+
+def slow_one():
+    time.sleep(0.5)
+    return {'one': 1}
+
+
+def slow_two():
+    time.sleep(0.5)
+    return {'two': 2}
+
+
+def slow_three():
+    time.sleep(0.5)
+    return {'three': 3}
+
+
+def hang():
+    time.sleep({hang})
+    return {'hang': True}
+
+
+def broken():
+    raise ValueError('broken')
+
+
+def static():
+    _count('static')
+    return {'static': True}
+
+
+def volatile():
+    _count('volatile')
+    return {'volatile': True}
+'''
+
+
+class GrainsCollectTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.grains_dir = os.path.join(self.tmpdir, 'grains')
+        os.makedirs(self.grains_dir)
+        self.opts = {'cachedir': self.tmpdir,
+                     'cython_enable': False,
+                     'grains_threads': 4,
+                     'grains_timeout': 0}
+        self._write_grains(0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write_grains(self, hang):
+        path = os.path.join(self.grains_dir, 'collect.py')
+        with open(path, 'w') as fp_:
+            fp_.write(GRAINS.replace('{hang}', str(hang)))
+        os.utime(path, (time.time() - 60, time.time() - 60))
+
+    def _loader(self):
+        return salt.loader.Loader(
+            [self.grains_dir], self.opts, tag='collectgrain')
+
+    def _counts(self):
+        with open(os.path.join(self.grains_dir, 'count')) as fp_:
+            return fp_.read().split()
+
+    def test_threads(self):
+        loader = self._loader()
+        start = time.time()
+        grains = loader.gen_grains()
+        elapsed = time.time() - start
+        self.assertEqual(
+            dict((key, grains[key]) for key in ('one', 'two', 'three')),
+            {'one': 1, 'two': 2, 'three': 3})
+        self.assertNotIn('broken', grains)
+        self.assertLess(elapsed, 1.4)
+        self.assertGreaterEqual(loader.grains_profile['collect.slow_one'], 0.5)
+        self.assertIn('collect.broken', loader.grains_profile)
+
+    def test_serial(self):
+        self.opts['grains_threads'] = 0
+        loader = self._loader()
+        start = time.time()
+        grains = loader.gen_grains()
+        self.assertGreaterEqual(time.time() - start, 1.5)
+        self.assertEqual(grains['three'], 3)
+        self.assertEqual(len(loader.grains_profile), 7)
+
+    def test_timeout(self):
+        self._write_grains(3)
+        self.opts['grains_timeout'] = 1
+        loader = self._loader()
+        start = time.time()
+        grains = loader.gen_grains()
+        self.assertLess(time.time() - start, 2.5)
+        self.assertNotIn('hang', grains)
+        self.assertEqual(grains['one'], 1)
+        self.assertGreaterEqual(loader.grains_profile['collect.hang'], 1)
+
+    def test_ttl(self):
+        self.opts['grains_cache_ttl'] = {'collect.*': 0,
+                                         'collect.stat*': 3600}
+        for _ in range(3):
+            self.assertTrue(self._loader().gen_grains()['static'])
+        self.assertEqual(sorted(self._counts()),
+                         ['static', 'volatile', 'volatile', 'volatile'])
+        self.opts['grains_cache_ttl'] = {}
+        self._loader().gen_grains()
+        self.assertEqual(self._counts().count('static'), 2)
+
+    def test_ttl_module_change(self):
+        self.opts['grains_cache_ttl'] = {'collect.static': 3600}
+        self._loader().gen_grains()
+        self._write_grains(0)
+        path = os.path.join(self.grains_dir, 'collect.py')
+        os.utime(path, (time.time() + 60, time.time() + 60))
+        self._loader().gen_grains()
+        self.assertEqual(self._counts().count('static'), 2)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(LazyLoaderTestCase,
+              GrainsCacheTestCase,
+              GrainsCollectTestCase,
+              needs_daemon=False)
@@ -3,13 +3,22 @@
     :codauthor: :email:`Mike Place <mp@saltstack.com>`
 '''
 
+# Import python libs
+import os
+import time
+import shutil
+import tempfile
+import threading
+
 # Import Salt Testing libs
 from salttesting import TestCase, skipIf
 from salttesting.helpers import ensure_in_syspath
 from salttesting.mock import NO_MOCK, NO_MOCK_REASON, patch
 
 from salt import minion
+from salt._compat import Queue
 from salt.exceptions import SaltSystemExit
+from salt.utils import event
 
 
 ensure_in_syspath('../')
@@ -22,3 +31,267 @@ class MinionTestCase(TestCase):
     def test_invalid_master_address(self):
         with patch.dict(__opts__, {'ipv6': False, 'master': float('127.0'), 'master_port': '4555', 'retry_dns': False}):
             self.assertRaises(SaltSystemExit, minion.resolve_dns, __opts__)
+
+
+def _job_return(jid, minion_id):
+    return {'tag': jid,
+            'data': {'jid': jid,
+                     'id': minion_id,
+                     'fun': 'test.ping',
+                     'return': True}}
+
+
+class SyndicBatchTestCase(TestCase):
+
+    def setUp(self):
+        self.opts = {'syndic_batch_size': 500, 'syndic_batch_window': 60}
+        self.loads = []
+
+    def _jid_load(self, jid):
+        self.loads.append(jid)
+        return {'fun': 'test.ping', 'jid': jid}
+
+    def test_batch(self):
+        batch = minion.SyndicBatch(self.opts, self._jid_load)
+        self.assertIsNone(batch.timeout())
+        self.assertFalse(batch.due())
+        batch.add(_job_return('20140101000000000001', 'web1'))
+        batch.add(_job_return('20140101000000000002', 'web1'))
+        batch.add(_job_return('20140101000000000001', 'web2'))
+        batch.add({'tag': 'salt/custom', 'data': {'foo': 'bar'}})
+        batch.add({'tag': 'salt/custom', 'data': {'retcode': 0}})
+        self.assertFalse(batch.due())
+        jobs, events = batch.flush()
+        self.assertEqual(
+            jobs,
+            [{'__fun__': 'test.ping',
+              '__jid__': '20140101000000000001',
+              '__load__': self._jid_load('20140101000000000001'),
+              'web1': True,
+              'web2': True},
+             {'__fun__': 'test.ping',
+              '__jid__': '20140101000000000002',
+              '__load__': self._jid_load('20140101000000000002'),
+              'web1': True}])
+        self.assertEqual(events, [{'tag': 'salt/custom',
+                                   'data': {'foo': 'bar'}}])
+        self.assertEqual(batch.flush(), ([], []))
+
+    def test_due(self):
+        self.opts['syndic_batch_size'] = 2
+        batch = minion.SyndicBatch(self.opts, self._jid_load)
+        self.assertFalse(batch.add(_job_return('20140101000000000001', 'a')))
+        self.assertTrue(batch.add(_job_return('20140101000000000001', 'b')))
+        self.assertTrue(batch.due())
+        batch.flush()
+        self.opts['syndic_batch_window'] = 0
+        batch = minion.SyndicBatch(self.opts, self._jid_load)
+        batch.add(_job_return('20140101000000000001', 'a'))
+        self.assertEqual(batch.timeout(), 0)
+        self.assertTrue(batch.due())
+
+    def test_load_cache(self):
+        batch = minion.SyndicBatch(self.opts, self._jid_load)
+        batch.LOAD_CACHE_SIZE = 2
+        for jid in ('20140101000000000001', '20140101000000000002',
+                    '20140101000000000001', '20140101000000000003',
+                    '20140101000000000002'):
+            batch.add(_job_return(jid, 'web1'))
+            batch.flush()
+        self.assertEqual(self.loads, ['20140101000000000001',
+                                      '20140101000000000002',
+                                      '20140101000000000003',
+                                      '20140101000000000002'])
+        # The jobs the master does not know yet are looked up again
+        batch = minion.SyndicBatch(self.opts, lambda jid: {})
+        batch.add(_job_return('20140101000000000001', 'web1'))
+        self.assertEqual(batch.loads, {})
+
+    def test_throughput(self):
+        '''
+        Several syndics forward the returns of many minions to many jobs
+        '''
+        self.opts['syndic_batch_size'] = 100
+        syndics = [minion.SyndicBatch(self.opts, self._jid_load)
+                   for _ in range(4)]
+        jids = ['201401010000000{0:05d}'.format(num) for num in range(50)]
+        sent = []
+        start = time.time()
+        for num in range(200):
+            for jid in jids:
+                batch = syndics[num % len(syndics)]
+                if batch.add(_job_return(jid, 'minion{0}'.format(num))):
+                    sent.append(batch.flush()[0])
+        for batch in syndics:
+            sent.append(batch.flush()[0])
+        elapsed = time.time() - start
+        returns = {}
+        for jobs in sent:
+            for job in jobs:
+                ret = returns.setdefault(job['__jid__'], {})
+                for key, value in job.items():
+                    if not key.startswith('__'):
+                        self.assertNotIn(key, ret)
+                        ret[key] = value
+        self.assertEqual(sorted(returns), jids)
+        for ret in returns.values():
+            self.assertEqual(len(ret), 200)
+        # One message for each 100 returns instead of one for each job of
+        # each drain of the event bus
+        self.assertEqual(len([jobs for jobs in sent if jobs]), 100)
+        # Each job load is read once per syndic
+        self.assertEqual(len(self.loads), len(jids) * len(syndics))
+        self.assertLess(elapsed, 5)
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class SyndicForwardTestCase(TestCase):
+
+    def setUp(self):
+        self.syndic = minion.Syndic.__new__(minion.Syndic)
+        self.syndic.opts = {'id': 'syndic1'}
+        self.syndic.functions = {}
+        self.syndic.tok = 'tok'
+        self.sent = []
+
+    def test_forward(self):
+        jobs = [{'__fun__': 'test.ping',
+                 '__jid__': '20140101000000000001',
+                 '__load__': {'fun': 'test.ping'},
+                 'web1': True},
+                {'__fun__': 'test.ping',
+                 '__jid__': '20140101000000000002',
+                 '__load__': {},
+                 'web2': True}]
+        events = [{'tag': 'salt/custom', 'data': {}}]
+        with patch.object(self.syndic, '_send_master', self.sent.append):
+            self.syndic._forward(jobs, events)
+            self.syndic._forward(jobs[1:], [])
+        self.assertEqual(
+            [load['cmd'] for load in self.sent],
+            ['_minion_event', '_syndic_return', '_syndic_return'])
+        self.assertEqual(self.sent[0]['events'], events)
+        self.assertEqual(self.sent[0]['pretag'], 'syndic/syndic1')
+        self.assertEqual(self.sent[1]['jobs'][0],
+                         {'cmd': '_syndic_return',
+                          'id': 'syndic1',
+                          'jid': '20140101000000000001',
+                          'fun': 'test.ping',
+                          'load': {'fun': 'test.ping'},
+                          'return': {'web1': True}})
+        self.assertEqual(self.sent[2], self.sent[1]['jobs'][1])
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class MinionReturnChannelTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.minion = minion.Minion.__new__(minion.Minion)
+        self.minion.opts = {'id': 'web1',
+                            'sock_dir': self.tmp,
+                            'return_batch_size': 3,
+                            'return_batch_window': 60}
+        self.minion._sreq = None
+        self.minion._req_owner = None
+        self.minion._req_pid = os.getpid()
+        self.minion._req_queue = Queue.Queue()
+        self.sent = []
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _return(self, num):
+        return {'cmd': '_return', 'jid': '2014010100000000000{0}'.format(num)}
+
+    def _send(self):
+        '''
+        Run the sender thread until the loads queued so far are sent
+        '''
+        self.minion._req_queue.put(None)
+        with patch.object(self.minion, '_send_master', self.sent.append):
+            self.minion._master_sender(self.minion._req_queue)
+
+    def test_batch(self):
+        self.assertTrue(self.minion._master_req(self._return(1)))
+        self.minion._master_req({'cmd': '_minion_event', 'tag': 'a'})
+        self.minion._master_req(self._return(2))
+        self.minion._master_req(self._return(3))
+        self.assertEqual(self.sent, [])
+        self._send()
+        self.assertEqual(
+            self.sent,
+            [{'cmd': '_minion_batch',
+              'id': 'web1',
+              'loads': [self._return(1),
+                        {'cmd': '_minion_event', 'tag': 'a'},
+                        self._return(2)]},
+             self._return(3)])
+
+    def test_window(self):
+        self.minion.opts['return_batch_window'] = 0
+        self.minion._master_req(self._return(1))
+        self.minion._master_req(self._return(2))
+        self._send()
+        self.assertEqual(self.sent, [self._return(1), self._return(2)])
+
+    def test_no_loop(self):
+        self.minion._req_queue = None
+        with patch.object(self.minion, '_send_master', self.sent.append):
+            self.minion._master_req(self._return(1))
+        self.assertEqual(self.sent, [self._return(1)])
+
+    def test_slow_master(self):
+        '''
+        The minion loop does not wait on the master
+        '''
+        self.minion.opts['return_batch_size'] = 1
+        replied = threading.Event()
+
+        def _send_master(load):
+            replied.wait(5)
+            self.sent.append(load)
+
+        sender = threading.Thread(target=self.minion._master_sender,
+                                  args=(self.minion._req_queue,))
+        with patch.object(self.minion, '_send_master', _send_master):
+            sender.start()
+            start = time.time()
+            self.minion._master_req(self._return(1))
+            self.minion._master_req(self._return(2))
+            self.assertLess(time.time() - start, 1)
+            self.assertEqual(self.sent, [])
+            replied.set()
+            self.minion._req_queue.put(None)
+            sender.join()
+        self.assertEqual(self.sent, [self._return(1), self._return(2)])
+
+    def test_forward(self):
+        '''
+        The job processes hand their loads to the minion loop over the event
+        bus
+        '''
+        self.minion._req_pid = os.getpid() + 1
+        zmq = event.zmq
+        context = zmq.Context()
+        pull = context.socket(zmq.PULL)
+        minion_event = event.MinionEvent(**self.minion.opts)
+        pull.bind(minion_event.pulluri)
+        minion_event.destroy()
+        try:
+            with patch.object(self.minion, '_send_master', self.sent.append):
+                job = threading.Thread(target=self.minion._master_req,
+                                       args=(self._return(1),))
+                job.start()
+                job.join()
+            poller = zmq.Poller()
+            poller.register(pull, zmq.POLLIN)
+            self.assertTrue(poller.poll(5000))
+            package = pull.recv()
+        finally:
+            pull.close()
+            context.term()
+        self.assertEqual(self.sent, [])
+        self.assertTrue(package.startswith('master_req'))
+        tag, data = event.MinionEvent.unpack(package)
+        self.assertEqual(data['load'], self._return(1))
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.modules.aptpkg as aptpkg
+
+aptpkg.__salt__ = {}
+aptpkg.__context__ = {}
+
+POLICY = '''\
+nginx:
+  Installed: (none)
+  Candidate: 1.4.6-1ubuntu3
+  Version table:
+     1.4.6-1ubuntu3 0
+        500 http://archive.ubuntu.com/ubuntu/ trusty/main amd64 Packages
+libc6:i386:
+  Installed: (none)
+  Candidate: 2.19-0ubuntu6
+  Version table:
+     2.19-0ubuntu6 0
+        500 http://archive.ubuntu.com/ubuntu/ trusty/main i386 Packages
+mail-transport-agent:
+  Installed: (none)
+  Candidate: (none)
+  Version table:
+'''
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class AptPkgLatestVersionTestCase(TestCase):
+
+    def setUp(self):
+        aptpkg.__context__.clear()
+
+    def _latest_version(self, run_all, *names, **kwargs):
+        with patch.dict(aptpkg.__salt__, {'cmd.run_all': run_all}):
+            with patch.object(aptpkg, 'list_pkgs',
+                              MagicMock(return_value={})):
+                with patch.object(aptpkg, '_get_virtual',
+                                  MagicMock(return_value={})):
+                    return aptpkg.latest_version(*names, refresh=False,
+                                                 **kwargs)
+
+    def test_parse_policy(self):
+        self.assertEqual(aptpkg._parse_policy(POLICY),
+                         {'nginx': '1.4.6-1ubuntu3',
+                          'libc6:i386': '2.19-0ubuntu6',
+                          'mail-transport-agent': '(none)'})
+
+    def test_batched_lookup(self):
+        run_all = MagicMock(return_value={'retcode': 0, 'stdout': POLICY})
+        ret = self._latest_version(run_all, 'nginx', 'libc6:i386',
+                                   'mail-transport-agent')
+        self.assertEqual(ret, {'nginx': '1.4.6-1ubuntu3',
+                               'libc6:i386': '2.19-0ubuntu6',
+                               'mail-transport-agent': ''})
+        run_all.assert_called_once_with(
+            ['apt-cache', '-q', 'policy',
+             'nginx', 'libc6:i386', 'mail-transport-agent'],
+            python_shell=False, output_loglevel='debug')
+
+        # The candidates are cached until the package lists change
+        run_all.reset_mock()
+        self.assertEqual(self._latest_version(run_all, 'nginx'),
+                         '1.4.6-1ubuntu3')
+        self.assertFalse(run_all.called)
+        aptpkg._forget_candidates(['nginx'])
+        self._latest_version(run_all, 'nginx', 'libc6:i386')
+        run_all.assert_called_once_with(
+            ['apt-cache', '-q', 'policy', 'nginx'],
+            python_shell=False, output_loglevel='debug')
+
+        run_all.reset_mock()
+        with patch.object(aptpkg, '_policy_stamp',
+                          MagicMock(return_value=(0, None, None))):
+            self._latest_version(run_all, 'nginx')
+        self.assertTrue(run_all.called)
+
+    def test_fromrepo(self):
+        run_all = MagicMock(return_value={'retcode': 0, 'stdout': POLICY})
+        self._latest_version(run_all, 'nginx', 'libc6:i386')
+        self._latest_version(run_all, 'nginx', 'libc6:i386',
+                             fromrepo='trusty-backports')
+        self.assertEqual(run_all.call_count, 2)
+        self.assertEqual(
+            run_all.call_args[0][0],
+            ['apt-cache', '-q', 'policy', 'nginx', 'libc6:i386',
+             '-o', 'APT::Default-Release=trusty-backports'])
+
+    def test_missing_from_batch(self):
+        single = 'nginx:\n  Installed: (none)\n  Candidate: 1.4.6-1ubuntu3\n'
+        run_all = MagicMock(side_effect=[{'retcode': 0, 'stdout': ''},
+                                         {'retcode': 0, 'stdout': single},
+                                         {'retcode': 0, 'stdout': ''}])
+        ret = self._latest_version(run_all, 'nginx:amd64', 'nosuchpkg')
+        self.assertEqual(ret, {'nginx:amd64': '1.4.6-1ubuntu3',
+                               'nosuchpkg': ''})
+        self.assertEqual(run_all.call_count, 3)
+
+    def test_cache_latest_version(self):
+        run_all = MagicMock(return_value={'retcode': 0, 'stdout': POLICY})
+        with patch.dict(aptpkg.__salt__, {'cmd.run_all': run_all}):
+            self.assertTrue(aptpkg.cache_latest_version(
+                'nginx', 'libc6:i386', refresh=False))
+        run_all.assert_called_once_with(
+            ['apt-cache', '-q', 'policy', 'nginx', 'libc6:i386'],
+            python_shell=False, output_loglevel='debug')
+        run_all.reset_mock()
+        self.assertEqual(self._latest_version(run_all, 'nginx'),
+                         '1.4.6-1ubuntu3')
+        self.assertFalse(run_all.called)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(AptPkgLatestVersionTestCase, needs_daemon=False)
@@ -9,6 +9,9 @@
     ~~~~~~~~~~~~~~~~~~~~~~
 '''
 
+import os
+import time
+import shutil
 import tempfile
 
 # Import Salt Testing libs
@@ -173,3 +176,100 @@ ssh:
             }[sls]
 
         client.get_state.side_effect = get_state
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PillarCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.pillar_root = os.path.join(self.tmpdir, 'pillar')
+        os.makedirs(self.pillar_root)
+        self.sls = os.path.join(self.pillar_root, 'web.sls')
+        with open(self.sls, 'w') as fp_:
+            fp_.write('role: web')
+        self.opts = {'cachedir': self.tmpdir,
+                     'pillar_roots': {'base': [self.pillar_root]},
+                     'pillar_cache_ttl': 3600,
+                     'pillar_cache_size': 10,
+                     'pillar_cache_disk': False,
+                     'serial': 'msgpack'}
+        self.grains = {'os': 'Ubuntu'}
+        self.compiled = []
+        patcher = patch('salt.pillar.Pillar', side_effect=self._pillar)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _pillar(self, opts, grains, id_, saltenv, ext, functions):
+        self.compiled.append(id_)
+        pillar = MagicMock()
+        pillar.compile_pillar.return_value = {'compiled': len(self.compiled)}
+        return pillar
+
+    def _cache(self):
+        cache = salt.pillar.PillarCache(self.opts)
+        cache.STAT_INTERVAL = 0
+        return cache
+
+    def test_cached(self):
+        cache = self._cache()
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1'),
+                         {'compiled': 1})
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1'),
+                         {'compiled': 1})
+        self.assertEqual(cache.compile_pillar(self.grains, 'web2'),
+                         {'compiled': 2})
+        self.assertEqual(cache.compile_pillar({'os': 'CentOS'}, 'web1'),
+                         {'compiled': 3})
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1', 'base'),
+                         {'compiled': 4})
+
+    def test_file_change(self):
+        cache = self._cache()
+        cache.compile_pillar(self.grains, 'web1')
+        os.utime(self.sls, (time.time() + 5, time.time() + 5))
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1'),
+                         {'compiled': 2})
+        with open(os.path.join(self.pillar_root, 'db.sls'), 'w') as fp_:
+            fp_.write('role: db')
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1'),
+                         {'compiled': 3})
+
+    def test_clear(self):
+        cache = self._cache()
+        cache.compile_pillar(self.grains, 'web1')
+        cache.compile_pillar(self.grains, 'web2')
+        time.sleep(0.01)
+        salt.pillar.clear_pillar_cache(self.opts, ['web1'])
+        cache.compile_pillar(self.grains, 'web1')
+        cache.compile_pillar(self.grains, 'web2')
+        self.assertEqual(self.compiled, ['web1', 'web2', 'web1'])
+        time.sleep(0.01)
+        salt.pillar.clear_pillar_cache(self.opts)
+        cache.compile_pillar(self.grains, 'web2')
+        self.assertEqual(self.compiled, ['web1', 'web2', 'web1', 'web2'])
+
+    def test_disk(self):
+        self.opts['pillar_cache_disk'] = True
+        self._cache().compile_pillar(self.grains, 'web1')
+        self.assertEqual(self._cache().compile_pillar(self.grains, 'web1'),
+                         {'compiled': 1})
+        self.assertEqual(self.compiled, ['web1'])
+
+    def test_errors_not_cached(self):
+        cache = self._cache()
+        self.compiled.append('error')
+        with patch('salt.pillar.Pillar') as pillar:
+            pillar.return_value.compile_pillar.return_value = {
+                '_errors': ['Rendering SLS failed']}
+            cache.compile_pillar(self.grains, 'web1')
+        self.assertEqual(cache.compile_pillar(self.grains, 'web1'),
+                         {'compiled': 2})
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(PillarTestCase, PillarCacheTestCase, needs_daemon=False)
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+# Import Python libs
+import threading
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../')
+
+# Import Salt libs
+import salt.state
+import salt.utils
+
+
+def _chunk(state, id_, name, sls):
+    return {'state': state,
+            '__id__': id_,
+            'name': name,
+            '__sls__': sls,
+            'fun': 'managed'}
+
+
+class RequisiteIndexTestCase(TestCase):
+    def setUp(self):
+        self.chunks = [
+            _chunk('file', 'motd', '/etc/motd', 'base'),
+            _chunk('pkg', 'nginx', 'nginx', 'web'),
+            _chunk('file', 'nginx_conf', '/etc/nginx/nginx.conf', 'web'),
+            _chunk('service', 'nginx', 'nginx', 'web'),
+            _chunk('file', 'web', '/srv/web', 'web'),
+        ]
+        self.index = salt.state.RequisiteIndex(self.chunks)
+
+    def test_match_by_id_and_name(self):
+        self.assertEqual(self.index.match('pkg', 'nginx'), [self.chunks[1]])
+        self.assertEqual(self.index.match('file', '/etc/motd'),
+                         [self.chunks[0]])
+        self.assertEqual(self.index.match('file', 'nginx'), [])
+
+    def test_match_sls(self):
+        # The chunk with the id web is not tracked by the web sls
+        self.assertEqual(self.index.match('sls', 'web'), self.chunks[1:4])
+
+    def test_match_glob(self):
+        self.assertEqual(self.index.match('file', '/etc/*'),
+                         [self.chunks[0], self.chunks[2]])
+        self.assertEqual(self.index.match('sls', 'w*'), self.chunks[1:4])
+
+    def test_match_none(self):
+        self.assertEqual(self.index.match('pkg', None), [])
+
+    def test_chunk_without_sls(self):
+        chunk = _chunk('cmd', 'high', 'high', None)
+        del chunk['__sls__']
+        index = salt.state.RequisiteIndex(self.chunks + [chunk])
+        self.assertEqual(index.match('cmd', 'high'), [chunk])
+        self.assertEqual(index.match('sls', 'web'), self.chunks[1:4])
+        self.assertEqual(index.match('sls', 'w*'), self.chunks[1:4])
+
+
+@skipIf(salt.utils.is_windows(), 'Parallel states are not available on Windows')
+class ParallelStateTestCase(TestCase):
+    def setUp(self):
+        # Skip loading the pillar and the modules, the state calls are
+        # replaced
+        self.state = salt.state.State.__new__(salt.state.State)
+        self.state.opts = {'state_parallel': True,
+                           'state_parallel_workers': 4,
+                           'failhard': False,
+                           'local': True}
+        self.state.states = {}
+        self.state.active = set()
+        self.state.mod_init = set()
+        self.state.pre = {}
+        self.state._State__run_num = 0
+        self.state.jid = None
+        self.state.req_index = None
+        self.state.parallel = {}
+        self.state.parallel_child = False
+        self.state.parallel_failhard = False
+        self.state.state_con = {}
+        self.state.check_refresh = lambda low, ret: None
+        self.state.call = self._slow_call
+
+    def _slow_call(self, low, chunks=None, running=None):
+        time.sleep(0.5)
+        ret = {'result': low['name'] != 'fail',
+               'changes': {},
+               'comment': '',
+               'name': low['name'],
+               'running': sorted(tag for tag in running
+                                 if not running[tag].get('__parallel__')),
+               '__run_num__': self.state._State__run_num}
+        self.state._State__run_num += 1
+        return ret
+
+    def test_independent_states_overlap(self):
+        chunks = [_chunk('cmd', 'a{0}'.format(num), 'a{0}'.format(num), 'a')
+                  for num in range(4)]
+        start = time.time()
+        running = self.state.call_chunks(chunks)
+        self.assertLess(time.time() - start, 1.5)
+        self.assertEqual(
+            [running[salt.state._gen_tag(chunk)]['__run_num__']
+             for chunk in chunks],
+            [0, 1, 2, 3])
+        for ret in running.values():
+            self.assertTrue(ret['result'])
+            self.assertNotIn('__parallel__', ret)
+
+    def test_requisite_waits_for_parallel_state(self):
+        first = _chunk('cmd', 'first', 'first', 'a')
+        second = _chunk('cmd', 'second', 'second', 'a')
+        second['require'] = [{'cmd': 'first'}]
+        second['parallel'] = False
+        running = self.state.call_chunks([first, second])
+        ret = running[salt.state._gen_tag(second)]
+        self.assertTrue(ret['result'])
+        # The first state had returned when the second one ran
+        self.assertEqual(ret['running'], [salt.state._gen_tag(first)])
+
+    def test_failed_requisite(self):
+        first = _chunk('cmd', 'fail', 'fail', 'a')
+        second = _chunk('cmd', 'second', 'second', 'a')
+        second['require'] = [{'cmd': 'fail'}]
+        running = self.state.call_chunks([first, second])
+        self.assertFalse(running[salt.state._gen_tag(first)]['result'])
+        self.assertEqual(running[salt.state._gen_tag(second)]['comment'],
+                         'One or more requisite failed')
+
+    def test_context_sent_back(self):
+        self.state.state_con.update({'pkg.list_pkgs': {'nginx': '1.4'},
+                                     'pkg.latest_version': {},
+                                     'unchanged': {'a': 1}})
+        context = self.state.state_con
+
+        def _install(low, chunks=None, running=None):
+            context.pop('pkg.list_pkgs')
+            context['pkg.latest_version']['nginx'] = '1.6'
+            context['new'] = True
+            return {'result': True, 'changes': {}, 'comment': '',
+                    'name': low['name'], '__run_num__': 0}
+
+        self.state.call = _install
+        self.state.call_chunks([_chunk('pkg', 'nginx', 'nginx', 'a')])
+        self.assertIs(self.state.state_con, context)
+        self.assertEqual(context, {'pkg.latest_version': {'nginx': '1.6'},
+                                   'unchanged': {'a': 1},
+                                   'new': True})
+
+    def test_context_cleared(self):
+        self.state.state_con['pkg.list_pkgs'] = {'nginx': '1.4'}
+
+        def _unpicklable(low, chunks=None, running=None):
+            self.state.state_con['lock'] = threading.Lock()
+            return {'result': True, 'changes': {}, 'comment': '',
+                    'name': low['name'], '__run_num__': 0}
+
+        self.state.call = _unpicklable
+        self.state.call_chunks([_chunk('pkg', 'nginx', 'nginx', 'a')])
+        self.assertEqual(self.state.state_con, {})
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(RequisiteIndexTestCase, ParallelStateTestCase, needs_daemon=False)
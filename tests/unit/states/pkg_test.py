@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+from salttesting.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
+ensure_in_syspath('../../')
+
+# Late import so mock can do it's job
+import salt.states.pkg as pkg
+pkg.__salt__ = {}
+pkg.__opts__ = {'test': False}
+pkg.__lowstate__ = []
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class PkgLatestTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = patch.dict(pkg.__opts__, {'cachedir': self.cachedir})
+        self.opts.start()
+
+    def tearDown(self):
+        self.opts.stop()
+        shutil.rmtree(self.cachedir)
+
+    def _latest(self, funcs, lowstate, *args, **kwargs):
+        funcs.setdefault('pkg.version', MagicMock(return_value='1.0'))
+        funcs.setdefault('pkg.latest_version', MagicMock(return_value=''))
+        with patch.dict(pkg.__salt__, funcs):
+            with patch.object(pkg, '__lowstate__', lowstate, create=True):
+                return pkg.latest(*args, **kwargs)
+
+    def test_cache_latest(self):
+        lowstate = [
+            {'state': 'pkg', 'fun': 'latest', 'name': 'vim'},
+            {'state': 'pkg', 'fun': 'latest', 'name': 'nginx'},
+            {'state': 'pkg', 'fun': 'latest', 'name': 'mypkgs',
+             'pkgs': ['bash', {'zsh': None}]},
+            {'state': 'pkg', 'fun': 'latest', 'name': 'sid',
+             'fromrepo': 'unstable'},
+            {'state': 'pkg', 'fun': 'installed', 'name': 'curl'},
+        ]
+        cache = MagicMock(return_value=True)
+        latest_version = MagicMock(return_value='')
+        ret = self._latest({'pkg.cache_latest_version': cache,
+                            'pkg.latest_version': latest_version},
+                           lowstate, 'vim', refresh=True)
+        self.assertTrue(ret['result'])
+        # The first pkg.latest state of the run already looks them all up
+        cache.assert_called_once_with('bash', 'nginx', 'vim', 'zsh',
+                                      fromrepo=None, refresh=True)
+        latest_version.assert_called_once_with('vim', fromrepo=None,
+                                               refresh=False)
+
+    def test_no_cache_latest(self):
+        latest_version = MagicMock(return_value='')
+        ret = self._latest({'pkg.latest_version': latest_version},
+                           [{'state': 'pkg', 'fun': 'latest', 'name': 'vim'},
+                            {'state': 'pkg', 'fun': 'latest',
+                             'name': 'nginx'}],
+                           'vim', refresh=True)
+        self.assertTrue(ret['result'])
+        latest_version.assert_called_once_with('vim', fromrepo=None,
+                                               refresh=True)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(PkgLatestTestCase, needs_daemon=False)
@@ -6,6 +6,7 @@ import tempfile
 import json
 import datetime
 import pprint
+import shutil
 
 # Import Salt Testing libs
 from salttesting import skipIf, TestCase
@@ -16,7 +17,11 @@ ensure_in_syspath('../../')
 import salt.utils
 from salt.exceptions import SaltRenderError
 from salt.utils import get_context
-from salt.utils.jinja import SaltCacheLoader, SerializerExtension
+from salt.utils.jinja import (
+    SaltBytecodeCache,
+    SaltCacheLoader,
+    SerializerExtension,
+)
 from salt.utils.templates import (
     JINJA,
     render_jinja_tmpl,
@@ -596,7 +601,68 @@ class TestCustomExtensions(TestCase):
     #     return
 
 
+class TestBytecodeCache(TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.bcc_dir = os.path.join(self.cachedir, 'jinja')
+        self.opts = {'cachedir': self.cachedir,
+                     'jinja_bytecode_cache': True}
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def _render(self, tmplstr, **context):
+        context.update({'opts': self.opts, 'saltenv': None})
+        return render_jinja_tmpl(tmplstr, context)
+
+    def test_render_cached(self):
+        self.assertEqual(self._render('{{ a }}-{{ b }}', a=1, b=2), '1-2')
+        self.assertEqual(len(os.listdir(self.bcc_dir)), 1)
+        self.assertEqual(self._render('{{ a }}-{{ b }}', a=3, b=4), '3-4')
+        self.assertEqual(len(os.listdir(self.bcc_dir)), 1)
+        self.assertEqual(self._render('{{ a }}+{{ b }}', a=3, b=4), '3+4')
+        self.assertEqual(len(os.listdir(self.bcc_dir)), 2)
+
+    def test_undefined_variable(self):
+        self.assertRaises(SaltRenderError, self._render, '{{ missing }}')
+        self.assertRaises(SaltRenderError, self._render, '{{ missing }}')
+
+    def test_load_from_disk(self):
+        env = Environment()
+        SaltBytecodeCache(self.bcc_dir).compile_string(env, '{{ a }}')
+        bcc = SaltBytecodeCache(self.bcc_dir)
+        env.compile = None
+        self.assertEqual(bcc.compile_string(env, '{{ a }}').render(a=1), '1')
+
+    def test_corrupt_file(self):
+        env = Environment()
+        SaltBytecodeCache(self.bcc_dir).compile_string(env, '{{ a }}')
+        for name in os.listdir(self.bcc_dir):
+            with open(os.path.join(self.bcc_dir, name), 'r+b') as fp_:
+                fp_.truncate(20)
+        bcc = SaltBytecodeCache(self.bcc_dir)
+        self.assertEqual(bcc.compile_string(env, '{{ a }}').render(a=1), '1')
+
+    def test_replace_named(self):
+        env = Environment()
+        bcc = SaltBytecodeCache(self.bcc_dir)
+        for idx in range(3):
+            tmpl = bcc.compile_string(env, '{{ a }}' + str(idx), name='t.sls')
+            self.assertEqual(tmpl.render(a=1), '1' + str(idx))
+        self.assertEqual(len(os.listdir(self.bcc_dir)), 1)
+        self.assertEqual(len(bcc.codes), 1)
+
+    def test_prune(self):
+        env = Environment()
+        bcc = SaltBytecodeCache(self.bcc_dir)
+        bcc.SIZE = 2
+        for idx in range(4):
+            bcc.compile_string(env, '{{ a }}' + str(idx))
+        self.assertEqual(len(os.listdir(self.bcc_dir)), 2)
+        self.assertEqual(len(bcc.codes), 2)
+
+
 if __name__ == '__main__':
     from integration import run_tests
     run_tests(TestSaltCacheLoader, TestGetTemplate, TestCustomExtensions,
-              needs_daemon=False)
+              TestBytecodeCache, needs_daemon=False)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import copy
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+from salt.utils import immutabletypes
+
+
+class ImmutableTypesTestCase(TestCase):
+
+    def setUp(self):
+        self.running = {'file_|-motd_|-/etc/motd_|-managed': {
+            'result': True,
+            'changes': {'diff': 'New file'},
+            'comment': '',
+            'require': [{'pkg': 'motd'}]}}
+        self.frozen = immutabletypes.freeze(self.running)
+
+    def test_read(self):
+        tag = 'file_|-motd_|-/etc/motd_|-managed'
+        self.assertIn(tag, self.frozen)
+        self.assertTrue(self.frozen[tag]['result'])
+        self.assertEqual(self.frozen[tag]['require'][0]['pkg'], 'motd')
+        self.assertEqual(self.frozen, self.running)
+        self.assertEqual(self.frozen[tag]['require'], [{'pkg': 'motd'}])
+
+    def test_write_refused(self):
+        tag = 'file_|-motd_|-/etc/motd_|-managed'
+        with self.assertRaises(TypeError):
+            self.frozen['new'] = {}
+        with self.assertRaises(TypeError):
+            self.frozen[tag]['changes']['diff'] = 'changed'
+        with self.assertRaises(AttributeError):
+            self.frozen[tag]['require'].append({'pkg': 'other'})
+
+    def test_view_is_live(self):
+        self.running['pkg_|-motd_|-motd_|-installed'] = {'result': False}
+        self.assertEqual(len(self.frozen), 2)
+        self.assertFalse(self.frozen['pkg_|-motd_|-motd_|-installed']['result'])
+
+    def test_deepcopy(self):
+        thawed = copy.deepcopy(self.frozen)
+        self.assertIsInstance(thawed, dict)
+        self.assertEqual(thawed, self.running)
+        thawed['new'] = {}
+        self.assertNotIn('new', self.running)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ImmutableTypesTestCase, needs_daemon=False)
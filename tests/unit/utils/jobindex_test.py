@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import shutil
+import tempfile
+import threading
+
+# Import Salt Testing libs
+from salttesting import skipIf, TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.utils.jobindex
+
+
+@skipIf(not salt.utils.jobindex.HAS_SQLITE3, 'sqlite3 is not available')
+class JobIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.index = salt.utils.jobindex.get_index(
+            {'cachedir': self.cachedir,
+             'job_cache_index': True,
+             'serial': 'msgpack'})
+        self.index.add_job('20140101100000000000',
+                           {'jid': '20140101100000000000',
+                            'fun': 'test.ping',
+                            'tgt': '*'})
+        self.index.add_job('20140101110000000000',
+                           {'jid': '20140101110000000000',
+                            'fun': 'state.highstate',
+                            'tgt': 'web*'})
+        self.index.add_return('20140101100000000000', 'web1')
+        self.index.add_return('20140101100000000000', 'db1')
+        self.index.add_return('20140101110000000000', 'web1')
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_disabled(self):
+        self.assertIsNone(salt.utils.jobindex.get_index(
+            {'cachedir': self.cachedir}))
+
+    def test_lookups(self):
+        self.assertEqual(
+            self.index.get_job('20140101110000000000')['fun'],
+            'state.highstate')
+        self.assertEqual(self.index.get_job('20140101120000000000'), {})
+        self.assertEqual(
+            sorted(self.index.returned('20140101100000000000')),
+            ['db1', 'web1'])
+        self.assertEqual(
+            list(self.index.list_jobs(fun='test.ping')),
+            ['20140101100000000000'])
+        self.assertEqual(
+            list(self.index.list_jobs(minion='db1')),
+            ['20140101100000000000'])
+        self.assertEqual(len(self.index.list_jobs(minion='web1')), 2)
+
+    def test_expire(self):
+        self.index.expire('2014010111')
+        self.assertEqual(list(self.index.list_jobs()),
+                         ['20140101110000000000'])
+        self.assertEqual(self.index.returned('20140101100000000000'), [])
+
+    def test_minions(self):
+        self.index.add_job('20140101120000000000',
+                           {'jid': '20140101120000000000',
+                            'fun': 'test.ping',
+                            'tgt': 'web*'},
+                           minions=set(['web1']))
+        self.assertEqual(
+            self.index.get_job('20140101120000000000')['minions'], ['web1'])
+        self.assertNotIn('minions',
+                         self.index.get_job('20140101100000000000'))
+
+    def test_threads(self):
+        errors = []
+
+        def _returns(minion):
+            try:
+                for idx in range(20):
+                    self.index.add_return(
+                        '201401011200000000{0:02d}'.format(idx), minion)
+                    self.index.returned('20140101100000000000')
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=_returns, args=(minion,))
+                   for minion in ('web1', 'web2', 'web3')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            sorted(self.index.returned('20140101120000000019')),
+            ['web1', 'web2', 'web3'])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(JobIndexTestCase, needs_daemon=False)
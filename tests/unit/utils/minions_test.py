@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import shutil
+import tempfile
+import threading
+import time
+
+# Import third party libs
+import zmq
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.utils.minions
+
+
+class MinionDataIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.cachedir,
+                     'minion_data_cache': True,
+                     'serial': 'msgpack'}
+        salt.utils.minions.store_minion_data(
+            self.opts,
+            'web1',
+            {'os': 'Ubuntu', 'roles': ['web', 'db'], 'ip': {'eth0': '1.2.3.4'}},
+            {'role': 'web'})
+        salt.utils.minions.store_minion_data(
+            self.opts,
+            'db1',
+            {'os': 'CentOS', 'roles': ['db'], 'disks': [{'name': 'sda'}]},
+            {'role': 'db'})
+        self.index = salt.utils.minions.MinionDataIndex(self.opts)
+        self.index.refresh()
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
+
+    def test_literal_match(self):
+        self.assertEqual(self.index.match('grains', 'os:ubuntu'),
+                         set(['web1']))
+        self.assertEqual(self.index.match('grains', 'roles:db'),
+                         set(['web1', 'db1']))
+        self.assertEqual(self.index.match('grains', 'ip:eth0:1.2.3.4'),
+                         set(['web1']))
+        self.assertEqual(self.index.match('pillar', 'role:db'),
+                         set(['db1']))
+        self.assertEqual(self.index.match('grains', 'os'), set())
+
+    def test_unindexed_match(self):
+        self.assertEqual(self.index.match('grains', 'disks:name:sda'),
+                         set(['db1']))
+
+    def test_glob_and_regex_match(self):
+        self.assertEqual(self.index.match('grains', 'os:Ubu*'),
+                         set(['web1']))
+        self.assertEqual(self.index.match('grains', 'os:cent.*',
+                                          regex_match=True),
+                         set(['db1']))
+
+    def test_incremental_refresh(self):
+        salt.utils.minions.store_minion_data(
+            self.opts, 'db1', {'os': 'Ubuntu'}, {})
+        salt.utils.minions.store_minion_data(
+            self.opts, 'web2', {'os': 'Ubuntu'}, {})
+        self.index.refresh()
+        self.assertEqual(self.index.match('grains', 'os:ubuntu'),
+                         set(['web1', 'db1', 'web2']))
+        self.assertEqual(self.index.match('grains', 'os:centos'), set())
+        self.assertEqual(self.index.match('pillar', 'role:db'), set())
+
+    def test_write_and_remove(self):
+        salt.utils.minions.write_minion_data(
+            self.opts, 'web1', {'pillar': {'role': 'web'}})
+        salt.utils.minions.remove_minion_data(self.opts, 'db1')
+        self.index.refresh()
+        self.assertEqual(self.index.match('grains', 'os:ubuntu'), set())
+        self.assertEqual(self.index.match('pillar', 'role:web'),
+                         set(['web1']))
+        self.assertEqual(self.index.match('pillar', 'role:db'), set())
+        self.assertEqual(self.index.ids(), set(['web1']))
+
+    def test_match_during_refresh(self):
+        errors = []
+
+        def _writer():
+            try:
+                for idx in range(200):
+                    salt.utils.minions.store_minion_data(
+                        self.opts, 'web{0}'.format(idx), {'os': 'Ubuntu'}, {})
+                    self.index.refresh()
+            except Exception as exc:
+                errors.append(exc)
+
+        writer = threading.Thread(target=_writer)
+        writer.start()
+        while writer.is_alive():
+            self.assertIn('web1', self.index.match('grains', 'os:Ubu*'))
+            self.assertIn('web1', self.index.match('grains', 'os:ubuntu'))
+            self.assertIn('db1', self.index.match('grains', 'disks:name:sda'))
+        writer.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.index.ids()), 201)
+
+
+class PubTopicsTestCase(TestCase):
+
+    def setUp(self):
+        self.opts = {'zmq_filtering': True, 'order_masters': False}
+
+    def test_resolved_targets(self):
+        self.assertEqual(
+            salt.utils.minions.pub_topics(
+                self.opts, 'web*', 'glob', ['web1', 'web2']),
+            [salt.utils.minions.pub_topic('web1'),
+             salt.utils.minions.pub_topic('web2')])
+        self.assertEqual(
+            salt.utils.minions.pub_topics(self.opts, 'web1', 'list', []), [])
+
+    def test_broadcast_targets(self):
+        self.assertIsNone(salt.utils.minions.pub_topics(
+            self.opts, 'os:Ubuntu', 'grain', ['web1']))
+        self.assertIsNone(salt.utils.minions.pub_topics(
+            self.opts, '*', 'glob', ['web1']))
+        self.opts['order_masters'] = True
+        self.assertIsNone(salt.utils.minions.pub_topics(
+            self.opts, 'web1', 'list', ['web1']))
+        self.opts['order_masters'] = False
+        self.opts['zmq_filtering'] = False
+        self.assertIsNone(salt.utils.minions.pub_topics(
+            self.opts, 'web1', 'list', ['web1']))
+
+    def test_subscriptions(self):
+        context = zmq.Context()
+        pub = context.socket(zmq.PUB)
+        port = pub.bind_to_random_port('tcp://127.0.0.1')
+        sub = context.socket(zmq.SUB)
+        sub.setsockopt(zmq.SUBSCRIBE, salt.utils.minions.BROADCAST_TOPIC)
+        sub.setsockopt(zmq.SUBSCRIBE, salt.utils.minions.pub_topic('web1'))
+        sub.connect('tcp://127.0.0.1:{0}'.format(port))
+        try:
+            # Give the subscriptions time to reach the publisher
+            time.sleep(0.2)
+            pub.send_multipart([salt.utils.minions.pub_topic('web2'), 'web2'])
+            pub.send_multipart([salt.utils.minions.pub_topic('web1'), 'web1'])
+            pub.send_multipart([salt.utils.minions.BROADCAST_TOPIC, 'all'])
+            self.assertTrue(sub.poll(1000))
+            self.assertEqual(sub.recv_multipart()[-1], 'web1')
+            self.assertTrue(sub.poll(1000))
+            self.assertEqual(sub.recv_multipart()[-1], 'all')
+            self.assertFalse(sub.poll(100))
+        finally:
+            pub.close(0)
+            sub.close(0)
+            context.term()
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(MinionDataIndexTestCase, PubTopicsTestCase, needs_daemon=False)
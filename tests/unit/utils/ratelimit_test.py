@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import time
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+from salt.utils import ratelimit
+
+
+class TokenBucketTestCase(TestCase):
+
+    def test_burst(self):
+        bucket = ratelimit.TokenBucket(10, burst=3)
+        self.assertEqual([bucket.consume() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(bucket.consume(), 0)
+
+    def test_refill(self):
+        bucket = ratelimit.TokenBucket(20, burst=1)
+        self.assertEqual(bucket.consume(), 0)
+        wait = bucket.consume()
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+        time.sleep(0.06)
+        self.assertEqual(bucket.consume(), 0)
+
+    def test_backlog_spreads_retries(self):
+        bucket = ratelimit.TokenBucket(1, burst=1)
+        bucket.consume()
+        waits = [bucket.consume() for _ in range(50)]
+        self.assertTrue(all(0 < wait <= 51 for wait in waits))
+        # The later requests are spread over the time to drain the backlog
+        self.assertGreater(max(waits[25:]), 5)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(TokenBucketTestCase, needs_daemon=False)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import os
+import time
+import fnmatch
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.config
+import salt.utils
+from salt.utils import event
+
+REACT_MAP = [
+    {'salt/auth': '/srv/reactor/auth.sls'},
+    {'salt/minion/*/start': ['/srv/reactor/start.sls',
+                             '/srv/reactor/highstate.sls']},
+    {'salt/*': '/srv/reactor/all.sls'},
+    {'salt/job/*/ret/web?': '/srv/reactor/web.sls'},
+    {'salt/auth': '/srv/reactor/auth2.sls'},
+    {'*': '/srv/reactor/any.sls'},
+    {'salt/[ab]uth': '/srv/reactor/set.sls'},
+    {'salt/minion/*': '/srv/reactor/minion.sls'},
+    {'salt/m': '/srv/reactor/m.sls'},
+    'not a dict',
+    {'two': 'keys', 'in': 'one'},
+    {'salt/auth': {'not': 'a list'}},
+]
+
+TAGS = [
+    'salt/auth',
+    'salt/buth',
+    'salt/minion/web1/start',
+    'salt/minion/web1/stop',
+    'salt/job/20140101/ret/web1',
+    'salt/job/20140101/ret/web10',
+    'salt/m',
+    'salt/',
+    'salt',
+    'other',
+    '',
+]
+
+
+def _fnmatch_reactors(react_map, tag):
+    '''
+    The reactors of a tag, matching every entry of the map in turn
+    '''
+    reactors = []
+    for ropt in react_map:
+        if not isinstance(ropt, dict) or len(ropt) != 1:
+            continue
+        key, val = ropt.items()[0]
+        if fnmatch.fnmatch(tag, key):
+            if isinstance(val, basestring):
+                reactors.append(val)
+            elif isinstance(val, list):
+                reactors.extend(val)
+    return reactors
+
+
+class ReactorDispatchTestCase(TestCase):
+
+    def test_match(self):
+        dispatch = event.ReactorDispatch(REACT_MAP)
+        self.assertEqual(
+            dispatch.match('salt/auth'),
+            ['/srv/reactor/auth.sls',
+             '/srv/reactor/all.sls',
+             '/srv/reactor/auth2.sls',
+             '/srv/reactor/any.sls',
+             '/srv/reactor/set.sls'])
+        self.assertEqual(dispatch.match('other'), ['/srv/reactor/any.sls'])
+
+    def test_fnmatch_parity(self):
+        dispatch = event.ReactorDispatch(REACT_MAP)
+        for tag in TAGS:
+            self.assertEqual(dispatch.match(tag),
+                             _fnmatch_reactors(REACT_MAP, tag), tag)
+
+    def test_empty(self):
+        for react_map in (None, []):
+            self.assertEqual(
+                event.ReactorDispatch(react_map).match('salt/auth'), [])
+
+
+class ReactorMapTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.opts = salt.config.DEFAULT_MASTER_OPTS.copy()
+        self.opts['cachedir'] = self.tmp
+        self.opts['extension_modules'] = os.path.join(self.tmp, 'extmods')
+        self.opts['reactor'] = os.path.join(self.tmp, 'reactor.conf')
+        self._write_map('- salt/auth: /srv/reactor/auth.sls\n')
+        self.reactor = event.Reactor(self.opts)
+        self.reactor.STAT_INTERVAL = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write_map(self, data):
+        with salt.utils.fopen(self.opts['reactor'], 'w') as fp_:
+            fp_.write(data)
+        # Make sure the change is seen on file systems with coarse mtimes
+        stamp = time.time() + len(data)
+        os.utime(self.opts['reactor'], (stamp, stamp))
+
+    def test_reload(self):
+        dispatch = self.reactor.get_dispatch()
+        self.assertEqual(self.reactor.list_reactors('salt/auth'),
+                         ['/srv/reactor/auth.sls'])
+        # An unchanged map is not compiled again
+        self.assertIs(self.reactor.get_dispatch(), dispatch)
+        self._write_map('- salt/*: /srv/reactor/all.sls\n')
+        self.assertEqual(self.reactor.list_reactors('salt/auth'),
+                         ['/srv/reactor/all.sls'])
+
+    def test_bad_map(self):
+        self.reactor.get_dispatch()
+        self._write_map('- salt/auth: [\n')
+        # The last good map is kept
+        self.assertEqual(self.reactor.list_reactors('salt/auth'),
+                         ['/srv/reactor/auth.sls'])
+        os.remove(self.opts['reactor'])
+        self.assertEqual(self.reactor.list_reactors('salt/auth'),
+                         ['/srv/reactor/auth.sls'])
+
+    def test_list_map(self):
+        self.opts['reactor'] = REACT_MAP
+        reactor = event.Reactor(self.opts)
+        self.assertEqual(reactor.list_reactors('salt/m'),
+                         ['/srv/reactor/all.sls',
+                          '/srv/reactor/any.sls',
+                          '/srv/reactor/m.sls'])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(ReactorDispatchTestCase, ReactorMapTestCase, needs_daemon=False)
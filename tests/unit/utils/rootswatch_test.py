@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+import os
+import time
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+import salt.fileserver
+import salt.payload
+import salt.utils
+from salt.fileserver import roots
+from salt.utils import rootswatch
+
+
+def _touch(path, data=''):
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with salt.utils.fopen(path, 'w') as fp_:
+        fp_.write(data)
+
+
+class RootsIndexTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.base = os.path.join(self.tmp, 'base')
+        self.other = os.path.join(self.tmp, 'other')
+        _touch(os.path.join(self.base, 'top.sls'))
+        _touch(os.path.join(self.base, 'web/init.sls'))
+        _touch(os.path.join(self.base, 'web/files/nginx.conf'))
+        _touch(os.path.join(self.base, 'web/files/nginx.swp'))
+        _touch(os.path.join(self.other, 'db/init.sls'))
+        os.makedirs(os.path.join(self.base, 'empty'))
+        os.symlink(os.path.join(self.base, 'top.sls'),
+                   os.path.join(self.base, 'top_link.sls'))
+        os.symlink(self.other, os.path.join(self.base, 'other_link'))
+        self.opts = {'file_roots': {'base': [self.base],
+                                    'dev': [self.other, self.base]},
+                     'fileserver_followsymlinks': True,
+                     'fileserver_ignoresymlinks': False,
+                     'file_ignore_regex': None,
+                     'file_ignore_glob': ['*.swp'],
+                     'cachedir': os.path.join(self.tmp, 'cache')}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _walk_lists(self, saltenv):
+        '''
+        The file lists of the roots backend, built by walking the file_roots
+        '''
+        roots.__opts__ = self.opts
+        ret = {}
+        for form in ('files', 'dirs', 'empty_dirs', 'links'):
+            # Skip the file list cache
+            shutil.rmtree(self.opts['cachedir'], ignore_errors=True)
+            ret[form] = sorted(roots._file_lists({'saltenv': saltenv}, form))
+        return ret
+
+    def _assert_walk(self, index):
+        for saltenv in self.opts['file_roots']:
+            self.assertEqual(index.file_lists(saltenv),
+                             self._walk_lists(saltenv))
+
+    def test_scan(self):
+        index = rootswatch.RootsIndex(self.opts)
+        self.assertEqual(len(index.scan()), 8)
+        lists = index.file_lists('base')
+        self.assertIn('other_link/db/init.sls', lists['files'])
+        self.assertNotIn('web/files/nginx.swp', lists['files'])
+        self.assertEqual(lists['empty_dirs'], ['empty'])
+        self.assertEqual(lists['links'], ['top_link.sls'])
+        self._assert_walk(index)
+
+    def test_scan_symlinks(self):
+        self.opts['fileserver_followsymlinks'] = False
+        self.opts['fileserver_ignoresymlinks'] = True
+        index = rootswatch.RootsIndex(self.opts)
+        index.scan()
+        lists = index.file_lists('base')
+        self.assertNotIn('other_link/db/init.sls', lists['files'])
+        self.assertNotIn('top_link.sls', lists['files'])
+        self._assert_walk(index)
+
+    def test_refresh(self):
+        index = rootswatch.RootsIndex(self.opts)
+        index.scan()
+        _touch(os.path.join(self.base, 'web/files/new/deep/file.conf'))
+        shutil.rmtree(os.path.join(self.base, 'empty'))
+        os.remove(os.path.join(self.base, 'top.sls'))
+        # New dirs are read with their parent
+        self.assertEqual(
+            index.refresh(self.base, 'web/files'),
+            [os.path.join(self.base, 'web/files'),
+             os.path.join(self.base, 'web/files/new'),
+             os.path.join(self.base, 'web/files/new/deep')])
+        index.refresh(self.base, '.')
+        self.assertNotIn('empty', index.tree[self.base])
+        self._assert_walk(index)
+        shutil.rmtree(os.path.join(self.base, 'web'))
+        index.refresh(self.base, '.')
+        self.assertEqual(sorted(index.tree[self.base]),
+                         ['.', 'other_link', 'other_link/db'])
+        self._assert_walk(index)
+
+    def test_mtime_map(self):
+        os.remove(os.path.join(self.base, 'top_link.sls'))
+        index = rootswatch.RootsIndex(self.opts)
+        index.scan()
+        self.assertEqual(
+            index.mtime_map(),
+            salt.fileserver.generate_mtime_map(self.opts['file_roots']))
+
+
+@skipIf(not rootswatch.HAS_PYINOTIFY, 'pyinotify is not installed')
+class RootsWatcherTestCase(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.base = os.path.join(self.tmp, 'base')
+        _touch(os.path.join(self.base, 'top.sls'))
+        self.opts = {'file_roots': {'base': [self.base]},
+                     'fileserver_followsymlinks': True,
+                     'fileserver_ignoresymlinks': False,
+                     'fileserver_list_cache_time': 30,
+                     'file_ignore_regex': None,
+                     'file_ignore_glob': None,
+                     'cachedir': os.path.join(self.tmp, 'cache')}
+        self.serial = salt.payload.Serial(self.opts)
+        self.watcher = rootswatch.RootsWatcher(self.opts)
+        self.watcher.start()
+
+    def tearDown(self):
+        self.watcher.terminate()
+        self.watcher.join()
+        shutil.rmtree(self.tmp)
+
+    def _wait_files(self, expected):
+        path = rootswatch.list_cache_path(self.opts, 'base')
+        files = None
+        for _ in range(100):
+            try:
+                with salt.utils.fopen(path, 'rb') as fp_:
+                    files = self.serial.load(fp_)['files']
+            except (IOError, OSError, ValueError):
+                pass
+            if files == expected:
+                break
+            time.sleep(0.1)
+        self.assertEqual(files, expected)
+
+    def test_watch(self):
+        self._wait_files(['top.sls'])
+        self.assertIn(os.path.join(self.base, 'top.sls'),
+                      rootswatch.read_mtime_map(self.opts))
+        _touch(os.path.join(self.base, 'web/init.sls'))
+        self._wait_files(['top.sls', 'web/init.sls'])
+        _touch(os.path.join(self.base, 'web/files/nginx.conf'))
+        self._wait_files(['top.sls', 'web/files/nginx.conf', 'web/init.sls'])
+        shutil.rmtree(os.path.join(self.base, 'web'))
+        self._wait_files(['top.sls'])
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(RootsIndexTestCase, RootsWatcherTestCase, needs_daemon=False)
@@ -21,6 +21,9 @@ from salt.exceptions import (SaltInvocationError, SaltSystemExit, CommandNotFoun
 # Import Python libraries
 import os
 import datetime
+import hashlib
+import shutil
+import tempfile
 import zmq
 from collections import namedtuple
 
@@ -81,12 +84,41 @@ class UtilsTestCase(TestCase):
         test_cache_dir = '/tmp/cachdir'
         test_hash_type = 'md5'
 
-        expected_jid_dir = '/tmp/cachdir/jobs/69/fda308ccfa70d8296345e6509de136'
+        expected_jid_dir = \
+            '/tmp/cachdir/jobs/2013121911/69/fda308ccfa70d8296345e6509de136'
 
         ret = utils.jid_dir(test_jid, test_cache_dir, test_hash_type)
 
         self.assertEqual(ret, expected_jid_dir)
 
+        # Ids which are not jids are not sharded
+        expected_jid_dir = '/tmp/cachdir/jobs/{0}/{1}'.format(
+            hashlib.md5('req').hexdigest()[:2],
+            hashlib.md5('req').hexdigest()[2:])
+
+        ret = utils.jid_dir('req', test_cache_dir, test_hash_type)
+
+        self.assertEqual(ret, expected_jid_dir)
+
+    def test_jid_dir_old_layout(self):
+        cachedir = tempfile.mkdtemp()
+        try:
+            jid = '20131219110700123489'
+            new_dir = utils.jid_dir(jid, cachedir, 'md5')
+            old_dir = os.path.join(cachedir, 'jobs', '69',
+                                   'fda308ccfa70d8296345e6509de136')
+            self.assertNotEqual(new_dir, old_dir)
+
+            # A job cached before the upgrade is found where it was written
+            os.makedirs(old_dir)
+            self.assertEqual(utils.jid_dir(jid, cachedir, 'md5'), old_dir)
+
+            # Unless the job is in the sharded layout as well
+            os.makedirs(new_dir)
+            self.assertEqual(utils.jid_dir(jid, cachedir, 'md5'), new_dir)
+        finally:
+            shutil.rmtree(cachedir)
+
     def test_is_jid(self):
         self.assertTrue(utils.is_jid('20131219110700123489'))  # Valid JID
         self.assertFalse(utils.is_jid(20131219110700123489))  # int
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Import Salt Testing libs
+from salttesting import TestCase, skipIf
+from salttesting.helpers import ensure_in_syspath
+ensure_in_syspath('../../')
+
+# Import salt libs
+from salt.utils import yamlloader
+from salt.utils.odict import OrderedDict
+from salt.renderers import yaml as yaml_renderer
+from salt.exceptions import SaltRenderError
+
+SLS = '''
+motd:
+  file.managed:
+    - name: /etc/motd
+    - mode: 0644
+nginx:
+  pkg.installed: []
+'''
+
+yaml_renderer.__opts__ = {}
+yaml_renderer.__salt__ = {}
+
+
+class YamlLoaderTestCase(TestCase):
+
+    def _load(self, loader_class, data=SLS):
+        def yaml_loader(*args):
+            return loader_class(*args, dictclass=OrderedDict)
+        return yamlloader.load(data, Loader=yaml_loader)
+
+    @skipIf(not yamlloader.HAS_LIBYAML, 'libyaml is not available')
+    def test_libyaml_loader(self):
+        ret = self._load(yamlloader.CCustomLoader)
+        self.assertEqual(ret, self._load(yamlloader.CustomLoader))
+        self.assertIsInstance(ret, OrderedDict)
+        self.assertEqual(ret.keys(), ['motd', 'nginx'])
+        self.assertEqual(ret['motd']['file.managed'][1]['mode'], 644)
+
+    @skipIf(not yamlloader.HAS_LIBYAML, 'libyaml is not available')
+    def test_libyaml_conflicting_id(self):
+        with self.assertRaises(yamlloader.ConstructorError):
+            self._load(yamlloader.CCustomLoader, SLS + 'motd: {}\n')
+
+    def test_render_errors(self):
+        with self.assertRaises(SaltRenderError) as exc:
+            yaml_renderer.render(SLS + 'motd: {}\n')
+        self.assertIn('Conflicting ID "motd"', str(exc.exception))
+        with self.assertRaises(SaltRenderError) as exc:
+            yaml_renderer.render('motd:\n\t- name: /etc/motd\n')
+        self.assertEqual(exc.exception.error, 'Illegal tab character')
+        self.assertEqual(exc.exception.line_num, 2)
+
+
+class YamlCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.cache = yamlloader.YamlCache(2)
+        self.loads = []
+
+    def _load(self, data):
+        self.loads.append(data)
+        return yamlloader.load(data, Loader=yamlloader.CustomLoader)
+
+    def test_load_once(self):
+        ret = self.cache.load(SLS, self._load)
+        ret['motd']['file.managed'].append({'user': 'root'})
+        cached = self.cache.load(SLS, self._load)
+        self.assertEqual(self.loads, [SLS])
+        # The cached data is a copy, unaffected by the changes of the caller
+        self.assertEqual(cached, self._load(SLS))
+        self.assertEqual(self.cache.load(u'a: 1', self._load), {'a': 1})
+
+    def test_key(self):
+        self.cache.load(SLS, self._load, 'ordered')
+        self.cache.load(SLS, self._load)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_size(self):
+        for doc in ('a: 1', 'b: 1', 'a: 1', 'c: 1', 'b: 1'):
+            self.cache.load(doc, self._load)
+        self.assertEqual(self.loads, ['a: 1', 'b: 1', 'c: 1', 'b: 1'])
+
+    def test_errors_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(yamlloader.ConstructorError):
+                self.cache.load('a: 1\na: 2\n', self._load)
+        self.assertEqual(len(self.loads), 2)
+        self.assertEqual(len(self.cache.cache), 0)
+
+    def test_get_yaml_cache(self):
+        self.assertIsNone(yamlloader.get_yaml_cache(0))
+        cache = yamlloader.get_yaml_cache(10)
+        self.assertIs(yamlloader.get_yaml_cache(20), cache)
+        self.assertEqual(cache.size, 20)
+
+
+if __name__ == '__main__':
+    from integration import run_tests
+    run_tests(YamlLoaderTestCase, YamlCacheTestCase, needs_daemon=False)